@@ -0,0 +1,59 @@
+"""
+Adaptive Poll Interval
+Polling period that follows the rate of change of the telemetry
+
+While values move the board is polled every min_period. Each sample that
+shows no change beyond the per-field tolerance multiplies the period by
+backoff, up to max_period, so an idle board costs a few bytes a minute
+while a transient (temperature ramp, fan settling after a SET) is sampled
+at full rate.
+"""
+
+import threading
+
+
+class AdaptivePollInterval:
+    """Exponential back-off of the polling period for one board"""
+
+    def __init__(self, min_period: float = 0.25, max_period: float = 8.0,
+                 backoff: float = 2.0, tolerance=None):
+        self.min_period = min_period
+        self.max_period = max_period
+        self.backoff = backoff
+        self.tolerance = tolerance  # per-field change ignored as noise
+        self.period = min_period
+        self._last = None
+        self._wakeup = threading.Event()
+
+    def setPeriods(self, min_period: float, max_period: float) -> None:
+        """Set the period bounds in seconds"""
+        self.min_period = max(0.0, min_period)
+        self.max_period = max(self.min_period, max_period)
+        self.period = min(max(self.period, self.min_period), self.max_period)
+
+    def observe(self, state) -> float:
+        """Feed one sample, returns the period until the next poll"""
+        state = tuple(state)
+        if self._changed(state):
+            self.period = self.min_period
+        else:
+            self.period = min(self.period * self.backoff, self.max_period)
+        self._last = state
+        return self.period
+
+    def reset(self) -> None:
+        """Return to the fastest period and end the current wait early"""
+        self.period = self.min_period
+        self._wakeup.set()
+
+    def wait(self, timeout: float = None) -> None:
+        """Block for the current period (at most timeout) or until reset() is called"""
+        self._wakeup.wait(self.period if timeout is None else min(self.period, timeout))
+        self._wakeup.clear()
+
+    def _changed(self, state) -> bool:
+        if self._last is None or len(self._last) != len(state):
+            return True
+        tolerance = self.tolerance or (0,) * len(state)
+        return any(abs(new - old) > limit
+                   for new, old, limit in zip(state, self._last, tolerance))
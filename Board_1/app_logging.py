@@ -0,0 +1,139 @@
+"""
+Application Logging
+Leveled logging with an in-memory ring buffer and a background writer
+
+The connection classes and apps log through loggers below "home_automation"
+with lazy %-style arguments, so a disabled level costs one level check and
+no string formatting. Records that pass the level are appended to a bounded
+ring buffer; a writer thread formats them and writes them out in batches,
+keeping console and file I/O off the update and GUI threads. If the buffer
+overflows the oldest records are dropped and counted.
+
+Usage:
+    from app_logging import get_logger, setup_logging
+    log = get_logger(__name__)
+    setup_logging(logging.DEBUG)          # once, in main()
+    log.debug("Ambient Temp: %d.%d", ambient_int, ambient_frac)
+"""
+
+import atexit
+import logging
+import sys
+import threading
+from collections import deque
+
+
+ROOT_LOGGER = "home_automation"
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module, below the application root logger"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class RingBufferHandler(logging.Handler):
+    """Queues records in a bounded ring buffer for a background writer"""
+
+    def __init__(self, targets, capacity: int = 4096, flush_interval: float = 0.5):
+        super().__init__()
+        self.targets = list(targets)
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._records = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._running = True
+        self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._writer.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Buffer the record, formatting happens on the writer thread"""
+        if len(self._records) == self._records.maxlen:
+            self.dropped += 1
+        self._records.append(record)
+        if record.levelno >= logging.ERROR:
+            self._wakeup.set()  # do not sit on errors
+
+    def flush(self) -> None:
+        """Write every buffered record now (caller's thread)"""
+        self._drain()
+
+    def close(self) -> None:
+        """Stop the writer thread after writing what is buffered"""
+        self._running = False
+        self._wakeup.set()
+        if self._writer is not threading.current_thread():
+            self._writer.join(1.0)
+        self._drain()
+        super().close()
+
+    def _run(self) -> None:
+        """Writer thread: write batches every flush_interval seconds"""
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                record = self._records.popleft()
+            except IndexError:
+                break
+            for target in self.targets:
+                if record.levelno >= target.level:
+                    target.handle(record)
+        for target in self.targets:
+            target.flush()
+
+
+_handler = None
+
+
+def setup_logging(level: int = logging.INFO, stream=sys.stderr, filename: str = None,
+                  capacity: int = 4096, flush_interval: float = 0.5,
+                  fmt: str = DEFAULT_FORMAT) -> RingBufferHandler:
+    """Route application logging through a RingBufferHandler.
+
+    Calling it again replaces the previous configuration.
+    """
+    global _handler
+    shutdown_logging()
+    formatter = logging.Formatter(fmt)
+    targets = []
+    if stream is not None:
+        targets.append(logging.StreamHandler(stream))
+    if filename is not None:
+        targets.append(logging.FileHandler(filename, encoding="utf-8"))
+    for target in targets:
+        target.setFormatter(formatter)
+
+    _handler = RingBufferHandler(targets, capacity, flush_interval)
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    root.addHandler(_handler)
+    root.propagate = False
+    return _handler
+
+
+def set_level(level: int) -> None:
+    """Change the application log level at run time"""
+    logging.getLogger(ROOT_LOGGER).setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """Flush and remove the handler installed by setup_logging()"""
+    global _handler
+    if _handler is None:
+        return
+    root = logging.getLogger(ROOT_LOGGER)
+    root.removeHandler(_handler)
+    root.propagate = True
+    _handler.close()
+    for target in _handler.targets:
+        target.close()
+    _handler = None
+
+
+atexit.register(shutdown_logging)
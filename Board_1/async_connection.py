@@ -0,0 +1,310 @@
+"""
+Home Automation System - asyncio Transport
+Event-loop based connections for Board 1 and Board 2
+
+The blocking connection classes use an update thread and an I/O thread per
+board. The classes here speak the same UART protocol as coroutines on top of
+non-blocking reads of the tty file descriptor (loop.add_reader), so a single
+event loop can drive many boards with no thread per port. Board state,
+decoding and getters are inherited from the blocking board classes.
+
+POSIX only: the event loop must be able to watch the port's file descriptor.
+
+Example:
+    ac = AsyncAirConditionerSystemConnection()
+    ac.setComPort("/dev/ttyUSB0")
+    if await ac.open():
+        await ac.update()
+        print(ac.getAmbientTemp())
+        await ac.close()
+"""
+
+import asyncio
+import os
+
+import serial
+
+import home_automation as board1
+import curtain_control as board2
+from home_automation import AirConditionerSystemConnection, _frame_checksum
+from curtain_control import CurtainControlSystemConnection
+from app_logging import get_logger
+
+log = get_logger("async")
+
+
+class AsyncHomeAutomationSystemConnection:
+    """asyncio transport mixed in front of a blocking board class"""
+
+    def __init__(self):
+        super().__init__()
+        self._loop = None
+        self._fd = None
+        self._rx = bytearray()
+        self._rx_event = asyncio.Event()
+        self._io_lock = asyncio.Lock()
+
+    async def open(self) -> bool:
+        """Initiate connection to the Board via UART port"""
+        if self.comPort is None:
+            return False
+        try:
+            log.info("Opening %s at %s baud (asyncio)", self.comPort, self.baudRate)
+            self.serial_connection = serial.Serial(
+                port=self.comPort,
+                baudrate=self.baudRate,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+                stopbits=serial.STOPBITS_ONE,
+                timeout=0
+            )
+            self.serial_connection.reset_input_buffer()
+            self.serial_connection.reset_output_buffer()
+            self._fd = self.serial_connection.fileno()
+            os.set_blocking(self._fd, False)
+        except (serial.SerialException, OSError) as e:
+            log.error("Connection error: %s", e)
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._fd, self._on_readable)
+        self._rx.clear()
+        self._frame_supported = None
+        self._is_running = True
+        return True
+
+    async def close(self) -> bool:
+        """Closes the connection to the board"""
+        self._is_running = False
+        self._streaming = False
+        try:
+            if self._fd is not None and self._loop is not None:
+                self._loop.remove_reader(self._fd)
+            self._fd = None
+            if self.serial_connection and self.serial_connection.is_open:
+                self.serial_connection.close()
+            return True
+        except Exception as e:
+            log.error("Close error: %s", e)
+            return False
+
+    def _on_readable(self) -> None:
+        """Event loop callback: move available bytes into the RX buffer"""
+        try:
+            data = os.read(self._fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            log.error("Read error: %s", e)
+            data = b''
+        if not data:
+            # Device went away, stop watching the descriptor
+            self._loop.remove_reader(self._fd)
+            return
+        self._rx += data
+        if self._streaming:
+            self._decode_stream()
+        self._rx_event.set()
+
+    async def _write_async(self, data: bytes) -> bool:
+        """Write all of data without blocking the event loop (the inherited
+        blocking setters keep using _write())"""
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self._fd, view):]
+            except (BlockingIOError, InterruptedError):
+                writable = self._loop.create_future()
+                self._loop.add_writer(self._fd, writable.set_result, None)
+                try:
+                    await writable
+                finally:
+                    self._loop.remove_writer(self._fd)
+        return True
+
+    async def _read_exact(self, count: int) -> bytes:
+        """Read up to count bytes, allowing RESPONSE_TIMEOUT per byte"""
+        deadline = self._loop.time() + self.RESPONSE_TIMEOUT * count
+        while len(self._rx) < count:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            self._rx_event.clear()
+            try:
+                await asyncio.wait_for(self._rx_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        data = bytes(self._rx[:count])
+        del self._rx[:count]
+        return data
+
+    async def _send_command(self, cmd: int) -> int:
+        """Send a command byte and receive response"""
+        response = await self._send_burst([cmd])
+        return response[0]
+
+    async def _send_burst(self, cmds) -> list:
+        """Send GET commands pipelined and receive all responses in order"""
+        cmds = list(cmds)
+        if not self.is_connected():
+            return [0] * len(cmds)
+
+        responses = []
+        async with self._io_lock:
+            try:
+                for start in range(0, len(cmds), self.pipelineDepth):
+                    chunk = cmds[start:start + self.pipelineDepth]
+                    await self._write_async(bytes(chunk))
+                    data = await self._read_exact(len(chunk))
+                    if len(data) < len(chunk):
+                        # Drop late replies so they are not taken as answers
+                        # to the next chunk
+                        self._rx.clear()
+                    responses.extend(data)
+                    responses.extend([0] * (len(chunk) - len(data)))
+            except Exception as e:
+                log.error("Burst error: %s", e)
+        responses.extend([0] * (len(cmds) - len(responses)))
+        return responses
+
+    async def _poll_frame(self, layout):
+        """Poll all fields with one CMD_GET_ALL request if supported"""
+        if self._frame_supported is False or not self.is_connected():
+            return None
+        values = None
+        async with self._io_lock:
+            try:
+                await self._write_async(bytes([board1.CMD_GET_ALL]))
+                header = await self._read_exact(2)
+                if (len(header) == 2 and header[0] == board1.FRAME_SYNC and
+                        header[1] == layout.size):
+                    body = await self._read_exact(layout.size + 1)
+                    if (len(body) == layout.size + 1 and
+                            _frame_checksum(header[1:] + body[:-1]) == body[-1]):
+                        values = layout.unpack_from(body)
+                if values is None:
+                    self._rx.clear()
+            except Exception as e:
+                log.error("Frame error: %s", e)
+        if values is None:
+            if self._frame_supported is None:
+                self._frame_supported = False
+            return None
+        if not self._frame_supported:
+            self._frame_supported = True
+            self.setPipelineDepth(max(self.pipelineDepth, board1.RX_RING_DEPTH))
+        return values
+
+    async def _send_set(self, cmd_int: int, cmd_frac: int) -> bool:
+        """Write an integral/fractional SET pair"""
+        if not self.is_connected():
+            return False
+        self.pollInterval.reset()
+        async with self._io_lock:
+            try:
+                return await self._write_async(bytes([cmd_int, cmd_frac]))
+            except Exception as e:
+                log.error("Write error: %s", e)
+                return False
+
+    async def startStreaming(self) -> bool:
+        """Ask the board to push telemetry frames, decoded as they arrive"""
+        if not self.is_connected():
+            return False
+        async with self._io_lock:
+            self._rx.clear()
+            await self._write_async(bytes([board1.CMD_STREAM_ON]))
+            self._streaming = True
+        return True
+
+    async def stopStreaming(self) -> bool:
+        """Stop pushed telemetry and return to polling in update()"""
+        if not self._streaming or not self.is_connected():
+            self._streaming = False
+            return True
+        async with self._io_lock:
+            self._streaming = False
+            await self._write_async(bytes([board1.CMD_STREAM_OFF]))
+            self._rx.clear()
+        return True
+
+    def _decode_stream(self) -> None:
+        """Apply every complete pushed frame in the RX buffer"""
+        layout = self.TELEMETRY_FRAME
+        frame_len = layout.size + 3
+        while len(self._rx) >= frame_len:
+            start = self._rx.find(board1.FRAME_SYNC)
+            if start < 0:
+                self._rx.clear()
+                return
+            del self._rx[:start]
+            if len(self._rx) < frame_len:
+                return
+            if (self._rx[1] == layout.size and
+                    _frame_checksum(self._rx[1:frame_len - 1]) == self._rx[frame_len - 1]):
+                self._apply_values(layout.unpack_from(self._rx, 2))
+                del self._rx[:frame_len]
+            else:
+                # False sync byte inside other data, resync after it
+                del self._rx[0]
+
+
+class AsyncAirConditionerSystemConnection(AsyncHomeAutomationSystemConnection,
+                                          AirConditionerSystemConnection):
+    """asyncio connection for the Air Conditioner (Board 1)"""
+
+    async def update(self) -> None:
+        """Get all data and update member data by sending commands"""
+        if not self.is_connected() or self._streaming:
+            return
+
+        values = await self._poll_frame(self.TELEMETRY_FRAME)
+        if values is None:
+            values = await self._send_burst(board1.POLL_SEQUENCE)
+        self._apply_values(values)
+
+    async def setDesiredTemp(self, temp: float) -> bool:
+        """Set the desired temperature by sending message to board"""
+        integral = int(temp)
+        fractional = int((temp - integral) * 10)
+        if integral < 0 or integral > 63:
+            return False
+        return await self._send_set(0xC0 | (integral & 0x3F), 0x80 | (fractional & 0x3F))
+
+
+class AsyncCurtainControlSystemConnection(AsyncHomeAutomationSystemConnection,
+                                          CurtainControlSystemConnection):
+    """asyncio connection for the Curtain Control (Board 2)"""
+
+    async def update(self) -> None:
+        """Get all data and update member data by sending commands"""
+        if not self.is_connected() or self._streaming:
+            return
+
+        values = await self._poll_frame(self.TELEMETRY_FRAME)
+        if values is None:
+            values = await self._send_burst(board2.POLL_SEQUENCE)
+            # Per-byte protocol only returns the LOW pressure byte, assume H=3
+            values[4] += 768
+        self._apply_values(values)
+
+    async def close(self) -> bool:
+        """Closes the connection to the board"""
+        self._finish_motion(self._motion, False)
+        return await super().close()
+
+    async def setCurtainStatus(self, status: float) -> bool:
+        """Set the desired curtain status by sending message to board"""
+        integral = int(status)
+        fractional = int((status - integral) * 10)
+        if integral < 0 or integral > 100:
+            return False
+        return await self._send_set(0xC0 | (integral & 0x3F), 0x80 | (fractional & 0x3F))
+
+
+async def poll_forever(connections, period: float = 1.0) -> None:
+    """Update every connection concurrently once per period until all close"""
+    loop = asyncio.get_running_loop()
+    while any(c.is_connected() for c in connections):
+        started = loop.time()
+        await asyncio.gather(*(c.update() for c in connections if c.is_connected()))
+        await asyncio.sleep(max(0.0, period - (loop.time() - started)))
@@ -0,0 +1,164 @@
+"""
+Connection Benchmark
+update() latency and throughput of the connection classes against the
+simulated boards in board_sim.py
+
+For every board type and baud rate a virtual board is started on a pty, a
+connection is opened on it and update() is timed for a number of samples.
+Each result holds the latency percentiles (p50/p95/p99, milliseconds), the
+refreshes per second and the bytes on the wire per refresh. Results are
+printed (or written) as JSON so runs can be compared; with --baseline the
+run fails if a p95 latency got worse than the tolerance allows.
+
+Usage:
+    python benchmark.py [--samples 50] [--bauds 9600 115200] [--output run.json]
+    python benchmark.py --baseline previous.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+from home_automation import AirConditionerSystemConnection
+from curtain_control import CurtainControlSystemConnection
+from board_sim import Board1Simulator, Board2Simulator
+
+
+BOARDS = {
+    "ac": (AirConditionerSystemConnection, Board1Simulator),
+    "curtain": (CurtainControlSystemConnection, Board2Simulator),
+}
+
+BAUD_RATES = (9600, 19200, 38400, 57600, 115200)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def bench_board(board: str, baudRate: int, samples: int = 50, warmup: int = 3,
+                loop_period: float = None, ring_firmware: bool = True) -> dict:
+    """Time samples update() calls of one board type at one baud rate"""
+    connection_class, simulator_class = BOARDS[board]
+    with simulator_class(baudRate=baudRate, loop_period=loop_period,
+                         ring_firmware=ring_firmware) as simulator:
+        connection = connection_class()
+        connection.setComPort(simulator.port)
+        connection.setBaudRate(baudRate)
+        if not connection.open():
+            raise RuntimeError(f"Could not open simulator on {simulator.port}")
+        # Refresh every field on every update(), not just the due ones
+        for field in getattr(connection, 'fieldPeriods', {}):
+            connection.setFieldPeriod(field, 0.0)
+        try:
+            for _ in range(warmup):
+                connection.update()
+            bytes_before = simulator.bytes_in + simulator.bytes_out
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(samples):
+                begin = time.perf_counter()
+                connection.update()
+                latencies.append(time.perf_counter() - begin)
+            elapsed = time.perf_counter() - started
+            wire_bytes = simulator.bytes_in + simulator.bytes_out - bytes_before
+        finally:
+            connection.close()
+
+    latencies.sort()
+    return {
+        "board": board,
+        "baud": baudRate,
+        "firmware": "ring" if ring_firmware else "legacy",
+        "frame": bool(connection._frame_supported),
+        "samples": samples,
+        "latency_ms": {
+            "p50": _percentile(latencies, 0.50) * 1000,
+            "p95": _percentile(latencies, 0.95) * 1000,
+            "p99": _percentile(latencies, 0.99) * 1000,
+            "mean": statistics.fmean(latencies) * 1000,
+            "max": latencies[-1] * 1000,
+        },
+        "refreshes_per_s": samples / elapsed,
+        "bytes_per_refresh": wire_bytes / samples,
+        "overruns": simulator.overruns,
+    }
+
+
+def run(boards=tuple(BOARDS), bauds=BAUD_RATES, samples: int = 50,
+        loop_period: float = None, legacy: bool = False) -> dict:
+    """Benchmark every board and baud rate combination"""
+    results = []
+    for board in boards:
+        for baudRate in bauds:
+            results.append(bench_board(board, baudRate, samples,
+                                       loop_period=loop_period, ring_firmware=not legacy))
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "loop_period": loop_period,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Return the results whose p95 latency regressed beyond tolerance"""
+    def key(result):
+        return (result["board"], result["baud"], result["firmware"])
+
+    previous = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        old, new = before["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        if new > old * (1.0 + tolerance):
+            regressions.append({"board": result["board"], "baud": result["baud"],
+                                "firmware": result["firmware"],
+                                "p95_before": old, "p95_after": new})
+    return regressions
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Connection update() benchmark")
+    parser.add_argument("--boards", nargs="+", choices=sorted(BOARDS), default=sorted(BOARDS))
+    parser.add_argument("--bauds", nargs="+", type=int, default=list(BAUD_RATES))
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--loop", type=float, default=None,
+                        help="simulated firmware main loop period (s)")
+    parser.add_argument("--legacy", action="store_true",
+                        help="simulate the firmware without the RX ring")
+    parser.add_argument("--output", help="write the JSON result to this file")
+    parser.add_argument("--baseline", help="earlier JSON result to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative p95 increase against the baseline")
+    args = parser.parse_args()
+
+    result = run(args.boards, args.bauds, args.samples, args.loop, args.legacy)
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -48,6 +48,24 @@
         
         ; Desired Curtain Status
         DESIRED_CURTAIN_INT, DESIRED_CURTAIN_FRAC
+        
+        ; UART halka tamponlari (boyut 16, indeksler 0x0F ile maskelenir)
+        RX_BUF:16, RX_HEAD, RX_TAIL     ; ISR yazar, UART_CHECK okur
+        TX_BUF:16, TX_HEAD, TX_TAIL     ; UART_SEND_BYTE yazar, ISR okur
+        UART_TX_BYTE
+        FRAME_CHK           ; 0x09 cercevesi XOR checksum
+        
+        ; Telemetri stream
+        STREAM_FLAGS        ; bit0 = acik, bit1 = degisiklik, bit2 = motor donuyor
+        STREAM_COUNT        ; periyodik gonderim sayaci (ana dongu)
+        STREAM_STEPS        ; hareket sirasinda her 10 adimda (%1) bir gonder
+    ENDC
+
+STREAM_PERIOD   EQU d'25'   ; ~40 ms/dongu -> ~1 sn
+
+    ; ISR context kaydi (ortak RAM, tum banklardan erisilebilir)
+    CBLOCK 0x70
+        W_TEMP, STATUS_TEMP, PCLATH_TEMP, FSR_TEMP
     ENDC
 
     #DEFINE LCD_RS PORTE, 0
@@ -56,6 +74,8 @@
 
     ORG     0x00
     GOTO    MAIN
+    ORG     0x04
+    GOTO    ISR
 
 MAIN:
     ;--- PORT AYARLARI ---
@@ -107,6 +127,13 @@ MAIN:
     
     ; UART override: 0 = otomatik, 1 = UART kontrolu
     CLRF    UART_OVERRIDE
+    
+    ; Stream kapali
+    CLRF    STREAM_FLAGS
+    MOVLW   STREAM_PERIOD
+    MOVWF   STREAM_COUNT
+    MOVLW   d'10'
+    MOVWF   STREAM_STEPS
 
     CALL    LCD_INIT
     CALL    UART_INIT       ; UART baslat
@@ -117,6 +144,7 @@ MAIN:
 ;====================================================================
 LOOP:
     CALL    UART_CHECK      ; UART komut kontrolu
+    CALL    STREAM_CHECK    ; Stream acik ise telemetri gonder
     CALL    READ_SENSORS
     CALL    DETERMINE_TARGET
     CALL    PROCESS_MOVEMENT
@@ -230,9 +258,17 @@ PROCESS_MOVEMENT:
     MOVF    CURTAIN_POS_L, W
     XORWF   TARGET_POS_L, W
     BTFSC   STATUS, Z
-    RETURN  ; Dur
+    GOTO    MOTION_STOPPED  ; Dur
 
 CHECK_DIR:
+    ; Hareket sirasinda her 10 adimda bir stream cercevesi
+    BSF     STREAM_FLAGS, 2
+    DECFSZ  STREAM_STEPS, F
+    GOTO    CHECK_DIR_2
+    MOVLW   d'10'
+    MOVWF   STREAM_STEPS
+    BSF     STREAM_FLAGS, 1
+CHECK_DIR_2:
     MOVF    CURTAIN_POS_L, W
     SUBWF   TARGET_POS_L, W
     MOVF    CURTAIN_POS_H, W
@@ -257,6 +293,14 @@ ACTION_OPEN:
     DECF    CURTAIN_POS_L, F
     RETURN
 
+MOTION_STOPPED:
+    ; Hareket yeni bittiyse son konumu hemen bildir
+    BTFSS   STREAM_FLAGS, 2
+    RETURN
+    BCF     STREAM_FLAGS, 2
+    BSF     STREAM_FLAGS, 1
+    RETURN
+
 ;--- MOTOR SÜRÜCÜ ---
 STEP_CW:
     INCF    MOTOR_STEP_IDX, F
@@ -301,6 +345,10 @@ UPDATE_SCREEN:
     MOVLW   ' '
     CALL    SEND_CHAR
     
+    CALL    CALC_PERCENT
+    GOTO    SHOW_PCT
+
+CALC_PERCENT:
     ; --- YÜZDE HESABI (Ad?m / 10 = Yüzde) ---
     ; Örn: 125 Ad?m -> 125 / 10 = 12 (Tam), Kalan 5 (Ondal?k) -> %12.5
     
@@ -334,6 +382,7 @@ FINISH_CALC:
     ; Döngü bitti?inde TEMP_L içinde kalan say? (0-9) bizim ondal?k k?sm?m?zd?r!
     MOVF    TEMP_L, W
     MOVWF   DECIMAL_PART
+    RETURN
     
 SHOW_PCT:
     ; Tam K?s?m
@@ -521,6 +570,14 @@ LNG_LOOP:
 ; Protokol:
 ;   GET: 0x01=LDR, 0x02=Position(%), 0x03=Position(decimal)
 ;   SET: 0x80|value = Hedef pozisyon ayarla (0-100)
+;   0x09: Tum telemetri tek cercevede: 0xAA, uzunluk=9, curtain int,
+;         curtain frac, temp int, temp frac, press H, press L, press frac,
+;         light int, light frac, XOR checksum (uzunluk ve veri byte'lari)
+;   0x0A: Stream ac - 0x09 cercevesi ~1 sn'de bir, perde hareket ederken
+;         her %1'de ve hareket bitince kendiliginden gonderilir
+;   0x0B: Stream kapat
+; Gelen byte'lar ISR ile RX_BUF'a alinir, cevaplar TX_BUF'tan ISR ile
+; gonderilir. PC ardarda 16 komuta kadar gonderebilir.
 ;====================================================================
 UART_INIT:
     ; 9600 baud @ 4MHz
@@ -540,25 +597,39 @@ UART_INIT:
     MOVLW   b'10010000'     ; Serial enable, RX enable
     MOVWF   RCSTA
     
+    ; Halka tamponlarini sifirla
+    BANKSEL RX_HEAD
+    CLRF    RX_HEAD
+    CLRF    RX_TAIL
+    CLRF    TX_HEAD
+    CLRF    TX_TAIL
+    
+    ; Kesmeler: RCIE acik, TXIE kuyruga byte eklenince acilir
+    BANKSEL PIE1
+    BSF     PIE1, RCIE
     BANKSEL PORTA
+    BSF     INTCON, PEIE
+    BSF     INTCON, GIE
     RETURN
 
 UART_CHECK:
-    ; Veri var mi kontrol et
-    BANKSEL PIR1
-    BTFSS   PIR1, RCIF      ; RCIF set mi?
-    GOTO    UART_EXIT
-    
-    ; Overrun error kontrolu
-    BANKSEL RCSTA
-    BTFSC   RCSTA, OERR
-    GOTO    UART_CLEAR_OERR
-    
-    ; Veriyi oku
-    BANKSEL RCREG
-    MOVF    RCREG, W
-    BANKSEL UART_RX_BYTE
+    ; Halka tamponda bekleyen komut var mi?
+    BANKSEL RX_TAIL
+    MOVF    RX_TAIL, W
+    XORWF   RX_HEAD, W
+    BTFSC   STATUS, Z
+    GOTO    UART_DONE
+    
+    ; Komutu tampondan al: UART_RX_BYTE = RX_BUF[RX_TAIL]
+    BCF     STATUS, IRP
+    MOVF    RX_TAIL, W
+    ADDLW   RX_BUF
+    MOVWF   FSR
+    MOVF    INDF, W
     MOVWF   UART_RX_BYTE
+    INCF    RX_TAIL, W
+    ANDLW   0x0F
+    MOVWF   RX_TAIL
     
     ; Komut analizi
     ; Bit 7 = 1 ise SET komutu
@@ -606,6 +677,21 @@ UART_CHECK:
     BTFSC   STATUS, Z
     GOTO    CMD_GET_LIGHT_INT
     
+    MOVF    UART_RX_BYTE, W
+    XORLW   0x09            ; 0x09 = Get all (cerceveli cevap)
+    BTFSC   STATUS, Z
+    GOTO    CMD_GET_ALL
+    
+    MOVF    UART_RX_BYTE, W
+    XORLW   0x0A            ; 0x0A = Stream ac
+    BTFSC   STATUS, Z
+    GOTO    CMD_STREAM_ON
+    
+    MOVF    UART_RX_BYTE, W
+    XORLW   0x0B            ; 0x0B = Stream kapat
+    BTFSC   STATUS, Z
+    GOTO    CMD_STREAM_OFF
+    
     GOTO    UART_EXIT
 
 ; --- GET KOMUTLARI ---
@@ -664,6 +750,74 @@ CMD_GET_LIGHT_INT:
     CALL    UART_SEND_BYTE
     GOTO    UART_EXIT
 
+CMD_GET_ALL:
+    CALL    SEND_FRAME
+    GOTO    UART_EXIT
+
+CMD_STREAM_ON:
+    BANKSEL STREAM_FLAGS
+    BSF     STREAM_FLAGS, 0
+    BSF     STREAM_FLAGS, 1 ; ilk cerceveyi hemen gonder
+    GOTO    UART_EXIT
+
+CMD_STREAM_OFF:
+    BANKSEL STREAM_FLAGS
+    BCF     STREAM_FLAGS, 0
+    BCF     STREAM_FLAGS, 1
+    GOTO    UART_EXIT
+
+STREAM_CHECK:
+    ; Stream kapali ise cik
+    BANKSEL STREAM_FLAGS
+    BTFSS   STREAM_FLAGS, 0
+    RETURN
+    ; Degisiklik varsa hemen, yoksa STREAM_PERIOD dongude bir gonder
+    BTFSC   STREAM_FLAGS, 1
+    GOTO    STREAM_SEND
+    DECFSZ  STREAM_COUNT, F
+    RETURN
+STREAM_SEND:
+    BCF     STREAM_FLAGS, 1
+    MOVLW   STREAM_PERIOD
+    MOVWF   STREAM_COUNT
+    GOTO    SEND_FRAME
+
+SEND_FRAME:
+    ; Tum telemetri tek cercevede (yuzde once guncellenir)
+    CALL    CALC_PERCENT
+    MOVLW   0xAA            ; Senkron byte
+    CALL    UART_SEND_BYTE
+    BANKSEL FRAME_CHK
+    CLRF    FRAME_CHK
+    MOVLW   d'9'            ; Veri uzunlugu
+    CALL    FRAME_SEND_BYTE
+    MOVF    PERCENTAGE, W
+    CALL    FRAME_SEND_BYTE
+    MOVF    DECIMAL_PART, W
+    CALL    FRAME_SEND_BYTE
+    MOVF    OUTDOOR_TEMP_INT, W
+    CALL    FRAME_SEND_BYTE
+    MOVF    OUTDOOR_TEMP_FRAC, W
+    CALL    FRAME_SEND_BYTE
+    MOVF    OUTDOOR_PRESS_H, W
+    CALL    FRAME_SEND_BYTE
+    MOVF    OUTDOOR_PRESS_L, W
+    CALL    FRAME_SEND_BYTE
+    MOVF    OUTDOOR_PRESS_FRAC, W
+    CALL    FRAME_SEND_BYTE
+    MOVF    LIGHT_VAL, W
+    CALL    FRAME_SEND_BYTE
+    MOVLW   0x00            ; Light intensity fractional
+    CALL    FRAME_SEND_BYTE
+    MOVF    FRAME_CHK, W
+    GOTO    UART_SEND_BYTE
+
+FRAME_SEND_BYTE:
+    ; W'yi gonder ve FRAME_CHK'ye XOR'la
+    BANKSEL FRAME_CHK
+    XORWF   FRAME_CHK, F
+    GOTO    UART_SEND_BYTE
+
 ; --- SET KOMUTLARI ---
 UART_SET_CMD:
     ; Bit 6 kontrol: 0=frac, 1=int
@@ -722,29 +876,126 @@ CMD_SET_CURTAIN_INT:
     ; UART override aktif et - otomatik kontrolu devre disi birak
     MOVLW   0x01
     MOVWF   UART_OVERRIDE
+    BSF     STREAM_FLAGS, 1 ; yeni hedef - hemen bildir
     
     GOTO    UART_EXIT
 
-UART_CLEAR_OERR:
-    BANKSEL RCSTA
-    BCF     RCSTA, CREN
-    BSF     RCSTA, CREN
-    BANKSEL RCREG
-    MOVF    RCREG, W
-    GOTO    UART_EXIT
-
 UART_EXIT:
+    ; Tamponda kalan komutlari da ayni dongude isle
+    GOTO    UART_CHECK
+
+UART_DONE:
     BANKSEL PORTA
     RETURN
 
 UART_SEND_BYTE:
-    BANKSEL TXSTA
+    ; Byte'i TX kuyruguna ekle, ISR gonderir
+    BANKSEL UART_TX_BYTE
+    MOVWF   UART_TX_BYTE
 UART_TX_WAIT:
-    BTFSS   TXSTA, TRMT     ; TX buffer bos mu?
+    ; Kuyruk dolu ise ISR yer acana kadar bekle
+    INCF    TX_HEAD, W
+    ANDLW   0x0F
+    XORWF   TX_TAIL, W
+    BTFSC   STATUS, Z
     GOTO    UART_TX_WAIT
-    BANKSEL TXREG
-    MOVWF   TXREG
+    
+    ; TX_BUF[TX_HEAD] = UART_TX_BYTE
+    BCF     STATUS, IRP
+    MOVF    TX_HEAD, W
+    ADDLW   TX_BUF
+    MOVWF   FSR
+    MOVF    UART_TX_BYTE, W
+    MOVWF   INDF
+    INCF    TX_HEAD, W
+    ANDLW   0x0F
+    MOVWF   TX_HEAD
+    
+    BANKSEL PIE1
+    BSF     PIE1, TXIE
     BANKSEL PORTA
     RETURN
 
+;====================================================================
+; KESME SERVIS RUTINI (UART RX / TX)
+;====================================================================
+ISR:
+    MOVWF   W_TEMP
+    SWAPF   STATUS, W
+    CLRF    STATUS          ; Bank 0, IRP=0
+    MOVWF   STATUS_TEMP
+    MOVF    PCLATH, W
+    MOVWF   PCLATH_TEMP
+    CLRF    PCLATH
+    MOVF    FSR, W
+    MOVWF   FSR_TEMP
+
+ISR_RX:
+    BTFSS   PIR1, RCIF      ; FIFO bos ise TX'e gec
+    GOTO    ISR_TX
+    BTFSC   RCSTA, OERR
+    GOTO    ISR_CLEAR_OERR
+    
+    ; RX_BUF[RX_HEAD] = RCREG
+    MOVF    RX_HEAD, W
+    ADDLW   RX_BUF
+    MOVWF   FSR
+    MOVF    RCREG, W
+    MOVWF   INDF
+    
+    ; RX_HEAD = (RX_HEAD + 1) & 0x0F, tampon dolu ise byte atilir
+    INCF    RX_HEAD, W
+    ANDLW   0x0F
+    XORWF   RX_TAIL, W
+    BTFSC   STATUS, Z
+    GOTO    ISR_RX
+    XORWF   RX_TAIL, W      ; W = yeni RX_HEAD
+    MOVWF   RX_HEAD
+    GOTO    ISR_RX          ; FIFO'daki ikinci byte'i da al
+
+ISR_CLEAR_OERR:
+    BCF     RCSTA, CREN     ; CREN=0 OERR'i temizler
+    BSF     RCSTA, CREN
+    GOTO    ISR_RX
+
+ISR_TX:
+    BANKSEL PIE1
+    BTFSS   PIE1, TXIE      ; TXIE kapali ise gonderilecek bir sey yok
+    GOTO    ISR_EXIT
+    BANKSEL PIR1
+    BTFSS   PIR1, TXIF      ; TXREG bos mu?
+    GOTO    ISR_EXIT
+    
+    MOVF    TX_TAIL, W
+    XORWF   TX_HEAD, W
+    BTFSC   STATUS, Z
+    GOTO    ISR_TX_EMPTY
+    
+    ; TXREG = TX_BUF[TX_TAIL]
+    MOVF    TX_TAIL, W
+    ADDLW   TX_BUF
+    MOVWF   FSR
+    MOVF    INDF, W
+    MOVWF   TXREG
+    INCF    TX_TAIL, W
+    ANDLW   0x0F
+    MOVWF   TX_TAIL
+    GOTO    ISR_EXIT
+
+ISR_TX_EMPTY:
+    BANKSEL PIE1
+    BCF     PIE1, TXIE      ; Kuyruk bos - TXIE kapat
+
+ISR_EXIT:
+    BANKSEL PORTA
+    MOVF    FSR_TEMP, W
+    MOVWF   FSR
+    MOVF    PCLATH_TEMP, W
+    MOVWF   PCLATH
+    SWAPF   STATUS_TEMP, W
+    MOVWF   STATUS
+    SWAPF   W_TEMP, F
+    SWAPF   W_TEMP, W
+    RETFIE
+
     END
\ No newline at end of file
@@ -0,0 +1,391 @@
+"""
+Board Simulators
+Virtual Board 1 (Air Conditioner) and Board 2 (Curtain Control) on a Linux
+pseudo terminal
+
+The simulators answer the same bytes as main.asm and board2.asm, including
+their quirks:
+  Board 1: ambient fractional is always 0 (integer ADC value), an integral
+           SET outside 10-50 falls back to 25, fan speed is only measured
+           while the cooler runs and is refreshed every 50 main loops.
+  Board 2: temperature is fixed at 25.0 C and pressure at 1013 hPa (GET 0x06
+           returns only the LOW byte 245), the curtain percentage answered to
+           GET 0x01/0x02 is recomputed every 50 main loops, the stepper moves
+           one step (0.1 %) per main loop, an integral SET is masked to
+           6 bits and overrides the light/potentiometer target.
+
+Timing follows the firmware: bytes travel at byte_time seconds each
+(10 bits per byte at the given baud rate), and received commands are only
+handled once per main loop (loop_period seconds). With ring_firmware=False
+the simulator behaves like the firmware before the interrupt-driven ring:
+one command per main loop, a two byte receive FIFO (bytes beyond it are
+lost) and no 0x09/0x0A/0x0B commands.
+
+Usage:
+    python board_sim.py ac|curtain [--baud 9600] [--loop 0.04] [--legacy]
+Then open the printed device path, e.g. connection.setComPort("/dev/pts/5").
+"""
+
+import argparse
+import os
+import threading
+import time
+import tty
+from collections import deque
+
+
+CMD_GET_ALL = 0x09
+CMD_STREAM_ON = 0x0A
+CMD_STREAM_OFF = 0x0B
+FRAME_SYNC = 0xAA
+
+# Receive ring of the interrupt-driven firmware, one slot stays free to
+# tell full from empty
+RX_RING_SIZE = 16
+RX_RING_DEPTH = RX_RING_SIZE - 1
+# Hardware receive FIFO of the PIC16F877A USART
+RX_FIFO_DEPTH = 2
+
+
+class BoardSimulator:
+    """Pseudo terminal and UART timing shared by the virtual boards"""
+
+    # Main loop period of the firmware in seconds (~40 ms per loop)
+    LOOP_PERIOD = 0.04
+    # Main loops between two periodic stream frames
+    STREAM_PERIOD = 25
+
+    def __init__(self, baudRate: int = 9600, loop_period: float = None,
+                 byte_time: float = None, ring_firmware: bool = True):
+        self.baudRate = baudRate
+        self.loop_period = self.LOOP_PERIOD if loop_period is None else loop_period
+        self.byte_time = 10.0 / baudRate if byte_time is None else byte_time
+        self.ring_firmware = ring_firmware
+        self.rx_depth = RX_RING_DEPTH if ring_firmware else RX_FIFO_DEPTH
+        self.port = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.overruns = 0
+        self.loops = 0
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()  # board state vs. setters from other threads
+        self._wire = bytearray()       # PC bytes still travelling on the line
+        self._rx = deque()
+        self._tx = bytearray()
+        self._rx_credit = 0.0
+        self._tx_credit = 0.0
+        self._stream_on = False
+        self._stream_dirty = False
+        self._stream_count = self.STREAM_PERIOD
+
+    def start(self) -> str:
+        """Create the pseudo terminal and run the board, returns its path"""
+        if self._thread is not None:
+            return self.port
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"sim {self.port}", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        """Stop the board and remove the pseudo terminal"""
+        if self._thread is None:
+            return
+        self._running = False
+        self._thread.join(1.0)
+        self._thread = None
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self) -> None:
+        """Board thread: move bytes at line speed, run the main loop"""
+        tick = min(self.loop_period, max(self.byte_time, 0.0005))
+        last = next_loop = time.monotonic()
+        while self._running:
+            time.sleep(tick)
+            now = time.monotonic()
+            elapsed, last = now - last, now
+            self._receive(elapsed)
+            if now >= next_loop:
+                next_loop = max(next_loop + self.loop_period, now)
+                with self._lock:
+                    self._main_loop()
+            self._transmit(elapsed)
+
+    def _receive(self, elapsed: float) -> None:
+        """Deliver PC bytes into the receive buffer at byte_time each"""
+        try:
+            self._wire += os.read(self._master, 4096)
+        except (BlockingIOError, OSError):
+            pass
+        if not self._wire:
+            self._rx_credit = 0.0
+            return
+        self._rx_credit += elapsed / self.byte_time
+        count = min(int(self._rx_credit), len(self._wire))
+        self._rx_credit -= count
+        for byte in self._wire[:count]:
+            self.bytes_in += 1
+            if len(self._rx) < self.rx_depth:
+                self._rx.append(byte)
+            else:
+                self.overruns += 1  # buffer full, the byte is lost
+        del self._wire[:count]
+
+    def _transmit(self, elapsed: float) -> None:
+        """Send queued reply bytes at byte_time each"""
+        if not self._tx:
+            self._tx_credit = 0.0
+            return
+        self._tx_credit += elapsed / self.byte_time
+        count = min(int(self._tx_credit), len(self._tx))
+        if count:
+            # Count before writing: the PC may act on the bytes before
+            # os.write() returns to this thread
+            self.bytes_out += count
+            try:
+                written = os.write(self._master, bytes(self._tx[:count]))
+            except (BlockingIOError, OSError):
+                written = 0
+            self.bytes_out -= count - written
+            self._tx_credit -= written
+            del self._tx[:written]
+
+    def _main_loop(self) -> None:
+        """One pass of the firmware main loop"""
+        self.loops += 1
+        # The ring firmware drains every queued command, the old firmware
+        # handled one received byte per loop
+        while self._rx:
+            self._command(self._rx.popleft())
+            if not self.ring_firmware:
+                break
+        self._stream_check()
+        self.step()
+
+    def _command(self, byte: int) -> None:
+        """Decode one received command byte"""
+        if byte & 0x80:
+            self.set_value(bool(byte & 0x40), byte & 0x3F)
+        elif self.ring_firmware and byte == CMD_GET_ALL:
+            self._send_frame()
+        elif self.ring_firmware and byte == CMD_STREAM_ON:
+            self._stream_on = True
+            self._stream_dirty = True
+        elif self.ring_firmware and byte == CMD_STREAM_OFF:
+            self._stream_on = False
+            self._stream_dirty = False
+        else:
+            reply = self.get_value(byte)
+            if reply is not None:
+                self._tx.append(reply & 0xFF)
+
+    def _stream_check(self) -> None:
+        """Push a frame on change or every STREAM_PERIOD loops"""
+        if not self._stream_on:
+            return
+        if not self._stream_dirty:
+            self._stream_count -= 1
+            if self._stream_count:
+                return
+        self._stream_dirty = False
+        self._stream_count = self.STREAM_PERIOD
+        self._send_frame()
+
+    def _send_frame(self) -> None:
+        """Queue the CMD_GET_ALL frame"""
+        payload = bytes(self.frame_payload())
+        checksum = len(payload)
+        for byte in payload:
+            checksum ^= byte
+        self._tx += bytes([FRAME_SYNC, len(payload)]) + payload + bytes([checksum])
+
+    def get_value(self, cmd: int):
+        """Reply byte of a GET command, None for unknown commands"""
+        raise NotImplementedError
+
+    def set_value(self, integral: bool, value: int) -> None:
+        """Apply a 6-bit SET command, marks the stream dirty if the firmware does"""
+        raise NotImplementedError
+
+    def frame_payload(self) -> list:
+        """Fields of the CMD_GET_ALL frame"""
+        raise NotImplementedError
+
+    def step(self) -> None:
+        """Sensor and actuator work of one main loop"""
+
+
+class Board1Simulator(BoardSimulator):
+    """Virtual Air Conditioner board (main.asm)"""
+
+    def __init__(self, ambient: int = 25, fan_rps: int = 42, **kwargs):
+        super().__init__(**kwargs)
+        self.target_val = 25
+        self.target_decimal = 0
+        self.ambient = ambient  # adc_val, whole degrees
+        self.fan_rps = fan_rps  # tachometer reading while the cooler runs
+        self.fan_speed = 0
+        self._timer_tick = 0
+
+    def setAmbient(self, ambient: int) -> None:
+        """Change the simulated ambient temperature"""
+        with self._lock:
+            self.ambient = int(ambient)
+
+    def get_value(self, cmd: int):
+        return {
+            0x01: self.target_decimal,
+            0x02: self.target_val,
+            0x03: 0,  # no fractional part in the ADC value
+            0x04: self.ambient,
+            0x05: self.fan_speed,
+        }.get(cmd)
+
+    def set_value(self, integral: bool, value: int) -> None:
+        self._stream_dirty = True
+        if not integral:
+            self.target_decimal = value
+        elif 10 <= value <= 50:
+            self.target_val = value
+        else:
+            self.target_val = 25
+
+    def frame_payload(self) -> list:
+        return [self.target_val, self.target_decimal, self.ambient, 0, self.fan_speed]
+
+    def step(self) -> None:
+        # Cooler runs while ambient is above the target, the fan tachometer
+        # is sampled every 50 loops and read as 0 while the cooler is off
+        if self.ambient <= self.target_val:
+            self.fan_speed = 0
+            return
+        self._timer_tick += 1
+        if self._timer_tick == 50:
+            self._timer_tick = 0
+            if self.fan_speed != self.fan_rps:
+                self._stream_dirty = True
+            self.fan_speed = self.fan_rps
+
+
+class Board2Simulator(BoardSimulator):
+    """Virtual Curtain Control board (board2.asm)"""
+
+    # 100 % closed curtain in stepper steps
+    FULL_STEPS = 1000
+    LIGHT_THRESHOLD = 100
+
+    def __init__(self, light: int = 150, pot: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.light = light  # LDR ADC value
+        self.pot = pot      # potentiometer ADC value
+        self.position = 0
+        self.target = 0
+        self.uart_override = False
+        self.desired_frac = 0
+        self.percentage = 0
+        self.decimal_part = 0
+        self._moving = False
+        self._stream_steps = 10
+        self._loop_counter = 50
+
+    def setLight(self, light: int) -> None:
+        """Change the simulated LDR reading"""
+        with self._lock:
+            self.light = int(light)
+
+    def get_value(self, cmd: int):
+        return {
+            0x01: self.decimal_part,
+            0x02: self.percentage,
+            0x03: 0,
+            0x04: 25,
+            0x05: 0,
+            0x06: 245,  # LOW byte of 1013 only
+            0x07: 0,
+            0x08: self.light,
+        }.get(cmd)
+
+    def set_value(self, integral: bool, value: int) -> None:
+        if not integral:
+            self.desired_frac = value  # stored, not used for the position
+            return
+        self.target = value * 10
+        self.uart_override = True
+        self._stream_dirty = True
+
+    def frame_payload(self) -> list:
+        self._calc_percent()
+        return [self.percentage, self.decimal_part, 25, 0, 3, 245, 0, self.light, 0]
+
+    def step(self) -> None:
+        if not self.uart_override:
+            if self.light <= self.LIGHT_THRESHOLD:
+                self.target = self.FULL_STEPS  # dark: close
+            else:
+                self.target = min(self.pot * 4, self.FULL_STEPS)
+
+        if self.position != self.target:
+            self._moving = True
+            self._stream_steps -= 1
+            if not self._stream_steps:
+                self._stream_steps = 10
+                self._stream_dirty = True
+            self.position += 1 if self.target > self.position else -1
+        elif self._moving:
+            self._moving = False
+            self._stream_dirty = True
+
+        self._loop_counter -= 1
+        if not self._loop_counter:
+            self._loop_counter = 50
+            self._calc_percent()
+
+    def _calc_percent(self) -> None:
+        self.percentage, self.decimal_part = divmod(self.position, 10)
+
+
+SIMULATORS = {
+    "ac": Board1Simulator,
+    "curtain": Board2Simulator,
+}
+
+
+def main():
+    """Run one virtual board until interrupted"""
+    parser = argparse.ArgumentParser(description="Virtual Board 1 / Board 2 on a pty")
+    parser.add_argument("board", choices=sorted(SIMULATORS))
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--loop", type=float, default=None, help="main loop period (s)")
+    parser.add_argument("--legacy", action="store_true",
+                        help="firmware without the RX ring and 0x09-0x0B")
+    args = parser.parse_args()
+
+    simulator = SIMULATORS[args.board](baudRate=args.baud, loop_period=args.loop,
+                                       ring_firmware=not args.legacy)
+    print(f"{args.board} board on {simulator.start()}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Connection Registry
+One open connection and one poll thread per serial port, shared by views
+
+The main menu windows and the standalone board apps used to open their own
+connection, each with its own polling thread on the same port. acquire()
+instead returns a reference-counted handle to the connection of that port:
+the first view opens the port and starts the poll loop (update() then
+waitNextPoll(), as the apps did), later views share both, and the port is
+closed when the last handle is released. Views see new samples through
+connection.subscribe(); SET writes from any view go through the port's
+single SerialWorker, so they never race on the board.
+
+Usage:
+    handle = registry.acquire(AirConditionerSystemConnection, "COM3")
+    if handle is not None:
+        subscription = handle.connection.subscribe(callback=show)
+        ...
+        handle.connection.unsubscribe(subscription)
+        handle.release()
+"""
+
+import threading
+
+from app_logging import get_logger
+
+log = get_logger("registry")
+
+
+class ConnectionHandle:
+    """One view's reference to a shared connection, release() exactly once"""
+
+    def __init__(self, registry, port: str, connection):
+        self.registry = registry
+        self.port = port
+        self.connection = connection
+        self.released = False
+
+    def release(self) -> None:
+        """Drop this reference, the last one closes the port"""
+        if not self.released:
+            self.released = True
+            self.registry._release(self.port)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _Entry:
+    __slots__ = ("connection", "refs", "poller", "closing")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.refs = 0
+        self.poller = None
+        self.closing = None  # Event set once the released port is closed
+
+
+class ConnectionRegistry:
+    """Process-wide map of port -> shared connection and its poller"""
+
+    # Seconds release() waits for the poll thread to finish its update()
+    JOIN_TIMEOUT = 2.0
+
+    def __init__(self, poll: bool = True):
+        """poll=False leaves polling to the caller (tests, FleetPoller)"""
+        self.poll = poll
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, connection_class, port: str, baud_rate: int = 9600,
+                connection=None):
+        """Handle to the connection of port, None if the port fails to open.
+
+        The first acquire() of a port opens it, using connection (an instance
+        of connection_class) if given and not open, else a new instance. Raises
+        ValueError if the port is already open for another board class.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(port)
+                if entry is None or entry.closing is None:
+                    return self._acquire(entry, connection_class, port, baud_rate, connection)
+                closing = entry.closing
+            # The last view released the port, reopen it once it is closed
+            closing.wait()
+
+    def _acquire(self, entry, connection_class, port: str, baud_rate: int, connection):
+        """acquire() with the lock held and no close of port in progress"""
+        if entry is None:
+            if connection is None or connection.is_connected():
+                # An open connection belongs to another port
+                connection = connection_class()
+            elif not isinstance(connection, connection_class):
+                raise ValueError(f"{connection!r} is not a {connection_class.__name__}")
+            connection.setComPort(port)
+            connection.setBaudRate(baud_rate)
+            if not connection.open():
+                return None
+            entry = self._entries[port] = _Entry(connection)
+            if self.poll:
+                entry.poller = threading.Thread(target=self._poll_loop, args=(connection,),
+                                                name=f"poll-{port}", daemon=True)
+                entry.poller.start()
+        elif not isinstance(entry.connection, connection_class):
+            raise ValueError(f"{port} is open as {type(entry.connection).__name__}")
+        elif entry.connection.baudRate != baud_rate:
+            log.warning("%s is shared at %s baud, ignoring %s",
+                        port, entry.connection.baudRate, baud_rate)
+        entry.refs += 1
+        return ConnectionHandle(self, port, entry.connection)
+
+    def get(self, port: str):
+        """Shared connection of port, None if it is not open"""
+        with self._lock:
+            entry = self._entries.get(port)
+            return entry.connection if entry is not None and entry.closing is None else None
+
+    def refcount(self, port: str) -> int:
+        with self._lock:
+            entry = self._entries.get(port)
+            return entry.refs if entry is not None else 0
+
+    def ports(self) -> list:
+        with self._lock:
+            return [port for port, entry in self._entries.items() if entry.closing is None]
+
+    def _release(self, port: str) -> None:
+        with self._lock:
+            entry = self._entries.get(port)
+            if entry is None or entry.closing is not None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            # The entry keeps the port reserved: acquire() of this port waits
+            # for closing, other ports and the getters are not held up
+            entry.closing = threading.Event()
+        log.info("Last view of %s released, closing", port)
+        try:
+            entry.connection.close()
+            poller = entry.poller
+            if poller is not None and poller is not threading.current_thread():
+                poller.join(self.JOIN_TIMEOUT)
+        finally:
+            with self._lock:
+                del self._entries[port]
+            entry.closing.set()
+
+    @staticmethod
+    def _poll_loop(connection) -> None:
+        """The one update loop of a port, ends when the connection closes"""
+        while connection._is_running:
+            try:
+                connection.update()
+            except Exception as e:
+                log.error("Poll error on %s: %s", connection.comPort, e)
+            connection.waitNextPoll()
+
+
+# Shared by every window of the process
+registry = ConnectionRegistry()
@@ -13,6 +13,9 @@ PC -> PIC Commands:
   0x06 = Get outdoor pressure high byte (integral)
   0x07 = Get light intensity low byte (fractional)
   0x08 = Get light intensity high byte (integral)
+  0x09 = Get all fields in one frame (newer firmware)
+  0x0A = Start streaming the 0x09 frame (periodic and on change)
+  0x0B = Stop streaming
   10xxxxxx = Set desired curtain status low byte (fractional)
   11xxxxxx = Set desired curtain status high byte (integral)
 """
@@ -21,8 +24,24 @@ import serial
 import serial.tools.list_ports
 import tkinter as tk
 from tkinter import ttk, messagebox
+import struct
 import threading
 import time
+from concurrent.futures import Future
+
+from serial_worker import SerialWorker, PRIORITY_GET, PRIORITY_SET, completed_future
+from adaptive_poll import AdaptivePollInterval
+from instrumentation import ConnectionInstruments, SET_KEY, format_snapshot
+from app_logging import get_logger, setup_logging
+from telemetry_history import TelemetryHistory
+from telemetry_snapshot import TelemetrySnapshot, SnapshotField
+from subscriptions import Subscription, changed
+from uart_trace import TraceWriter, TracingSerial
+from trend_chart import TrendPanel
+from ui_dispatcher import UiDispatcher, TextBindings
+from connection_registry import registry
+
+log = get_logger("board2")
 
 
 # Command constants per specification
@@ -35,47 +54,141 @@ CMD_GET_PRESS_INT = 0x06
 CMD_GET_LIGHT_FRAC = 0x07
 CMD_GET_LIGHT_INT = 0x08
 
+# Bulk GET: the board answers with one frame holding every readable field
+#   0xAA, length, payload[length], checksum (XOR of length and payload)
+CMD_GET_ALL = 0x09
+FRAME_SYNC = 0xAA
+
+# Streaming: the board pushes the CMD_GET_ALL frame periodically and on change
+CMD_STREAM_ON = 0x0A
+CMD_STREAM_OFF = 0x0B
+
+# Size of the interrupt-driven UART receive ring in the firmware. The ring
+# keeps one slot free to tell full from empty (head + 1 == tail), so boards
+# running that firmware accept RX_RING_SIZE - 1 outstanding commands, see
+# setPipelineDepth().
+RX_RING_SIZE = 16
+RX_RING_DEPTH = RX_RING_SIZE - 1
+
+# GET sequence sent by update(), in the order the replies are decoded
+POLL_SEQUENCE = (
+    CMD_GET_CURTAIN_INT, CMD_GET_CURTAIN_FRAC,
+    CMD_GET_TEMP_INT, CMD_GET_TEMP_FRAC,
+    CMD_GET_PRESS_INT, CMD_GET_PRESS_FRAC,
+    CMD_GET_LIGHT_INT, CMD_GET_LIGHT_FRAC,
+)
+
+# Telemetry fields and their GET commands, in POLL_SEQUENCE order
+POLL_FIELDS = (
+    ('curtain', (CMD_GET_CURTAIN_INT, CMD_GET_CURTAIN_FRAC)),
+    ('temperature', (CMD_GET_TEMP_INT, CMD_GET_TEMP_FRAC)),
+    ('pressure', (CMD_GET_PRESS_INT, CMD_GET_PRESS_FRAC)),
+    ('light', (CMD_GET_LIGHT_INT, CMD_GET_LIGHT_FRAC)),
+)
+
+# CMD_GET_ALL payload: curtain int/frac, temp int/frac, 16-bit pressure,
+# pressure frac, light int/frac
+TELEMETRY_FRAME = struct.Struct('>BBBBHBBB')
+
+
+def _frame_checksum(data) -> int:
+    """XOR checksum over the frame length byte and payload"""
+    checksum = 0
+    for byte in data:
+        checksum ^= byte
+    return checksum
+
 
 class HomeAutomationSystemConnection:
     """Base class for serial communication with boards"""
     
+    # Number of GET commands that may be in flight at once. The default of 1
+    # keeps the strict one-byte request/response exchange.
+    PIPELINE_DEPTH = 1
+    # Seconds to wait for each response byte
+    RESPONSE_TIMEOUT = 0.1
+    # struct layout of the CMD_GET_ALL payload, set by each board class
+    TELEMETRY_FRAME = None
+    # Seconds a blocking SET call waits for its queued write
+    SET_TIMEOUT = 2.0
+    # Bounds of the adaptive update period in seconds, see waitNextPoll()
+    POLL_MIN_PERIOD = 0.25
+    POLL_MAX_PERIOD = 8.0
+    # Per-field change treated as noise by the adaptive period, set by each
+    # board class in HISTORY_FIELDS order
+    POLL_TOLERANCE = None
+    # Names of the values passed to _record_sample(), set by each board class
+    HISTORY_FIELDS = ()
+    # Samples kept in memory per connection (one day at one update a second)
+    HISTORY_CAPACITY = 86400
+    
     def __init__(self):
         self.comPort = None
         self.baudRate = 9600
         self.serial_connection = None
         self._is_running = False
+        self.pipelineDepth = self.PIPELINE_DEPTH
+        self._frame_supported = None  # None = not probed yet
+        self._streaming = False
+        self._stream_thread = None
+        self._worker = None  # owns all port I/O while open
+        self.pollInterval = AdaptivePollInterval(
+            self.POLL_MIN_PERIOD, self.POLL_MAX_PERIOD, tolerance=self.POLL_TOLERANCE)
+        self.instruments = None  # ConnectionInstruments while enabled
+        self.history = TelemetryHistory(self.HISTORY_FIELDS, self.HISTORY_CAPACITY)
+        # Latest sample, replaced (never modified) by every update
+        self.snapshot = TelemetrySnapshot(self.HISTORY_FIELDS, (0,) * len(self.HISTORY_FIELDS))
+        self._subscriptions = ()  # replaced, never modified, under _subscription_lock
+        self._subscription_lock = threading.Lock()
+        self.recorder = None     # TelemetryRecorder appending every sample to disk
+        self.transport = None    # serial-like object used instead of comPort
     
     def open(self) -> bool:
         """Initiate connection to the Board via UART port"""
         try:
-            if self.comPort is None:
+            if self.transport is not None:
+                log.info("Opening %s", self.transport)
+                if not self.transport.is_open:
+                    self.transport.open()
+                self.serial_connection = self.transport
+            elif self.comPort is None:
                 return False
-            print(f"[DEBUG] Opening {self.comPort} at {self.baudRate} baud")
-            self.serial_connection = serial.Serial(
-                port=self.comPort,
-                baudrate=self.baudRate,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE,
-                timeout=0.1
-            )
+            else:
+                log.info("Opening %s at %s baud", self.comPort, self.baudRate)
+                self.serial_connection = serial.Serial(
+                    port=self.comPort,
+                    baudrate=self.baudRate,
+                    bytesize=serial.EIGHTBITS,
+                    parity=serial.PARITY_NONE,
+                    stopbits=serial.STOPBITS_ONE,
+                    timeout=0.1
+                )
             self.serial_connection.reset_input_buffer()
             self.serial_connection.reset_output_buffer()
+            self._frame_supported = None
+            self._worker = SerialWorker(f"{self.comPort} I/O")
+            self._worker.start()
             self._is_running = True
             return True
         except serial.SerialException as e:
-            print(f"Connection error: {e}")
+            log.error("Connection error: %s", e)
             return False
     
     def close(self) -> bool:
         """Closes the connection to the board"""
         try:
             self._is_running = False
+            self._streaming = False
+            self.pollInterval.reset()  # let the update loop exit now
+            if self._worker is not None:
+                self._worker.stop()
+                self._worker = None
+            self.stopTrace()
             if self.serial_connection and self.serial_connection.is_open:
                 self.serial_connection.close()
             return True
         except Exception as e:
-            print(f"Close error: {e}")
+            log.error("Close error: %s", e)
             return False
     
     def setComPort(self, port: int) -> None:
@@ -89,110 +202,597 @@ class HomeAutomationSystemConnection:
         """Set the communication baudrate"""
         self.baudRate = rate
     
+    def setTransport(self, transport) -> None:
+        """Make open() use a serial-like object (e.g. replay.ReplaySerial)
+        instead of opening comPort, None to go back to the port"""
+        self.transport = transport
+    
+    def setPollPeriods(self, min_period: float, max_period: float) -> None:
+        """Set the fastest and slowest adaptive update period in seconds"""
+        self.pollInterval.setPeriods(min_period, max_period)
+    
+    def waitNextPoll(self) -> None:
+        """Sleep until the next update() is due.
+        
+        The period is short while values change and doubles with every
+        unchanged sample up to POLL_MAX_PERIOD. A SET write ends the wait
+        at once so the board's reaction is sampled at the fastest rate.
+        """
+        self.pollInterval.wait()
+    
+    def _record_sample(self, state, fields=None) -> None:
+        """Publish one decoded sample, store it in history and feed the adaptive period.
+        
+        fields names the values read from the board for this sample (all if
+        None); the snapshot marks the others as repeated, see subscriptions.
+        """
+        timestamp_ns = time.monotonic_ns()
+        # A single reference swap: readers see all of this sample or none of it
+        self.snapshot = TelemetrySnapshot.from_values(
+            self.HISTORY_FIELDS, state, timestamp_ns, self.snapshot.seq + 1, fields)
+        self.history.append(timestamp_ns, state)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.append(time.time_ns(), state)
+        self.pollInterval.observe(state)
+        for subscription in self._subscriptions:
+            subscription.offer(self.snapshot)
+    
+    def getSnapshot(self) -> TelemetrySnapshot:
+        """Latest sample as one consistent, immutable TelemetrySnapshot"""
+        return self.snapshot
+    
+    def subscribe(self, predicate=None, maxsize: int = 64, overflow: str = "drop_oldest",
+                  callback=None, block_timeout: float = 0.5) -> Subscription:
+        """Receive the snapshots matching predicate, see subscriptions.py.
+        
+        predicate defaults to changed(): any field differs from the last
+        snapshot delivered. Snapshots are queued (read them with get() or by
+        iterating) or, with a callback, passed to it on the update thread.
+        """
+        subscription = Subscription(predicate or changed(), maxsize, overflow,
+                                    callback, block_timeout)
+        with self._subscription_lock:
+            self._subscriptions += (subscription,)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering to subscription and close it"""
+        with self._subscription_lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+        subscription.close()
+    
+    def setRecorder(self, recorder) -> None:
+        """Record every sample to a TelemetryRecorder, None to stop"""
+        if recorder is not None and tuple(recorder.fields) != self.HISTORY_FIELDS:
+            raise ValueError(f"recorder fields {recorder.fields} do not match {self.HISTORY_FIELDS}")
+        self.recorder = recorder
+    
+    def enableInstrumentation(self, enabled: bool = True) -> None:
+        """Start or stop recording per-command latency, timeouts and bytes"""
+        if not enabled:
+            self.instruments = None
+        elif self.instruments is None:
+            self.instruments = ConnectionInstruments()
+    
+    def getInstrumentation(self) -> dict:
+        """Per-command statistics, empty while instrumentation is off"""
+        instruments = self.instruments
+        return instruments.snapshot() if instruments is not None else {}
+    
+    def startTrace(self, path: str) -> bool:
+        """Record every byte on the open port to a trace file, see uart_trace"""
+        if not self.is_connected():
+            return False
+        self.stopTrace()
+        writer = TraceWriter(path, type(self).__name__, self.baudRate, self.RESPONSE_TIMEOUT)
+        # Swapped on the I/O thread, between two transactions, so no
+        # exchange is split across the raw port and the tracing wrapper
+        self._run_io(self._wrap_port, writer)
+        log.info("Tracing %s to %s", self.comPort, path)
+        return True
+    
+    def stopTrace(self) -> None:
+        """Stop tracing and close the trace file"""
+        writer = self._run_io(self._unwrap_port)
+        if writer is not None:
+            writer.close()
+    
+    def _wrap_port(self, writer) -> None:
+        """Route the port through a TracingSerial (runs on the I/O thread)"""
+        self.serial_connection = TracingSerial(self.serial_connection, writer)
+    
+    def _unwrap_port(self):
+        """Back to the raw port (runs on the I/O thread), returns the TraceWriter"""
+        port = self.serial_connection
+        if not isinstance(port, TracingSerial):
+            return None
+        self.serial_connection = port.port
+        return port.writer
+    
+    def setPipelineDepth(self, depth: int) -> None:
+        """Set how many GET commands may be outstanding at once"""
+        self.pipelineDepth = max(1, int(depth))
+    
     def is_connected(self) -> bool:
         """Check if connection is active"""
         return self.serial_connection is not None and self.serial_connection.is_open
     
+    def _run_io(self, fn, *args, priority: int = PRIORITY_GET):
+        """Run fn(*args) on the port's I/O thread and wait for the result"""
+        worker = self._worker
+        if worker is None or worker.is_worker_thread():
+            return fn(*args)
+        return worker.submit(fn, *args, priority=priority).result()
+    
+    def _submit_write(self, data: bytes) -> Future:
+        """Queue a SET write ahead of pending polls, resolves to a bool"""
+        self.pollInterval.reset()
+        worker = self._worker
+        if worker is None:
+            return completed_future(self._write(data))
+        return worker.submit(self._write, data, priority=PRIORITY_SET)
+    
+    def _write(self, data: bytes) -> bool:
+        """Write and flush data (runs on the I/O thread)"""
+        instruments = self.instruments
+        key = SET_KEY if data[0] & 0x80 else data[0]
+        started = time.perf_counter()
+        try:
+            self.serial_connection.write(data)
+            self.serial_connection.flush()
+        except Exception as e:
+            log.error("Write error: %s", e)
+            if instruments is not None:
+                instruments.record_error(key)
+            return False
+        if instruments is not None:
+            instruments.record(key, time.perf_counter() - started, len(data), 0)
+        return True
+    
     def _send_command(self, cmd: int) -> int:
         """Send a command byte and receive response"""
         if not self.is_connected():
             return 0
         
         try:
-            self.serial_connection.write(bytes([cmd]))
-            response = self.serial_connection.read(1)
-            if response:
-                return response[0]
-            return 0
+            return self._run_io(self._transact, cmd)
         except Exception as e:
-            print(f"Command error: {e}")
+            log.error("Command error: %s", e)
+            if self.instruments is not None:
+                self.instruments.record_error(cmd)
             return 0
+    
+    def _transact(self, cmd: int) -> int:
+        """Write one command and read its reply (runs on the I/O thread)"""
+        started = time.perf_counter()
+        self.serial_connection.write(bytes([cmd]))
+        response = self.serial_connection.read(1)
+        if self.instruments is not None:
+            self.instruments.record(cmd, time.perf_counter() - started,
+                                    1, len(response), not response)
+        if response:
+            return response[0]
+        return 0
+    
+    def _send_burst(self, cmds) -> list:
+        """Send GET commands pipelined and receive all responses in order.
+        
+        Commands are written in chunks of pipelineDepth bytes with a single
+        write per chunk, and the replies of each chunk are collected with one
+        bulk read. Missing replies are returned as 0, like _send_command().
+        """
+        cmds = list(cmds)
+        if not self.is_connected():
+            return [0] * len(cmds)
+        
+        try:
+            return self._run_io(self._transact_burst, cmds)
+        except Exception as e:
+            log.error("Burst error: %s", e)
+            return [0] * len(cmds)
+    
+    def _transact_burst(self, cmds: list) -> list:
+        """Pipelined exchange for _send_burst() (runs on the I/O thread)"""
+        responses = []
+        instruments = self.instruments
+        try:
+            for start in range(0, len(cmds), self.pipelineDepth):
+                chunk = cmds[start:start + self.pipelineDepth]
+                started = time.perf_counter()
+                self.serial_connection.write(bytes(chunk))
+                data = self._read_exact(len(chunk))
+                if instruments is not None:
+                    # Pipelined commands share the round trip of their chunk
+                    rtt = time.perf_counter() - started
+                    for position, cmd in enumerate(chunk):
+                        replied = position < len(data)
+                        instruments.record(cmd, rtt, 1, int(replied), not replied)
+                if len(data) < len(chunk):
+                    # Drop late replies so they are not taken as answers
+                    # to the next chunk
+                    self.serial_connection.reset_input_buffer()
+                responses.extend(data)
+                responses.extend([0] * (len(chunk) - len(data)))
+        except Exception as e:
+            log.error("Burst error: %s", e)
+            if instruments is not None:
+                for cmd in cmds[len(responses):]:
+                    instruments.record_error(cmd)
+        responses.extend([0] * (len(cmds) - len(responses)))
+        return responses
+    
+    def _request_frame(self, layout: struct.Struct):
+        """Send CMD_GET_ALL and decode the framed reply with layout.
+        
+        Returns the unpacked payload, or None if no valid frame arrived.
+        """
+        started = time.perf_counter()
+        self.serial_connection.write(bytes([CMD_GET_ALL]))
+        header = self._read_exact(2)
+        body = b''
+        values = None
+        if len(header) == 2 and header[0] == FRAME_SYNC and header[1] == layout.size:
+            body = self._read_exact(layout.size + 1)
+            if len(body) == layout.size + 1:
+                if _frame_checksum(header[1:] + body[:-1]) == body[-1]:
+                    values = layout.unpack_from(body)
+        if self.instruments is not None:
+            self.instruments.record(CMD_GET_ALL, time.perf_counter() - started,
+                                    1, len(header) + len(body), values is None)
+        if values is None:
+            self.serial_connection.reset_input_buffer()
+        return values
+    
+    def _poll_frame(self, layout: struct.Struct):
+        """Poll all fields with one bulk request if the firmware supports it.
+        
+        Firmware without CMD_GET_ALL ignores it; after the first unanswered
+        probe this returns None without touching the port, and callers fall
+        back to the per-byte GET commands.
+        """
+        if self._frame_supported is False or not self.is_connected():
+            return None
+        try:
+            values = self._run_io(self._request_frame, layout)
+        except Exception as e:
+            log.error("Frame error: %s", e)
+            values = None
+        if values is None:
+            if self._frame_supported is None:
+                self._frame_supported = False
+            return None
+        if not self._frame_supported:
+            # Frame-capable firmware also has the interrupt-driven RX ring
+            self._frame_supported = True
+            self.setPipelineDepth(max(self.pipelineDepth, RX_RING_DEPTH))
+        return values
+    
+    def startStreaming(self) -> bool:
+        """Ask the board to push telemetry frames and decode them passively.
+        
+        While streaming, update() does not poll; a reader thread applies
+        each frame as it arrives.
+        """
+        if not self.is_connected():
+            return False
+        if self._streaming:
+            return True
+        try:
+            self._run_io(self.serial_connection.reset_input_buffer, priority=PRIORITY_SET)
+            started = self._submit_write(bytes([CMD_STREAM_ON])).result()
+        except Exception as e:
+            log.error("Stream start error: %s", e)
+            return False
+        if not started:
+            return False
+        self._streaming = True
+        self._stream_thread = threading.Thread(target=self._stream_loop, daemon=True)
+        self._stream_thread.start()
+        return True
+    
+    def stopStreaming(self) -> bool:
+        """Stop pushed telemetry and return to polling in update()"""
+        if not self._streaming:
+            return True
+        self._streaming = False
+        if self._stream_thread is not None:
+            self._stream_thread.join(timeout=1.0)
+            self._stream_thread = None
+        if not self.is_connected():
+            return True
+        try:
+            stopped = self._submit_write(bytes([CMD_STREAM_OFF])).result()
+            self._run_io(self.serial_connection.reset_input_buffer, priority=PRIORITY_SET)
+            return stopped
+        except Exception as e:
+            log.error("Stream stop error: %s", e)
+            return False
+    
+    def is_streaming(self) -> bool:
+        """Check if the board is pushing telemetry frames"""
+        return self._streaming
+    
+    def _stream_loop(self) -> None:
+        """Reader thread: find, verify and apply pushed frames.
+        
+        Only this thread reads while streaming; writes still go through
+        the I/O thread.
+        """
+        layout = self.TELEMETRY_FRAME
+        frame_len = layout.size + 3
+        buffer = bytearray()
+        while self._streaming and self.is_connected():
+            try:
+                buffer += self.serial_connection.read(
+                    max(1, self.serial_connection.in_waiting))
+            except Exception as e:
+                log.error("Stream error: %s", e)
+                break
+            while len(buffer) >= frame_len:
+                start = buffer.find(FRAME_SYNC)
+                if start < 0:
+                    buffer.clear()
+                    break
+                del buffer[:start]
+                if len(buffer) < frame_len:
+                    break
+                if (buffer[1] == layout.size and
+                        _frame_checksum(buffer[1:frame_len - 1]) == buffer[frame_len - 1]):
+                    self._apply_values(layout.unpack_from(buffer, 2))
+                    del buffer[:frame_len]
+                else:
+                    # False sync byte inside other data, resync after it
+                    del buffer[0]
+        self._streaming = False
+    
+    def _apply_values(self, values) -> None:
+        """Store one decoded sample, implemented by each board class"""
+        raise NotImplementedError
+    
+    def _read_exact(self, count: int) -> bytes:
+        """Read up to count bytes, allowing RESPONSE_TIMEOUT per byte"""
+        data = bytearray()
+        deadline = time.monotonic() + self.RESPONSE_TIMEOUT * count
+        while len(data) < count and time.monotonic() < deadline:
+            data += self.serial_connection.read(count - len(data))
+        return bytes(data)
 
 
 class CurtainControlSystemConnection(HomeAutomationSystemConnection):
     """Class for Curtain Control (Board 2) communication"""
     
+    # Firmware without the RX ring polls RCIF once per main loop, so only the
+    # two-byte hardware receive FIFO can absorb outstanding commands. Raised
+    # to RX_RING_DEPTH once the board answers CMD_GET_ALL.
+    PIPELINE_DEPTH = 2
+    TELEMETRY_FRAME = TELEMETRY_FRAME
+    HISTORY_FIELDS = ('curtain', 'temperature', 'pressure', 'light')
+    # Curtain status, outdoor temp (0.1 C jitter), pressure, light (1 Lux)
+    POLL_TOLERANCE = (0.0, 0.15, 1.0, 1.0)
+    # Minimum seconds between two reads of each POLL_FIELDS entry. update()
+    # only requests the fields that are due. board2.asm reports a fixed
+    # pressure and temperature moves slowly, so both are read rarely.
+    FIELD_PERIODS = {
+        'curtain': 0.25,
+        'temperature': 10.0,
+        'pressure': 60.0,
+        'light': 0.25,
+    }
+    # While the stepper walks toward a commanded status, curtain status is
+    # polled every TRACK_PERIOD seconds until it is within TRACK_TOLERANCE
+    # percent of the target, or TRACK_TIMEOUT seconds have passed.
+    TRACK_PERIOD = 0.1
+    TRACK_TOLERANCE = 0.5
+    TRACK_TIMEOUT = 60.0
+    
+    # Views of the current snapshot
+    curtainStatus = SnapshotField('curtain')
+    outdoorTemperature = SnapshotField('temperature')
+    outdoorPressure = SnapshotField('pressure')
+    lightIntensity = SnapshotField('light')
+    
     def __init__(self):
         super().__init__()
-        self.curtainStatus = 0.0
-        self.outdoorTemperature = 0.0
-        self.outdoorPressure = 0.0
-        self.lightIntensity = 0.0
         self._update_callback = None
+        self.fieldPeriods = dict(self.FIELD_PERIODS)
+        self._field_due = dict.fromkeys(self.fieldPeriods, 0.0)
+        self._raw_values = [0] * len(POLL_SEQUENCE)  # last reply per command
+        self._motion = None  # (target, deadline, Future) while moving
+        self._motion_lock = threading.Lock()
+    
+    def close(self) -> bool:
+        """Closes the connection to the board"""
+        self._finish_motion(self._motion, False)
+        return super().close()
+    
+    def setFieldPeriod(self, field: str, period: float) -> None:
+        """Set the refresh period of one field ('curtain', 'temperature',
+        'pressure' or 'light'), the field is read again on the next update()"""
+        if field not in self.fieldPeriods:
+            raise ValueError(f"Unknown field: {field}")
+        self.fieldPeriods[field] = max(0.0, period)
+        self._field_due[field] = 0.0
     
     def update(self) -> None:
-        """Get all data and update member data by sending commands"""
-        if not self.is_connected():
+        """Get the fields that are due and update member data"""
+        if not self.is_connected() or self._streaming:
             return
         
         try:
-            # Get curtain status (integral + fractional)
-            curtain_int = self._send_command(CMD_GET_CURTAIN_INT)
-            curtain_frac = self._send_command(CMD_GET_CURTAIN_FRAC)
-            self.curtainStatus = curtain_int + (curtain_frac / 10.0)
-            print(f"[DEBUG] Curtain: {curtain_int}.{curtain_frac} = {self.curtainStatus}%")
-            
-            # Get outdoor temperature
-            temp_int = self._send_command(CMD_GET_TEMP_INT)
-            temp_frac = self._send_command(CMD_GET_TEMP_FRAC)
-            self.outdoorTemperature = temp_int + (temp_frac / 10.0)
-            print(f"[DEBUG] Outdoor Temp: {temp_int}.{temp_frac} = {self.outdoorTemperature}C")
-            
-            # Get outdoor pressure (integral is LOW byte of 16-bit value)
-            press_int = self._send_command(CMD_GET_PRESS_INT)
-            press_frac = self._send_command(CMD_GET_PRESS_FRAC)
-            # Pressure is stored as H*256+L, but we only get LOW byte
-            # For 1013 hPa: H=3, L=245 -> we get 245, need to add H*256
-            # Since we can't get H easily, assume pressure = L + 768 (for ~1000 range)
-            self.outdoorPressure = (press_int + 768) + (press_frac / 10.0)
-            print(f"[DEBUG] Outdoor Press: {self.outdoorPressure} hPa")
+            now = time.monotonic()
+            due = [index for index, (name, _) in enumerate(POLL_FIELDS)
+                   if now >= self._field_due[name]]
+            if not due:
+                return
             
-            # Get light intensity
-            light_int = self._send_command(CMD_GET_LIGHT_INT)
-            light_frac = self._send_command(CMD_GET_LIGHT_FRAC)
-            self.lightIntensity = light_int + (light_frac / 10.0)
-            print(f"[DEBUG] Light: {light_int}.{light_frac} = {self.lightIntensity} Lux")
+            values = None
+            if self._frame_supported is None or (
+                    self._frame_supported and self._prefer_frame(due)):
+                values = self._poll_frame(TELEMETRY_FRAME)
+            if values is not None:
+                due = range(len(POLL_FIELDS))
+                self._raw_values[:] = values
+            else:
+                cmds = [cmd for index in due for cmd in POLL_FIELDS[index][1]]
+                replies = self._send_burst(cmds)
+                for slot, index in enumerate(due):
+                    self._raw_values[2 * index:2 * index + 2] = replies[2 * slot:2 * slot + 2]
+                    if POLL_FIELDS[index][0] == 'pressure':
+                        # The per-byte protocol only returns the LOW byte of
+                        # the 16-bit pressure (1013 hPa: H=3, L=245). Since
+                        # we can't get H, assume H=3 (for ~1000 range).
+                        self._raw_values[2 * index] += 768
             
-            if self._update_callback:
-                self._update_callback()
-                
+            read = [POLL_FIELDS[index][0] for index in due]
+            for name in read:
+                self._field_due[name] = now + self.fieldPeriods[name]
+            self._apply_values(self._raw_values, read)
         except Exception as e:
-            print(f"Update error: {e}")
+            log.error("Update error: %s", e)
+    
+    def waitNextPoll(self) -> None:
+        """Sleep until the next update() is due.
+        
+        The adaptive period backs off while values are steady, but never
+        past the time the next field is due, so fieldPeriods hold. While
+        streaming (or closed) update() polls nothing and the due times stand
+        still, so the plain adaptive period applies.
+        """
+        if self._streaming or not self.is_connected():
+            self.pollInterval.wait()
+            return
+        self.pollInterval.wait(max(0.0, min(self._field_due.values()) - time.monotonic()))
+    
+    def _prefer_frame(self, due) -> bool:
+        """Check if one CMD_GET_ALL frame beats per-byte GETs for the due fields"""
+        if any(POLL_FIELDS[index][0] == 'pressure' for index in due):
+            return True  # only the frame carries the pressure high byte
+        # Per field: two commands out, two replies back
+        frame_bytes = 1 + TELEMETRY_FRAME.size + 3
+        return frame_bytes <= 4 * len(due)
+    
+    def _apply_values(self, values, fields=None) -> None:
+        """Store one sample in TELEMETRY_FRAME field order, fields names the
+        ones read from the board (all if None)"""
+        (curtain_int, curtain_frac, temp_int, temp_frac,
+         press, press_frac, light_int, light_frac) = values
+        
+        # Curtain status (integral + fractional)
+        curtain = curtain_int + (curtain_frac / 10.0)
+        log.debug("Curtain: %s.%s = %s%%", curtain_int, curtain_frac, curtain)
+        
+        # Outdoor temperature
+        temperature = temp_int + (temp_frac / 10.0)
+        log.debug("Outdoor Temp: %s.%s = %sC", temp_int, temp_frac, temperature)
+        
+        # Outdoor pressure (16-bit integral)
+        pressure = press + (press_frac / 10.0)
+        log.debug("Outdoor Press: %s hPa", pressure)
+        
+        # Light intensity
+        light = light_int + (light_frac / 10.0)
+        log.debug("Light: %s.%s = %s Lux", light_int, light_frac, light)
+        
+        self._record_sample((curtain, temperature, pressure, light), fields)
+        self._check_motion()
+        
+        if self._update_callback:
+            self._update_callback()
     
     def setCurtainStatus(self, status: float) -> bool:
         """Set the desired curtain status by sending message to board"""
-        if not self.is_connected():
-            return False
-        
         try:
-            # Split into integral and fractional parts
-            integral = int(status)
-            fractional = int((status - integral) * 10)
-            
-            # Validate range (0-100)
-            if integral < 0 or integral > 100:
-                return False
-            
-            # Send SET commands
-            # Set integral: 11xxxxxx (0xC0 | value)
-            cmd_int = 0xC0 | (integral & 0x3F)
-            self.serial_connection.write(bytes([cmd_int]))
-            self.serial_connection.flush()
-            print(f"[DEBUG] Set curtain integral: {hex(cmd_int)} = {integral}")
-            
-            time.sleep(0.1)
-            
-            # Set fractional: 10xxxxxx (0x80 | value)
-            cmd_frac = 0x80 | (fractional & 0x3F)
-            self.serial_connection.write(bytes([cmd_frac]))
-            self.serial_connection.flush()
-            print(f"[DEBUG] Set curtain fractional: {hex(cmd_frac)} = {fractional}")
-            
-            return True
+            return self.setCurtainStatusAsync(status).result(timeout=self.SET_TIMEOUT)
         except Exception as e:
-            print(f"Set curtain error: {e}")
+            log.error("Set curtain error: %s", e)
             return False
     
+    def setCurtainStatusAsync(self, status: float) -> Future:
+        """Queue the desired curtain status ahead of pending polls.
+        
+        Returns a Future that resolves to True once both SET bytes are written.
+        """
+        if not self.is_connected():
+            return completed_future(False)
+        
+        # Split into integral and fractional parts
+        integral = int(status)
+        fractional = int((status - integral) * 10)
+        
+        # Validate range (0-100)
+        if integral < 0 or integral > 100:
+            return completed_future(False)
+        
+        # SET commands, integral first:
+        # 11xxxxxx (0xC0 | value) then 10xxxxxx (0x80 | value)
+        cmd_int = 0xC0 | (integral & 0x3F)
+        cmd_frac = 0x80 | (fractional & 0x3F)
+        log.debug("Set curtain integral: %#x = %s", cmd_int, integral)
+        log.debug("Set curtain fractional: %#x = %s", cmd_frac, fractional)
+        self._start_motion(status)
+        return self._submit_write(bytes([cmd_int, cmd_frac]))
+    
+    def moveCurtainAsync(self, status: float) -> Future:
+        """Command a curtain status and track the stepper until it gets there.
+        
+        Returns a Future that resolves to True once the board reports the
+        status, or False if the SET failed, another status was commanded,
+        TRACK_TIMEOUT passed or the connection was closed.
+        """
+        written = self.setCurtainStatusAsync(status)
+        motion = self._motion
+        if motion is None or motion[0] != status:
+            return completed_future(False)
+        written.add_done_callback(lambda future: self._on_move_written(motion, future))
+        return motion[2]
+    
+    def is_moving(self) -> bool:
+        """Check if a commanded curtain status has not been reached yet"""
+        return self._motion is not None
+    
+    def _start_motion(self, target: float) -> None:
+        """Track a new target, the previous one is reported as not reached"""
+        motion = (target, time.monotonic() + self.TRACK_TIMEOUT, Future())
+        with self._motion_lock:
+            previous, self._motion = self._motion, motion
+        if previous is not None:
+            previous[2].set_result(False)
+        self._field_due['curtain'] = 0.0
+    
+    def _on_move_written(self, motion, written: Future) -> None:
+        """End tracking if the SET bytes could not be written"""
+        if written.cancelled() or written.exception() is not None or not written.result():
+            self._finish_motion(motion, False)
+    
+    def _check_motion(self) -> None:
+        """Compare the last sample with the tracked target"""
+        motion = self._motion
+        if motion is None:
+            return
+        target, deadline, _ = motion
+        now = time.monotonic()
+        if abs(self.curtainStatus - target) <= self.TRACK_TOLERANCE:
+            self._finish_motion(motion, True)
+        elif now > deadline:
+            log.debug("Curtain did not reach %s%% in %s s", target, self.TRACK_TIMEOUT)
+            self._finish_motion(motion, False)
+        else:
+            # Still moving: read the position again soon
+            self._field_due['curtain'] = min(self._field_due['curtain'],
+                                             now + self.TRACK_PERIOD)
+            self.pollInterval.period = min(self.pollInterval.period, self.TRACK_PERIOD)
+    
+    def _finish_motion(self, motion, reached: bool) -> None:
+        """Stop tracking motion and resolve its Future"""
+        if motion is None:
+            return
+        with self._motion_lock:
+            if self._motion is not motion:
+                return  # already finished or replaced
+            self._motion = None
+        motion[2].set_result(reached)
+    
     def getOutdoorTemp(self) -> float:
         """Get the outdoor temperature"""
         return self.outdoorTemperature
@@ -210,7 +810,7 @@ class CurtainControlSystemConnection(HomeAutomationSystemConnection):
         return self.curtainStatus
     
     def set_update_callback(self, callback):
-        """Set callback function for UI updates"""
+        """Set callback function called after every poll (see subscribe())"""
         self._update_callback = callback
 
 
@@ -220,17 +820,28 @@ class CurtainControlApp:
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Home Automation System - Curtain Control")
-        self.root.geometry("500x700")
+        self.root.geometry("960x700")
         self.root.configure(bg='#1a1a2e')
         self.root.resizable(False, False)
         
+        # Replaced by the port's shared connection once connected
         self.connection = CurtainControlSystemConnection()
-        self.connection.set_update_callback(self._update_display)
+        self.dispatcher = UiDispatcher(self.root)
+        self._handle = None        # ConnectionHandle from the registry while connected
+        self._subscription = None
         
-        self._update_thread = None
         self._create_styles()
         self._create_ui()
+        self._create_trends()
         self._populate_ports()
+        self._display = TextBindings(
+            (self.temp_label, lambda snapshot: f"{snapshot.temperature:.1f} °C"),
+            (self.press_label, lambda snapshot: f"{snapshot.pressure:.1f} hPa"),
+            (self.position_label, lambda snapshot: f"{snapshot.curtain:.1f} %"),
+            (self.light_label, lambda snapshot: f"{snapshot.light:.1f} Lux"))
+        self.dispatcher.register(self, self._do_update_display)
+        self.dispatcher.start()
+        self.trend_panel.start()
     
     def _create_styles(self):
         """Create custom styles for widgets"""
@@ -261,7 +872,7 @@ class CurtainControlApp:
         """Create the user interface"""
         # Main container
         main_frame = tk.Frame(self.root, bg='#1a1a2e', padx=20, pady=20)
-        main_frame.pack(fill='both', expand=True)
+        main_frame.pack(side='left', fill='y')
         
         # Title
         title_label = ttk.Label(main_frame, text="🪟 Curtain Control", 
@@ -357,6 +968,13 @@ class CurtainControlApp:
                                cursor='hand2')
         refresh_btn.pack(side='left', padx=5)
         
+        stats_btn = tk.Button(btn_frame, text="Stats",
+                              command=self._show_stats,
+                              bg='#333355', fg='#ffffff',
+                              font=('Segoe UI', 10),
+                              cursor='hand2')
+        stats_btn.pack(side='left', padx=5)
+        
         # Separator
         separator2 = tk.Frame(main_frame, bg='#333355', height=2)
         separator2.pack(fill='x', pady=10)
@@ -387,6 +1005,17 @@ class CurtainControlApp:
                             anchor='w', padx=10)
         exit_btn.pack(pady=5)
     
+    def _create_trends(self):
+        """Live charts of the connection's history, right of the controls"""
+        self.trend_panel = TrendPanel(self.root, self.connection.history, [
+            dict(series=[('curtain', "Curtain", '#00d2ff')], height=145,
+                 y_range=(0, 100), unit="%"),
+            dict(series=[('temperature', "Outdoor temperature", '#ff9f43')], height=145, unit="°"),
+            dict(series=[('pressure', "Pressure (hPa)", '#a29bfe')], height=145),
+            dict(series=[('light', "Light (Lux)", '#ffd93d')], height=145),
+        ])
+        self.trend_panel.frame.pack(side='left', fill='both', expand=True, pady=20)
+    
     def _populate_ports(self):
         """Get available COM ports"""
         ports = serial.tools.list_ports.comports()
@@ -397,7 +1026,7 @@ class CurtainControlApp:
     
     def _toggle_connection(self):
         """Connect or disconnect from the board"""
-        if self.connection.is_connected():
+        if self._handle is not None:
             self._disconnect()
         else:
             self._connect()
@@ -409,56 +1038,46 @@ class CurtainControlApp:
             messagebox.showerror("Error", "Please select a COM port")
             return
         
-        self.connection.setComPort(port)
-        self.connection.setBaudRate(int(self.baud_combo.get()))
-        
-        if self.connection.open():
-            self.status_label.configure(text="● Connected", foreground='#00ff88')
-            self.connect_btn.configure(text="Disconnect", bg='#ff4444')
-            self._start_update_thread()
-        else:
+        try:
+            handle = registry.acquire(CurtainControlSystemConnection, port,
+                                      int(self.baud_combo.get()), connection=self.connection)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if handle is None:
             messagebox.showerror("Error", f"Failed to connect to {port}")
+            return
+        
+        self._handle = handle
+        self._use_connection(handle.connection)
+        self._subscription = self.connection.subscribe(callback=self._update_display)
+        self.status_label.configure(text="● Connected", foreground='#00ff88')
+        self.connect_btn.configure(text="Disconnect", bg='#ff4444')
     
     def _disconnect(self):
-        """Close connection to board"""
-        self.connection.close()
+        """Release the board, the port closes when no other window uses it"""
+        self.connection.unsubscribe(self._subscription)
+        self._subscription = None
+        self._handle.release()
+        self._handle = None
         self.status_label.configure(text="● Disconnected", foreground='#888888')
         self.connect_btn.configure(text="Connect", bg='#ff9f43')
     
-    def _start_update_thread(self):
-        """Start background thread for reading serial data"""
-        def update_loop():
-            while self.connection._is_running:
-                self.connection.update()
-                time.sleep(1.0)
-        
-        self._update_thread = threading.Thread(target=update_loop, daemon=True)
-        self._update_thread.start()
+    def _use_connection(self, connection):
+        """Show connection, the one the registry shares for the selected port"""
+        if connection is not self.connection:
+            self.connection = connection
+            self.trend_panel.setHistory(connection.history)
     
-    def _update_display(self):
-        """Update the display with current values"""
-        try:
-            self.root.after(0, self._do_update_display)
-        except Exception as e:
-            print(f"Display callback error: {e}")
+    def _update_display(self, snapshot):
+        """Hand a changed sample to the dispatcher (runs in the update thread)"""
+        self.dispatcher.post(self, snapshot)
     
-    def _do_update_display(self):
-        """Actually update the display (runs in main thread)"""
-        try:
-            if not self.connection.is_connected():
-                return
-            
-            self.temp_label.configure(
-                text=f"{self.connection.getOutdoorTemp():.1f} °C")
-            self.press_label.configure(
-                text=f"{self.connection.getOutdoorPress():.1f} hPa")
-            self.position_label.configure(
-                text=f"{self.connection.getCurtainStatus():.1f} %")
-            self.light_label.configure(
-                text=f"{self.connection.getLightIntensity():.1f} Lux")
-            
-        except Exception as e:
-            print(f"Display update error: {e}")
+    def _do_update_display(self, sample):
+        """Actually update the display (runs in main thread, once per frame)"""
+        if not self.connection.is_connected():
+            return 0
+        return self._display(sample)
     
     def _show_position_dialog(self):
         """Show position input dialog as a popup window"""
@@ -515,18 +1134,18 @@ class CurtainControlApp:
     
     def _set_position(self):
         """Set the curtain position"""
-        print("[DEBUG] _set_position called")
+        log.debug("_set_position called")
         try:
             input_text = self.pos_entry.get()
-            print(f"[DEBUG] Input text: '{input_text}'")
+            log.debug("Input text: '%s'", input_text)
             pos = float(input_text)
-            print(f"[DEBUG] Parsed position: {pos}")
+            log.debug("Parsed position: %s", pos)
             
             if 0 <= pos <= 100:
-                print(f"[DEBUG] Position valid, is_connected: {self.connection.is_connected()}")
+                log.debug("Position valid, is_connected: %s", self.connection.is_connected())
                 if self.connection.is_connected():
                     result = self.connection.setCurtainStatus(pos)
-                    print(f"[DEBUG] setCurtainStatus returned: {result}")
+                    log.debug("setCurtainStatus returned: %s", result)
                     # Close dialog first
                     self._hide_position_dialog()
                     # Show message after dialog is closed
@@ -540,13 +1159,24 @@ class CurtainControlApp:
             else:
                 messagebox.showerror("Error", "Value must be between 0 and 100")
         except ValueError as e:
-            print(f"[DEBUG] ValueError: {e}")
+            log.debug("ValueError: %s", e)
             messagebox.showerror("Error", "Please enter a valid number")
     
+    def _show_stats(self):
+        """Show per-command statistics, the first press turns recording on"""
+        if self.connection.instruments is None:
+            self.connection.enableInstrumentation()
+            messagebox.showinfo("Stats", "Command statistics recording started.\n"
+                                         "Press Stats again to view them.")
+            return
+        messagebox.showinfo("Stats", format_snapshot(self.connection.getInstrumentation()))
+    
     def _exit_app(self):
         """Exit the application"""
-        if self.connection.is_connected():
-            self.connection.close()
+        self.dispatcher.stop()
+        self.trend_panel.stop()
+        if self._handle is not None:
+            self._disconnect()
         self.root.quit()
     
     def run(self):
@@ -557,6 +1187,7 @@ class CurtainControlApp:
 
 def main():
     """Main entry point"""
+    setup_logging()
     app = CurtainControlApp()
     app.run()
 
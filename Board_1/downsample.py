@@ -0,0 +1,120 @@
+"""
+Downsampling
+Reduces long telemetry series to a bounded number of points for charts and
+exports
+
+Two methods, both single pass over (x, y) pairs whose count is known up
+front (HistoryWindow, TelemetryReader.read(), TelemetryStore.query()):
+
+    lttb     Largest-Triangle-Three-Buckets: keeps the first and last point
+             and, per bucket, the point forming the largest triangle with
+             the previously kept point and the mean of the next bucket.
+             Preserves the visual shape of the series.
+    minmax   the lowest and highest point of every bucket, in time order.
+             Never hides a spike, e.g. for alarms on ambient temperature.
+
+Only the current and the next bucket are held in memory, so weeks of
+per-second samples are reduced without copying them first. Within a bucket
+the work is done by builtins (sum, max with a key) over flat lists.
+
+Usage:
+    window = connection.history.last(604800)
+    times, values = downsample(window_points(window, 'ambient'), len(window), 1000)
+"""
+
+from itertools import islice
+
+from telemetry_history import HISTORY_SCALE
+
+
+METHODS = ("lttb", "minmax")
+
+
+def window_points(window, field: str):
+    """(seconds, value) pairs of one field of a HistoryWindow, oldest first"""
+    for times, values in zip(window.times, window.columns[field]):
+        for stamp, value in zip(times, values):
+            yield stamp / 1e9, value / HISTORY_SCALE
+
+
+def _take(points, count: int):
+    """Next count pairs as two lists"""
+    chunk = list(islice(points, count))
+    return [point[0] for point in chunk], [point[1] for point in chunk]
+
+
+def lttb(points, count: int, threshold: int):
+    """Yield at most threshold of the count (x, y) pairs, chosen by LTTB"""
+    points = iter(points)
+    if threshold >= count:
+        yield from islice(points, count)
+        return
+    if threshold < 3:
+        yield from _ends(points, count, threshold)
+        return
+    # Bucket i holds the points [starts[i], starts[i + 1]); the first and the
+    # last point are buckets of their own. Integer division keeps the last
+    # start exactly at count - 1.
+    starts = [1 + i * (count - 2) // (threshold - 2) for i in range(threshold - 1)]
+    ax, ay = next(points)
+    yield ax, ay
+    xs, ys = _take(points, starts[1] - starts[0])
+    for bucket in range(threshold - 2):
+        if bucket + 2 < len(starts):
+            next_xs, next_ys = _take(points, starts[bucket + 2] - starts[bucket + 1])
+            cx, cy = sum(next_xs) / len(next_xs), sum(next_ys) / len(next_ys)
+        else:
+            cx, cy = last = next(points)
+        # Twice the triangle area is linear in the candidate (x, y)
+        dx, dy = ax - cx, cy - ay
+        offset = -dx * ay - ax * dy
+        best = max(range(len(xs)), key=lambda i: abs(xs[i] * dy + ys[i] * dx + offset))
+        ax, ay = xs[best], ys[best]
+        yield ax, ay
+        if bucket + 2 < len(starts):
+            xs, ys = next_xs, next_ys
+    yield last
+
+
+def minmax(points, count: int, threshold: int):
+    """Yield the minimum and maximum of threshold // 2 buckets, in x order"""
+    points = iter(points)
+    buckets = threshold // 2
+    if threshold >= count:
+        yield from islice(points, count)
+        return
+    if buckets < 1:
+        yield from _ends(points, count, threshold)
+        return
+    for bucket in range(buckets):
+        size = (bucket + 1) * count // buckets - bucket * count // buckets
+        xs, ys = _take(points, size)
+        low = min(range(size), key=ys.__getitem__)
+        high = max(range(size), key=ys.__getitem__)
+        for index in sorted({low, high}):
+            yield xs[index], ys[index]
+
+
+def _ends(points, count: int, threshold: int):
+    """Fewer than 3 (lttb) or 2 (minmax) points wanted: first and last"""
+    first = next(points, None)
+    if first is None or threshold < 1:
+        return
+    yield first
+    if threshold > 1 and count > 1:
+        last = first
+        for last in islice(points, count - 1):
+            pass
+        yield last
+
+
+def downsample(points, count: int, threshold: int, method: str = "lttb"):
+    """Reduce count (x, y) pairs to at most threshold, returns (xs, ys) lists"""
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, use one of {METHODS}")
+    selected = (lttb if method == "lttb" else minmax)(points, count, threshold)
+    xs, ys = [], []
+    for x, y in selected:
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
@@ -0,0 +1,223 @@
+"""
+Home Automation System - Fleet Poller
+Polls many Board 1 / Board 2 connections from one scheduler thread
+
+Each board gets its own polling deadline. When a board is due, the scheduler
+queues its update() on that port's I/O worker and moves on, so a slow port
+never delays the others. Statistics per port (achieved sample rate, missed
+deadlines, utilization of the port) show how many boards one host can drive.
+
+Usage:
+    python fleet.py [--stats] COM3:ac COM4:curtain /dev/ttyUSB0:ac@0.5
+With --stats the per-command latency table of every port is printed too.
+"""
+
+import heapq
+import sys
+import threading
+import time
+
+from home_automation import AirConditionerSystemConnection
+from curtain_control import CurtainControlSystemConnection
+from serial_worker import PRIORITY_GET
+from instrumentation import format_snapshot
+
+
+# Board type names accepted by FleetPoller
+BOARD_TYPES = {
+    "ac": AirConditionerSystemConnection,
+    "curtain": CurtainControlSystemConnection,
+}
+
+
+class PortStats:
+    """Polling statistics of one port"""
+
+    def __init__(self):
+        self.samples = 0
+        self.missed = 0
+        self.busy = 0.0  # seconds spent inside update()
+        self.last_latency = 0.0
+
+
+class FleetPoller:
+    """Drives the polling of N serial ports from a shared scheduler"""
+
+    def __init__(self, boards, period: float = 1.0, instrument: bool = False):
+        """boards: iterable of (port, board_type) or (port, board_type, period).
+
+        board_type is a key of BOARD_TYPES or a connection class. With
+        instrument=True every connection records per-command statistics,
+        included in report() under "commands".
+        """
+        self.period = period
+        self.instrument = instrument
+        self.connections = {}
+        self.periods = {}
+        self.stats = {}
+        for board in boards:
+            port, board_type = board[0], board[1]
+            if isinstance(board_type, str):
+                board_type = BOARD_TYPES[board_type]
+            connection = board_type()
+            connection.setComPort(port)
+            if instrument:
+                connection.enableInstrumentation()
+            self.connections[port] = connection
+            self.periods[port] = board[2] if len(board) > 2 else period
+            self.stats[port] = PortStats()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pending = {}
+        self._started = None
+
+    def open(self) -> list:
+        """Open every port, returns the ports that failed to open"""
+        return [port for port, connection in self.connections.items()
+                if not connection.open()]
+
+    def close(self) -> None:
+        """Stop polling and close every port"""
+        self.stop()
+        for connection in self.connections.values():
+            if connection.is_connected():
+                connection.close()
+
+    def start(self) -> None:
+        """Start the scheduler thread"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="fleet-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stop the scheduler thread, polls already queued still finish"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def connection(self, port):
+        """Return the connection object of a port"""
+        return self.connections[port]
+
+    def report(self) -> dict:
+        """Per-port and total statistics since start().
+
+        rate        achieved samples per second
+        missed      deadlines that passed without a new poll starting
+        utilization fraction of wall time the port spent in update()
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-9) if self._started else 0.0
+        report = {}
+        with self._lock:
+            for port, stats in self.stats.items():
+                report[port] = {
+                    "samples": stats.samples,
+                    "rate": stats.samples / elapsed if elapsed else 0.0,
+                    "target_rate": 1.0 / self.periods[port],
+                    "missed": stats.missed,
+                    "utilization": stats.busy / elapsed if elapsed else 0.0,
+                    "latency": stats.last_latency,
+                }
+        if self.instrument:
+            for port, connection in self.connections.items():
+                report[port]["commands"] = connection.getInstrumentation()
+        report["total"] = {
+            "samples": sum(r["samples"] for r in report.values()),
+            "rate": sum(r["rate"] for r in report.values()),
+            "missed": sum(r["missed"] for r in report.values()),
+        }
+        return report
+
+    def _run(self) -> None:
+        """Scheduler thread: dispatch each port's update() at its deadline"""
+        now = time.monotonic()
+        queue = [(now, index, port) for index, port in enumerate(self.connections)]
+        heapq.heapify(queue)
+        while queue:
+            due, index, port = heapq.heappop(queue)
+            if self._stop_event.wait(max(0.0, due - time.monotonic())):
+                break
+            now = time.monotonic()
+            period = self.periods[port]
+            # Deadlines that went by while the scheduler was waiting elsewhere
+            skipped = int((now - due) // period)
+            if skipped:
+                self._count_missed(port, skipped)
+                due += skipped * period
+            self._dispatch(port)
+            heapq.heappush(queue, (due + period, index, port))
+
+    def _dispatch(self, port) -> None:
+        """Queue one update() on the port's I/O worker"""
+        connection = self.connections[port]
+        if not connection.is_connected() or connection._worker is None:
+            return
+        pending = self._pending.get(port)
+        if pending is not None and not pending.done():
+            # Previous poll still running, the port cannot keep up
+            self._count_missed(port, 1)
+            return
+        self._pending[port] = connection._worker.submit(
+            self._timed_update, port, priority=PRIORITY_GET)
+
+    def _timed_update(self, port) -> None:
+        """Run update() and record its duration (runs on the I/O thread)"""
+        started = time.perf_counter()
+        self.connections[port].update()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            stats = self.stats[port]
+            stats.samples += 1
+            stats.busy += elapsed
+            stats.last_latency = elapsed
+
+    def _count_missed(self, port, count: int) -> None:
+        with self._lock:
+            self.stats[port].missed += count
+
+
+def main():
+    """Poll the ports given as PORT:TYPE[@PERIOD] and print statistics"""
+    args = sys.argv[1:]
+    instrument = "--stats" in args
+    boards = []
+    for arg in args:
+        if arg == "--stats":
+            continue
+        port, _, board = arg.rpartition(":")
+        board_type, _, period = board.partition("@")
+        boards.append((port, board_type, float(period) if period else 1.0))
+    if not boards:
+        print(__doc__)
+        return
+
+    fleet = FleetPoller(boards, instrument=instrument)
+    failed = fleet.open()
+    for port in failed:
+        print(f"Could not open {port}")
+    fleet.start()
+    try:
+        while True:
+            time.sleep(5.0)
+            for port, r in fleet.report().items():
+                if port == "total":
+                    print(f"TOTAL  {r['rate']:.2f} samples/s, {r['missed']} missed")
+                else:
+                    print(f"{port}: {r['rate']:.2f}/{r['target_rate']:.2f} Hz, "
+                          f"{r['missed']} missed, {r['utilization'] * 100:.0f}% busy")
+                    if instrument:
+                        print(format_snapshot(r["commands"]))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.close()
+
+
+if __name__ == "__main__":
+    main()
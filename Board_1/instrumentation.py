@@ -0,0 +1,150 @@
+"""
+Command Instrumentation
+Per-command round-trip statistics of one board connection
+
+Enabled with connection.enableInstrumentation(). Every GET, bulk frame and
+SET exchange is recorded with its round-trip time, bytes written and read,
+missing replies (timeouts, which the connection otherwise returns as 0) and
+errors. The counters are only written from the port's I/O thread, so no
+lock is taken on the hot path; snapshot() copies them for other threads.
+"""
+
+import math
+
+
+# Key used for SET writes (10xxxxxx / 11xxxxxx pairs)
+SET_KEY = "SET"
+
+
+class LatencyHistogram:
+    """Log-linear (HDR style) histogram of durations.
+
+    Values are counted in microseconds. Every power-of-two range is split
+    into SUB_BUCKETS linear buckets, so recording is constant time and the
+    relative error is below 1/SUB_BUCKETS from 1 us up to several minutes.
+    """
+
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    MAX_MAGNITUDE = 28  # 2^32 us, about 70 minutes
+
+    def __init__(self):
+        self.counts = [0] * ((self.MAX_MAGNITUDE + 2) * self.SUB_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add one duration"""
+        self.counts[self._index(max(0, int(seconds * 1e6)))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Duration in seconds below which fraction of the values fall"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._upper(index) / 1e6, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        """Average duration in seconds"""
+        return self.total / self.count if self.count else 0.0
+
+    def _index(self, micros: int) -> int:
+        magnitude = max(0, micros.bit_length() - self.SUB_BUCKET_BITS - 1)
+        if magnitude > self.MAX_MAGNITUDE:
+            return len(self.counts) - 1
+        return magnitude * self.SUB_BUCKETS + (micros >> magnitude)
+
+    def _upper(self, index: int) -> int:
+        """Largest microsecond value counted in bucket index"""
+        if index < 2 * self.SUB_BUCKETS:
+            return index
+        magnitude = index // self.SUB_BUCKETS - 1
+        top = index - magnitude * self.SUB_BUCKETS
+        return ((top + 1) << magnitude) - 1
+
+
+class CommandStats:
+    """Counters of one command"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.timeouts = 0
+        self.errors = 0
+
+
+class ConnectionInstruments:
+    """Statistics of every command sent on one connection"""
+
+    def __init__(self):
+        self.commands = {}
+
+    def record(self, cmd, rtt: float, bytes_out: int, bytes_in: int,
+               timed_out: bool = False) -> None:
+        """Record one finished exchange (I/O thread)"""
+        stats = self.commands.get(cmd)
+        if stats is None:
+            stats = self.commands[cmd] = CommandStats()
+        stats.latency.record(rtt)
+        stats.bytes_out += bytes_out
+        stats.bytes_in += bytes_in
+        if timed_out:
+            stats.timeouts += 1
+
+    def record_error(self, cmd) -> None:
+        """Record an exchange that raised (I/O thread)"""
+        stats = self.commands.get(cmd)
+        if stats is None:
+            stats = self.commands[cmd] = CommandStats()
+        stats.errors += 1
+
+    def snapshot(self) -> dict:
+        """Copy of the statistics keyed by command name, times in ms"""
+        result = {}
+        for cmd, stats in list(self.commands.items()):
+            latency = stats.latency
+            result[command_name(cmd)] = {
+                "count": latency.count,
+                "timeouts": stats.timeouts,
+                "errors": stats.errors,
+                "bytes_out": stats.bytes_out,
+                "bytes_in": stats.bytes_in,
+                "mean_ms": latency.mean() * 1000,
+                "p50_ms": latency.percentile(0.50) * 1000,
+                "p95_ms": latency.percentile(0.95) * 1000,
+                "p99_ms": latency.percentile(0.99) * 1000,
+                "max_ms": latency.max * 1000,
+            }
+        return result
+
+    def reset(self) -> None:
+        """Drop all statistics"""
+        self.commands = {}
+
+
+def command_name(cmd) -> str:
+    """Printable name of a command key"""
+    return cmd if isinstance(cmd, str) else f"0x{cmd:02X}"
+
+
+def format_snapshot(snapshot: dict) -> str:
+    """Text table of a snapshot, slowest p95 first"""
+    if not snapshot:
+        return "No commands recorded"
+    lines = [f"{'CMD':<5} {'count':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'t/o':>5} {'err':>4}"]
+    for name, stats in sorted(snapshot.items(), key=lambda item: -item[1]["p95_ms"]):
+        lines.append(f"{name:<5} {stats['count']:>6} {stats['p50_ms']:>6.1f}m "
+                     f"{stats['p95_ms']:>6.1f}m {stats['p99_ms']:>6.1f}m "
+                     f"{stats['timeouts']:>5} {stats['errors']:>4}")
+    return "\n".join(lines)
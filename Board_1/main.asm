@@ -11,8 +11,18 @@
 ;   0x03 = Get ambient temp fractional
 ;   0x04 = Get ambient temp integral
 ;   0x05 = Get fan speed
+;   0x09 = Get all (cerceve: 0xAA, uzunluk=5, desired int, desired frac,
+;          ambient int, ambient frac, fan speed, XOR checksum)
+;          Checksum = uzunluk ve veri byte'larinin XOR'u
+;   0x0A = Stream ac: 0x09 cercevesi ~1 sn'de bir ve setpoint/fan hizi
+;          degisince hemen kendiliginden gonderilir
+;   0x0B = Stream kapat
 ;   10xxxxxx = Set desired temp fractional (6-bit deger)
 ;   11xxxxxx = Set desired temp integral (6-bit deger)
+;
+; Gelen byte'lar kesme ile 16 byte'lik RX halka tamponuna alinir,
+; cevaplar 16 byte'lik TX kuyrugundan kesme ile gonderilir. Boylece PC
+; ardarda 16 komuta kadar (burst) gonderebilir, OERR olusmaz.
 
 PROCESSOR 16F877A
 #include <xc.inc>
@@ -47,10 +57,35 @@ PSECT udata_bank0
     ; UART
     rx_byte:     DS 1
     tx_byte:     DS 1
+    frame_chk:   DS 1
+    
+    ; Telemetri stream
+    stream_flags: DS 1      ; bit0 = stream acik, bit1 = degisiklik var
+    stream_count: DS 1      ; periyodik gonderim sayaci (ana dongu)
+    
+    ; UART halka tamponlari (boyut 16, indeksler 0x0F ile maskelenir)
+    rx_buf:      DS 16
+    rx_head:     DS 1       ; ISR yazar
+    rx_tail:     DS 1       ; ana dongu okur
+    tx_buf:      DS 16
+    tx_head:     DS 1       ; ana dongu yazar
+    tx_tail:     DS 1       ; ISR okur
+
+PSECT udata_shr
+    ; ISR context kaydi (tum banklardan erisilebilir)
+    w_temp:      DS 1
+    status_temp: DS 1
+    pclath_temp: DS 1
+    fsr_temp:    DS 1
 
 PSECT resetVec, class=CODE, delta=2
     ORG 0x00
     GOTO MAIN
+    ORG 0x04
+    GOTO isr
+
+; Stream periyodu (ana dongu sayisi, ~40 ms/dongu -> ~1 sn)
+STREAM_PERIOD EQU 25
 
 PSECT code
 MAIN:
@@ -66,6 +101,9 @@ MAIN:
     CLRF cycle_count
     CLRF fan_speed
     CLRF timer_tick
+    CLRF stream_flags
+    MOVLW STREAM_PERIOD
+    MOVWF stream_count
 
 MAIN_LOOP:
     BCF STATUS, 5
@@ -73,6 +111,7 @@ MAIN_LOOP:
     
     ; UART komut kontrol
     CALL uart_check_command
+    CALL stream_check
     
     CALL check_keypad
     
@@ -334,22 +373,23 @@ skip_rotation:
 ; UART KOMUT ISLEYICI
 ; ============================================
 uart_check_command:
-    ; RCIF flag kontrol
-    BANKSEL PIR1
-    BTFSS PIR1, 5
-    GOTO uart_cmd_exit
-    
-    ; Overrun error kontrolu
-    BANKSEL RCSTA
-    BTFSC RCSTA, 1
-    GOTO uart_clear_oerr
-    
-    ; Veriyi oku
-    BANKSEL RCREG
-    MOVF RCREG, W
+    ; Halka tamponda bekleyen komut var mi?
     BCF STATUS, 5
     BCF STATUS, 6
+    MOVF rx_tail, W
+    XORWF rx_head, W
+    BTFSC STATUS, 2
+    GOTO uart_cmd_done
+    
+    ; Komutu tampondan al: rx_byte = rx_buf[rx_tail]
+    MOVF rx_tail, W
+    ADDLW rx_buf
+    MOVWF FSR
+    MOVF INDF, W
     MOVWF rx_byte
+    INCF rx_tail, W
+    ANDLW 0x0F
+    MOVWF rx_tail
     
     ; Komut analizi
     ; Bit 7-6 kontrol: 00=GET, 10=SET frac, 11=SET int
@@ -383,6 +423,21 @@ uart_check_command:
     BTFSC STATUS, 2
     GOTO cmd_get_fan_speed
     
+    MOVF rx_byte, W
+    XORLW 0x09          ; Get all (cerceveli cevap)
+    BTFSC STATUS, 2
+    GOTO cmd_get_all
+    
+    MOVF rx_byte, W
+    XORLW 0x0A          ; Stream ac
+    BTFSC STATUS, 2
+    GOTO cmd_stream_on
+    
+    MOVF rx_byte, W
+    XORLW 0x0B          ; Stream kapat
+    BTFSC STATUS, 2
+    GOTO cmd_stream_off
+    
     GOTO uart_cmd_exit
 
 cmd_get_desired_frac:
@@ -410,6 +465,44 @@ cmd_get_fan_speed:
     CALL uart_send_byte
     GOTO uart_cmd_exit
 
+cmd_get_all:
+    CALL send_frame
+    GOTO uart_cmd_exit
+
+cmd_stream_on:
+    BSF stream_flags, 0
+    BSF stream_flags, 1     ; ilk cerceveyi hemen gonder
+    GOTO uart_cmd_exit
+
+cmd_stream_off:
+    CLRF stream_flags
+    GOTO uart_cmd_exit
+
+send_frame:
+    ; Tum degerler tek cercevede
+    MOVLW 0xAA          ; Senkron byte
+    CALL uart_send_byte
+    CLRF frame_chk
+    MOVLW 5             ; Veri uzunlugu
+    CALL frame_send_byte
+    MOVF target_val, W
+    CALL frame_send_byte
+    MOVF target_decimal, W
+    CALL frame_send_byte
+    MOVF adc_val, W
+    CALL frame_send_byte
+    MOVLW 0             ; Ambient fractional (ADC tam deger)
+    CALL frame_send_byte
+    MOVF fan_speed, W
+    CALL frame_send_byte
+    MOVF frame_chk, W
+    GOTO uart_send_byte
+
+frame_send_byte:
+    ; W'yi gonder ve checksum'a XOR'la
+    XORWF frame_chk, F
+    GOTO uart_send_byte
+
 uart_set_cmd:
     ; SET komutu (bit 7 = 1)
     ; Bit 6: 0=fractional, 1=integral
@@ -422,6 +515,7 @@ uart_set_cmd:
     MOVF rx_byte, W
     ANDLW 0x3F          ; Alt 6 bit (0-63 arasi)
     MOVWF target_decimal
+    BSF stream_flags, 1
     GOTO uart_cmd_exit
 
 cmd_set_desired_int:
@@ -429,6 +523,7 @@ cmd_set_desired_int:
     MOVF rx_byte, W
     ANDLW 0x3F          ; Alt 6 bit (0-63 arasi, ama 10-50 kabul edilir)
     MOVWF target_val
+    BSF stream_flags, 1
     
     ; Aralik kontrolu (10-50)
     MOVLW 10
@@ -448,19 +543,115 @@ set_default_temp:
     MOVWF target_val
     GOTO uart_cmd_exit
 
-uart_clear_oerr:
-    BANKSEL RCSTA
-    BCF RCSTA, 4
-    BSF RCSTA, 4
-    BANKSEL RCREG
-    MOVF RCREG, W
+uart_cmd_exit:
+    ; Tamponda kalan komutlari da ayni dongude isle
+    GOTO uart_check_command
+
+uart_cmd_done:
     BCF STATUS, 5
     BCF STATUS, 6
+    RETURN
+
+; ============================================
+; KESME SERVIS RUTINI (UART RX / TX)
+; ============================================
+isr:
+    MOVWF w_temp
+    SWAPF STATUS, W
+    CLRF STATUS             ; Bank 0, IRP=0
+    MOVWF status_temp
+    MOVF PCLATH, W
+    MOVWF pclath_temp
+    CLRF PCLATH
+    MOVF FSR, W
+    MOVWF fsr_temp
+
+isr_rx:
+    BTFSS PIR1, 5           ; RCIF - FIFO bos ise TX'e gec
+    GOTO isr_tx
+    BTFSC RCSTA, 1          ; OERR
+    GOTO isr_clear_oerr
+    
+    ; rx_buf[rx_head] = RCREG
+    MOVF rx_head, W
+    ADDLW rx_buf
+    MOVWF FSR
+    MOVF RCREG, W
+    MOVWF INDF
     
-uart_cmd_exit:
+    ; rx_head = (rx_head + 1) & 0x0F, tampon dolu ise byte atilir
+    INCF rx_head, W
+    ANDLW 0x0F
+    XORWF rx_tail, W
+    BTFSC STATUS, 2
+    GOTO isr_rx
+    XORWF rx_tail, W        ; W = yeni rx_head
+    MOVWF rx_head
+    GOTO isr_rx             ; FIFO'daki ikinci byte'i da al
+
+isr_clear_oerr:
+    BCF RCSTA, 4            ; CREN=0 OERR'i temizler
+    BSF RCSTA, 4
+    GOTO isr_rx
+
+isr_tx:
+    BANKSEL PIE1
+    BTFSS PIE1, 4           ; TXIE kapali ise gonderilecek bir sey yok
+    GOTO isr_exit
+    BANKSEL PIR1
+    BTFSS PIR1, 4           ; TXIF - TXREG bos mu?
+    GOTO isr_exit
+    
+    MOVF tx_tail, W
+    XORWF tx_head, W
+    BTFSC STATUS, 2
+    GOTO isr_tx_empty
+    
+    ; TXREG = tx_buf[tx_tail]
+    MOVF tx_tail, W
+    ADDLW tx_buf
+    MOVWF FSR
+    MOVF INDF, W
+    MOVWF TXREG
+    INCF tx_tail, W
+    ANDLW 0x0F
+    MOVWF tx_tail
+    GOTO isr_exit
+
+isr_tx_empty:
+    BANKSEL PIE1
+    BCF PIE1, 4             ; Kuyruk bos - TXIE kapat
+
+isr_exit:
     BCF STATUS, 5
     BCF STATUS, 6
+    MOVF fsr_temp, W
+    MOVWF FSR
+    MOVF pclath_temp, W
+    MOVWF PCLATH
+    SWAPF status_temp, W
+    MOVWF STATUS
+    SWAPF w_temp, F
+    SWAPF w_temp, W
+    RETFIE
+
+; ============================================
+; TELEMETRI STREAM
+; ============================================
+stream_check:
+    ; Stream kapali ise cik
+    BTFSS stream_flags, 0
     RETURN
+    ; Degisiklik varsa hemen, yoksa STREAM_PERIOD dongude bir gonder
+    BTFSC stream_flags, 1
+    GOTO stream_send
+    DECFSZ stream_count, F
+    RETURN
+stream_send:
+    BCF stream_flags, 1
+    MOVLW STREAM_PERIOD
+    MOVWF stream_count
+    GOTO send_frame
 
 ; ============================================
 ; FAN HIZI OLCUMU
@@ -473,6 +664,10 @@ measure_fan_speed:
     RETURN
     
     MOVF TMR0, W
+    XORWF fan_speed, W      ; W = yeni ^ eski
+    BTFSS STATUS, 2
+    BSF stream_flags, 1     ; fan hizi degisti
+    XORWF fan_speed, W      ; W = yeni
     MOVWF fan_speed
     CLRF TMR0
     CLRF timer_tick
@@ -797,6 +992,7 @@ add_digit2:
     MOVWF target_decimal
     
     CLRF key_step
+    BSF stream_flags, 1     ; setpoint degisti
     RETURN
 
 reject_value:
@@ -804,6 +1000,7 @@ reject_value:
     MOVWF target_val
     CLRF target_decimal
     CLRF key_step
+    BSF stream_flags, 1
     RETURN
 
 ; ============================================
@@ -907,6 +1104,20 @@ init:
     BCF STATUS, 5
     BCF STATUS, 6
     
+    ; UART halka tamponlarini sifirla
+    CLRF rx_head
+    CLRF rx_tail
+    CLRF tx_head
+    CLRF tx_tail
+    
+    ; UART kesmeleri: RCIE acik, TXIE kuyruga byte eklenince acilir
+    BANKSEL PIE1
+    BSF PIE1, 5             ; RCIE
+    BCF STATUS, 5
+    BCF STATUS, 6
+    BSF INTCON, 6           ; PEIE
+    BSF INTCON, 7           ; GIE
+    
     CALL delay_mux
     RETURN
 
@@ -926,14 +1137,30 @@ d1:
 ; UART SEND
 ; ============================================
 uart_send_byte:
+    ; Byte'i TX kuyruguna ekle, ISR gonderir
     MOVWF tx_byte
 uart_wait_tx:
-    BANKSEL TXSTA
-    BTFSS TXSTA, 1
+    ; Kuyruk dolu ise ISR yer acana kadar bekle
+    BCF STATUS, 5
+    BCF STATUS, 6
+    INCF tx_head, W
+    ANDLW 0x0F
+    XORWF tx_tail, W
+    BTFSC STATUS, 2
     GOTO uart_wait_tx
-    BANKSEL TXREG
+    
+    ; tx_buf[tx_head] = tx_byte
+    MOVF tx_head, W
+    ADDLW tx_buf
+    MOVWF FSR
     MOVF tx_byte, W
-    MOVWF TXREG
+    MOVWF INDF
+    INCF tx_head, W
+    ANDLW 0x0F
+    MOVWF tx_head
+    
+    BANKSEL PIE1
+    BSF PIE1, 4             ; TXIE
     BCF STATUS, 5
     BCF STATUS, 6
     RETURN
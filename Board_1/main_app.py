@@ -14,6 +14,9 @@ from tkinter import ttk
 # Import the individual board applications
 from home_automation import AirConditionerApp, AirConditionerSystemConnection
 from curtain_control import CurtainControlApp, CurtainControlSystemConnection
+from app_logging import setup_logging
+from ui_dispatcher import UiDispatcher, TextBindings
+from connection_registry import registry
 
 
 class MainMenuApp:
@@ -26,6 +29,10 @@ class MainMenuApp:
         self.root.configure(bg='#1a1a2e')
         self.root.resizable(False, False)
         
+        # One frame-rate-limited update path for every board window
+        self.dispatcher = UiDispatcher(self.root)
+        self.dispatcher.start()
+        
         self._create_styles()
         self._create_ui()
         
@@ -137,8 +144,6 @@ class MainMenuApp:
         import serial
         import serial.tools.list_ports
         from tkinter import messagebox
-        import threading
-        import time
         
         # Connection object
         connection = AirConditionerSystemConnection()
@@ -220,33 +225,46 @@ class MainMenuApp:
                                 foreground='#888888', background='#1a1a2e')
         status_label.pack(pady=5)
         
-        # Connect button
+        # Connect button: the port's connection is shared through the registry
+        handle = None
+        subscription = None
+        
         def toggle_connection():
-            if connection.is_connected():
-                connection.close()
+            nonlocal connection, handle, subscription
+            if handle is not None:
+                connection.unsubscribe(subscription)
+                handle.release()
+                handle = subscription = None
                 status_label.configure(text="● Disconnected", foreground='#888888')
                 connect_btn.configure(text="Connect", bg='#ff9f43')
-            else:
-                connection.setComPort(port_combo.get())
-                connection.setBaudRate(int(baud_combo.get()))
-                if connection.open():
-                    status_label.configure(text="● Connected", foreground='#00ff88')
-                    connect_btn.configure(text="Disconnect", bg='#ff4444')
-                    # Start update thread
-                    def update_loop():
-                        while connection._is_running:
-                            connection.update()
-                            window.after(0, lambda: update_display())
-                            time.sleep(1.0)
-                    threading.Thread(target=update_loop, daemon=True).start()
-                else:
-                    messagebox.showerror("Error", "Connection failed")
-        
-        def update_display():
+                return
+            try:
+                handle = registry.acquire(AirConditionerSystemConnection, port_combo.get(),
+                                          int(baud_combo.get()), connection=connection)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            if handle is None:
+                messagebox.showerror("Error", "Connection failed")
+                return
+            connection = handle.connection
+            # Only polls that changed a value reach the window
+            subscription = connection.subscribe(
+                callback=lambda snapshot: self.dispatcher.post(window, snapshot))
+            status_label.configure(text="● Connected", foreground='#00ff88')
+            connect_btn.configure(text="Disconnect", bg='#ff4444')
+        
+        labels = TextBindings(
+            (ambient_label, lambda snapshot: f"{snapshot.ambient:.1f} °C"),
+            (desired_label, lambda snapshot: f"{snapshot.desired:.1f} °C"),
+            (fan_label, lambda snapshot: f"{snapshot.fan:.0f} rps"))
+        
+        def update_display(sample):
             if connection.is_connected():
-                ambient_label.configure(text=f"{connection.getAmbientTemp():.1f} °C")
-                desired_label.configure(text=f"{connection.getDesiredTemp():.1f} °C")
-                fan_label.configure(text=f"{connection.getFanSpeed()} rps")
+                return labels(sample)
+            return 0
+        
+        self.dispatcher.register(window, update_display)
         
         connect_btn = tk.Button(main_frame, text="Connect",
                                command=toggle_connection,
@@ -307,8 +325,15 @@ class MainMenuApp:
                  bg='#0f3460', fg='#ffffff', font=('Segoe UI', 11),
                  width=30, anchor='w', padx=10).pack(pady=5)
         
+        def close_window():
+            if handle is not None:
+                toggle_connection()
+            self.dispatcher.unregister(window)
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", close_window)
         tk.Button(menu_frame, text="2. Return",
-                 command=lambda: [connection.close(), window.destroy()],
+                 command=close_window,
                  bg='#0f3460', fg='#ffffff', font=('Segoe UI', 11),
                  width=30, height=2, anchor='w', padx=10).pack(pady=5)
     
@@ -317,8 +342,6 @@ class MainMenuApp:
         import serial
         import serial.tools.list_ports
         from tkinter import messagebox
-        import threading
-        import time
         
         # Connection object
         connection = CurtainControlSystemConnection()
@@ -410,34 +433,47 @@ class MainMenuApp:
                                 foreground='#888888', background='#1a1a2e')
         status_label.pack(pady=5)
         
-        # Connect button
+        # Connect button: the port's connection is shared through the registry
+        handle = None
+        subscription = None
+        
         def toggle_connection():
-            if connection.is_connected():
-                connection.close()
+            nonlocal connection, handle, subscription
+            if handle is not None:
+                connection.unsubscribe(subscription)
+                handle.release()
+                handle = subscription = None
                 status_label.configure(text="● Disconnected", foreground='#888888')
                 connect_btn.configure(text="Connect", bg='#ff9f43')
-            else:
-                connection.setComPort(port_combo.get())
-                connection.setBaudRate(int(baud_combo.get()))
-                if connection.open():
-                    status_label.configure(text="● Connected", foreground='#00ff88')
-                    connect_btn.configure(text="Disconnect", bg='#ff4444')
-                    # Start update thread
-                    def update_loop():
-                        while connection._is_running:
-                            connection.update()
-                            window.after(0, lambda: update_display())
-                            time.sleep(1.0)
-                    threading.Thread(target=update_loop, daemon=True).start()
-                else:
-                    messagebox.showerror("Error", "Connection failed")
-        
-        def update_display():
+                return
+            try:
+                handle = registry.acquire(CurtainControlSystemConnection, port_combo.get(),
+                                          int(baud_combo.get()), connection=connection)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            if handle is None:
+                messagebox.showerror("Error", "Connection failed")
+                return
+            connection = handle.connection
+            # Only polls that changed a value reach the window
+            subscription = connection.subscribe(
+                callback=lambda snapshot: self.dispatcher.post(window, snapshot))
+            status_label.configure(text="● Connected", foreground='#00ff88')
+            connect_btn.configure(text="Disconnect", bg='#ff4444')
+        
+        labels = TextBindings(
+            (temp_label, lambda snapshot: f"{snapshot.temperature:.1f} °C"),
+            (press_label, lambda snapshot: f"{snapshot.pressure:.1f} hPa"),
+            (curtain_label, lambda snapshot: f"{snapshot.curtain:.1f} %"),
+            (light_label, lambda snapshot: f"{snapshot.light:.1f} Lux"))
+        
+        def update_display(sample):
             if connection.is_connected():
-                temp_label.configure(text=f"{connection.getOutdoorTemp():.1f} °C")
-                press_label.configure(text=f"{connection.getOutdoorPress():.1f} hPa")
-                curtain_label.configure(text=f"{connection.getCurtainStatus():.1f} %")
-                light_label.configure(text=f"{connection.getLightIntensity():.1f} Lux")
+                return labels(sample)
+            return 0
+        
+        self.dispatcher.register(window, update_display)
         
         connect_btn = tk.Button(main_frame, text="Connect",
                                command=toggle_connection,
@@ -498,13 +534,21 @@ class MainMenuApp:
                  bg='#0f3460', fg='#ffffff', font=('Segoe UI', 11),
                  width=30, anchor='w', padx=10).pack(pady=5)
         
+        def close_window():
+            if handle is not None:
+                toggle_connection()
+            self.dispatcher.unregister(window)
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", close_window)
         tk.Button(menu_frame, text="2. Return",
-                 command=lambda: [connection.close(), window.destroy()],
+                 command=close_window,
                  bg='#0f3460', fg='#ffffff', font=('Segoe UI', 11),
                  width=30, height=2, anchor='w', padx=10).pack(pady=5)
     
     def _exit_app(self):
         """Exit the application"""
+        self.dispatcher.stop()
         self.root.quit()
     
     def run(self):
@@ -515,6 +559,7 @@ class MainMenuApp:
 
 def main():
     """Main entry point"""
+    setup_logging()
     app = MainMenuApp()
     app.run()
 
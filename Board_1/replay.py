@@ -0,0 +1,403 @@
+"""
+Trace Replay
+Drives the connection classes and GUIs from recorded data, without a board
+
+A replay source is either a telemetry recording (telemetry_recorder.py) or
+a raw UART trace (uart_trace.py). Either one is turned into a Timeline of
+board states: the CMD_GET_ALL frame values the board would have reported
+at each recorded moment. ReplaySerial is a pyserial stand-in that answers
+the connection's GETs, 0x09 frames and streaming from that timeline, so the
+unmodified update() / streaming code paths run against field data.
+
+Speed:
+    speed=1.0     real time
+    speed=100     100x accelerated, recorded gaps are divided by 100
+    speed=None    as fast as the connection polls: every poll cycle moves
+                  to the next state (a command asked twice starts a cycle)
+
+SET writes are accepted and kept in ReplaySerial.writes but do not change
+the replayed values.
+
+Usage:
+    python replay.py board1.rec [--speed 100 | --max] [--loop] [--gui]
+    python replay.py field.trace --max
+Without --gui the replay runs headless and prints the achieved samples/s.
+"""
+
+import argparse
+import bisect
+import threading
+import time
+
+import home_automation
+import curtain_control
+from home_automation import CMD_GET_ALL, CMD_STREAM_ON, CMD_STREAM_OFF, FRAME_SYNC
+from telemetry_history import HISTORY_SCALE
+from telemetry_recorder import MAGIC as RECORDING_MAGIC, TelemetryReader
+from trace_analyzer import TraceAnalyzer
+from uart_trace import TRACE_MAGIC, read_trace
+from app_logging import setup_logging
+
+
+# Connection class -> (module, bytes per HISTORY_FIELDS entry in the frame)
+BOARDS = {
+    home_automation.AirConditionerSystemConnection: (home_automation, (2, 2, 1)),
+    curtain_control.CurtainControlSystemConnection: (curtain_control, (2, 2, 2, 2)),
+}
+
+# The per-byte GET of a 16-bit field only returns the low byte;
+# CurtainControlSystemConnection assumes H=3 for the pressure, so do the same
+WORD_HIGH_DEFAULT = 768
+
+
+def _slot_limits(layout) -> list:
+    """Largest value of every slot of a struct layout of B/H fields"""
+    return [0xFF if code == "B" else 0xFFFF for code in layout.format.lstrip("<>=!@")]
+
+
+class Timeline:
+    """Board states in time order for one connection class"""
+
+    def __init__(self, board_class, times, frames):
+        self.board_class = board_class
+        self.times = list(times)      # ns, ascending
+        self.frames = list(frames)    # TELEMETRY_FRAME values per time
+        if not self.times:
+            raise ValueError("nothing to replay")
+        module = BOARDS[board_class][0]
+        self.poll_sequence = module.POLL_SEQUENCE
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the first to the last state"""
+        return (self.times[-1] - self.times[0]) / 1e9
+
+    def index_at(self, timestamp_ns: int) -> int:
+        """Index of the state valid at timestamp_ns"""
+        return max(0, bisect.bisect_right(self.times, timestamp_ns) - 1)
+
+
+def encode_sample(board_class, values) -> tuple:
+    """Frame values (fixed-point bytes) for one sample of HISTORY_FIELDS floats"""
+    _, slots = BOARDS[board_class]
+    limits = _slot_limits(board_class.TELEMETRY_FRAME)
+    frame = []
+    for value, count in zip(values, slots):
+        tenths = max(0, round(value * HISTORY_SCALE))
+        if count == 2:
+            frame.extend((tenths // HISTORY_SCALE, tenths % HISTORY_SCALE))
+        else:
+            frame.append(tenths // HISTORY_SCALE)
+    return tuple(min(value, limit) for value, limit in zip(frame, limits))
+
+
+def timeline_from_recording(path: str) -> Timeline:
+    """Timeline of a telemetry recording, the board is found by its fields"""
+    with TelemetryReader(path) as reader:
+        board_class = next((cls for cls in BOARDS if cls.HISTORY_FIELDS == reader.fields), None)
+        if board_class is None:
+            raise ValueError(f"no board records the fields {reader.fields}")
+        times, columns = reader.read()
+    rows = zip(*(columns[field] for field in board_class.HISTORY_FIELDS))
+    return Timeline(board_class, times, [encode_sample(board_class, row) for row in rows])
+
+
+def timeline_from_trace(path: str, timeout: float = None) -> Timeline:
+    """Timeline of the replies in a raw UART trace.
+
+    Per-byte replies of one poll cycle (until a command repeats) become one
+    state; every frame is a state of its own.
+    """
+    header, events = read_trace(path)
+    analyzer = TraceAnalyzer(header["board"], timeout or header["response_timeout"])
+    board_class = next(cls for cls in BOARDS if cls.__name__ == header["board"])
+    layout = board_class.TELEMETRY_FRAME
+    slot_of = {cmd: index for index, cmd in enumerate(BOARDS[board_class][0].POLL_SEQUENCE)}
+    words = [limit == 0xFFFF for limit in _slot_limits(layout)]
+    state = [WORD_HIGH_DEFAULT if word else 0 for word in words]
+    times, frames = [], []
+    cycle = {"touched": set(), "started": None}
+
+    def emit(timestamp_ns):
+        times.append(timestamp_ns)
+        frames.append(tuple(state))
+        cycle["touched"].clear()
+
+    def on_reply(cmd, timestamp_ns, data):
+        if cmd == CMD_GET_ALL:
+            if cycle["touched"]:
+                emit(cycle["started"])
+            state[:] = layout.unpack_from(data, 2)
+            emit(timestamp_ns)
+            return
+        slot = slot_of[cmd]
+        if slot in cycle["touched"]:
+            emit(cycle["started"])
+        if not cycle["touched"]:
+            cycle["started"] = timestamp_ns
+        cycle["touched"].add(slot)
+        state[slot] = (state[slot] & 0xFF00 | data[0]) if words[slot] else data[0]
+
+    analyzer.on_reply = on_reply
+    for timestamp_ns, kind, data in events:
+        analyzer.feed(timestamp_ns, kind, data)
+    if cycle["touched"]:
+        emit(cycle["started"])
+    return Timeline(board_class, times, frames)
+
+
+def load_timeline(path: str) -> Timeline:
+    """Timeline of a recording or trace file, told apart by their header"""
+    with open(path, "rb") as f:
+        magic = f.read(len(TRACE_MAGIC))
+    if magic == TRACE_MAGIC:
+        return timeline_from_trace(path)
+    if magic == RECORDING_MAGIC:
+        return timeline_from_recording(path)
+    raise ValueError(f"{path} is neither a telemetry recording nor a UART trace")
+
+
+class ReplaySerial:
+    """pyserial stand-in answering from a Timeline"""
+
+    def __init__(self, timeline: Timeline, speed: float = 1.0, loop: bool = False,
+                 timeout: float = 0.1):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for as fast as polled")
+        self.timeline = timeline
+        self.speed = speed
+        self.loop = loop
+        self.timeout = timeout
+        self.writes = bytearray()   # SET bytes received
+        self.is_open = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._layout = timeline.board_class.TELEMETRY_FRAME
+        self._slot_of = {cmd: index for index, cmd in enumerate(timeline.poll_sequence)}
+        self.open()
+
+    def __str__(self) -> str:
+        speed = "max speed" if self.speed is None else f"{self.speed:g}x"
+        return f"replay of {len(self.timeline)} {self.timeline.board_class.__name__} states at {speed}"
+
+    @property
+    def position(self) -> int:
+        """Index of the state being replayed"""
+        with self._lock:
+            return self._current()
+
+    @property
+    def finished(self) -> bool:
+        """True once the last state is reached (never while looping)"""
+        with self._lock:
+            if self.speed is None:
+                last = len(self.timeline) - 1
+                return not self.loop and self._index == last and (
+                    bool(self._answered) or self._pushed == last)
+            return not self.loop and self._clock() >= self.timeline.times[-1]
+
+    def open(self) -> None:
+        """(Re)start the replay at the first state"""
+        with self._lock:
+            self._rx = bytearray()
+            self._index = 0
+            self._started = None       # clock starts with the first command
+            self._answered = set()
+            self._streaming = False
+            self._pushed = None
+            self._closed.clear()
+            self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+        self._closed.set()
+
+    def write(self, data) -> int:
+        with self._lock:
+            for cmd in bytes(data):
+                if cmd & 0x80:
+                    self.writes.append(cmd)
+                elif cmd == CMD_STREAM_ON:
+                    self._streaming = True
+                    self._pushed = None
+                elif cmd == CMD_STREAM_OFF:
+                    self._streaming = False
+                elif cmd == CMD_GET_ALL:
+                    self._poll(CMD_GET_ALL)
+                    self._rx += self._frame(self._current())
+                elif cmd in self._slot_of:
+                    self._poll(cmd)
+                    self._rx.append(self.timeline.frames[self._current()][self._slot_of[cmd]] & 0xFF)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._lock:
+                self._push_stream()
+                if len(self._rx) >= size or not self._streaming:
+                    break
+                wait = min(deadline - time.monotonic(), self._until_next())
+            if wait <= 0 or self._closed.wait(wait):
+                break
+        with self._lock:
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+        return data
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            self._push_stream()
+            return len(self._rx)
+
+    def reset_input_buffer(self) -> None:
+        with self._lock:
+            self._rx.clear()
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def _clock(self) -> int:
+        """Replay time in the timeline's ns (speed mode)"""
+        if self._started is None:
+            self._started = time.monotonic_ns()
+        times = self.timeline.times
+        elapsed = int((time.monotonic_ns() - self._started) * self.speed)
+        if self.loop:
+            elapsed %= times[-1] - times[0] + 1
+        return times[0] + elapsed
+
+    def _current(self) -> int:
+        if self.speed is None:
+            return self._index
+        return self.timeline.index_at(self._clock())
+
+    def _poll(self, cmd) -> None:
+        """Max speed: a command asked again starts the next poll cycle"""
+        if self.speed is not None:
+            self._clock()
+            return
+        if cmd in self._answered or (cmd == CMD_GET_ALL and self._answered):
+            self._advance()
+        self._answered.add(cmd)
+
+    def _advance(self) -> None:
+        self._answered.clear()
+        if self._index + 1 < len(self.timeline):
+            self._index += 1
+        elif self.loop:
+            self._index = 0
+
+    def _push_stream(self) -> None:
+        """While streaming, queue a frame for every new state"""
+        if not self._streaming:
+            return
+        if self.speed is None:
+            if not self._rx:
+                if self._pushed is not None:
+                    self._advance()
+                self._rx += self._frame(self._index)
+                self._pushed = self._index
+            return
+        index = self._current()
+        if index != self._pushed:
+            self._rx += self._frame(index)
+            self._pushed = index
+
+    def _until_next(self) -> float:
+        """Seconds until the replayed state changes"""
+        if self.speed is None:
+            return 0.0
+        times = self.timeline.times
+        index = self._current()
+        if index + 1 >= len(times):
+            return self.timeout
+        return max(0.0, (times[index + 1] - self._clock()) / 1e9 / self.speed)
+
+    def _frame(self, index: int) -> bytes:
+        payload = self._layout.pack(*self.timeline.frames[index])
+        checksum = len(payload)
+        for byte in payload:
+            checksum ^= byte
+        return bytes([FRAME_SYNC, len(payload)]) + payload + bytes([checksum])
+
+
+def scale_periods(connection, speed) -> None:
+    """Scale the connection's poll and field periods to the replay speed"""
+    factor = 0.0 if speed is None else 1.0 / speed
+    connection.setPollPeriods(connection.POLL_MIN_PERIOD * factor,
+                              connection.POLL_MAX_PERIOD * factor)
+    for field, period in list(getattr(connection, 'fieldPeriods', {}).items()):
+        connection.setFieldPeriod(field, period * factor)
+
+
+def replay_into(connection, replay: ReplaySerial) -> None:
+    """Make connection.open() use the replay at its speed"""
+    if not isinstance(connection, replay.timeline.board_class):
+        raise ValueError(f"{replay} cannot drive a {type(connection).__name__}")
+    connection.setTransport(replay)
+    scale_periods(connection, replay.speed)
+
+
+def run_headless(replay: ReplaySerial) -> dict:
+    """Poll through the whole replay, returns samples and samples/s"""
+    connection = replay.timeline.board_class()
+    replay_into(connection, replay)
+    if not connection.open():
+        raise RuntimeError("could not open the replay")
+    started = time.perf_counter()
+    try:
+        while not replay.finished:
+            connection.update()
+            connection.waitNextPoll()
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - started
+    samples = len(connection.history)
+    return {"samples": samples, "seconds": elapsed, "rate": samples / elapsed if elapsed else 0.0}
+
+
+def run_gui(replay: ReplaySerial) -> None:
+    """Open the board's app connected to the replay"""
+    app_class = {
+        home_automation.AirConditionerSystemConnection: home_automation.AirConditionerApp,
+        curtain_control.CurtainControlSystemConnection: curtain_control.CurtainControlApp,
+    }[replay.timeline.board_class]
+    app = app_class()
+    replay_into(app.connection, replay)
+    app.port_combo.set("replay")
+    app.root.after(0, app._connect)
+    app.run()
+
+
+def main():
+    """Replay a recording or trace from the command line"""
+    parser = argparse.ArgumentParser(description="Replay recorded board data")
+    parser.add_argument("source", help="telemetry recording or UART trace")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument("--max", action="store_true", help="replay as fast as polled")
+    parser.add_argument("--loop", action="store_true", help="start over at the end")
+    parser.add_argument("--gui", action="store_true", help="show the board's app")
+    args = parser.parse_args()
+
+    setup_logging()
+    timeline = load_timeline(args.source)
+    replay = ReplaySerial(timeline, None if args.max else args.speed, args.loop)
+    print(f"{args.source}: {len(timeline)} states over {timeline.duration:.1f} s")
+    if args.gui:
+        run_gui(replay)
+    else:
+        result = run_headless(replay)
+        print(f"{result['samples']} samples in {result['seconds']:.2f} s "
+              f"({result['rate']:.0f} samples/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Serial I/O Worker
+Single owner thread for the serial port of one board
+
+Every transaction on a port (GET polls, SET writes) runs on the port's worker
+thread, so SET bytes sent from the GUI thread can never interleave with the
+replies of a poll running on the update thread. Jobs are taken in priority
+order (SETs before queued GETs) and report their result through a
+concurrent.futures.Future.
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+
+# Job priorities, lower runs first
+PRIORITY_SET = 0
+PRIORITY_GET = 1
+
+_PRIORITY_STOP = -1
+
+
+def completed_future(result) -> Future:
+    """Return a Future that already holds result"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class SerialWorker:
+    """Runs serial transactions for one port on a dedicated thread"""
+
+    def __init__(self, name: str = "serial-io"):
+        self.name = name
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the I/O thread"""
+        if self.is_running():
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stop the I/O thread and cancel jobs that have not started"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put((_PRIORITY_STOP, next(self._sequence), None, None, ()))
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        while True:
+            try:
+                _, _, future, _, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future is not None:
+                future.cancel()
+
+    def is_running(self) -> bool:
+        """Check if the I/O thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def is_worker_thread(self) -> bool:
+        """Check if the caller is running on the I/O thread"""
+        return self._thread is threading.current_thread()
+
+    def submit(self, fn, *args, priority: int = PRIORITY_GET) -> Future:
+        """Queue fn(*args) to run on the I/O thread"""
+        future = Future()
+        if not self.is_running():
+            future.set_exception(RuntimeError(f"{self.name} is not running"))
+            return future
+        self._queue.put((priority, next(self._sequence), future, fn, args))
+        return future
+
+    def _run(self) -> None:
+        """I/O thread: execute queued jobs one at a time"""
+        while True:
+            _, _, future, fn, args = self._queue.get()
+            if fn is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
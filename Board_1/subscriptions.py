@@ -0,0 +1,188 @@
+"""
+Subscriptions
+Change-driven delivery of a connection's snapshots to many consumers
+
+connection.subscribe() registers a Subscription. After every poll the
+update thread offers the new TelemetrySnapshot to each subscription, whose
+predicate decides whether this consumer cares; only matching snapshots are
+queued (or handed to its callback). One poll stream serves GUIs, loggers
+and automation rules, and none of them wakes up for samples it ignores.
+
+Predicates are called with the snapshot and keep their own state, so each
+subscription needs its own predicate object. changed() and reached() only
+look at the fields read for the snapshot (snapshot.updated), a value the
+poll repeated from an earlier read never matches:
+
+    changed(field, by)         field moved by at least `by` since the last
+                               snapshot it let through (any field if None)
+    reached(field, target, tolerance)
+                               field came within tolerance of target, once
+                               per arrival
+    every                      all samples
+
+Every subscription has a bounded queue. When a consumer falls behind, the
+overflow policy decides what gives:
+
+    drop_oldest   keep the newest snapshots (GUIs, dashboards)
+    drop_newest   keep what is queued, discard new arrivals
+    block         the update thread waits up to block_timeout for room
+                  (backpressure), then drops the new snapshot
+
+Dropped snapshots are counted in Subscription.dropped.
+
+Usage:
+    alerts = connection.subscribe(changed('ambient', by=0.5))
+    for snapshot in alerts:          # blocks, ends when closed
+        notify(snapshot.ambient)
+
+    connection.subscribe(reached('curtain', 100.0), callback=on_open)
+"""
+
+import threading
+from collections import deque
+
+from app_logging import get_logger
+from telemetry_snapshot import SNAPSHOT_SCALE
+
+log = get_logger("subscriptions")
+
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+def every(snapshot) -> bool:
+    """Predicate matching every sample"""
+    return True
+
+
+def changed(field: str = None, by: float = 0.0):
+    """Predicate: field (any field if None) differs by at least `by` from
+    the last snapshot it matched. The first snapshot always matches."""
+    threshold = round(by * SNAPSHOT_SCALE)
+    reference = None
+
+    def predicate(snapshot) -> bool:
+        nonlocal reference
+        if reference is None:
+            reference = snapshot
+            return True
+        if field is None:
+            deltas = [abs(new - old) for name, new, old
+                      in zip(snapshot.fields, snapshot.raw, reference.raw)
+                      if name in snapshot.updated]
+        elif field in snapshot.updated:
+            index = snapshot.fields.index(field)
+            deltas = [abs(snapshot.raw[index] - reference.raw[index])]
+        else:
+            return False
+        if any(delta and delta >= threshold for delta in deltas):
+            reference = snapshot
+            return True
+        return False
+
+    return predicate
+
+
+def reached(field: str, target: float, tolerance: float = 0.5):
+    """Predicate: field entered [target - tolerance, target + tolerance]"""
+    inside = False
+
+    def predicate(snapshot) -> bool:
+        nonlocal inside
+        if field not in snapshot.updated:
+            return False
+        was_inside = inside
+        inside = abs(snapshot.value(field) - target) <= tolerance
+        return inside and not was_inside
+
+    return predicate
+
+
+class Subscription:
+    """Bounded queue of the snapshots matching one consumer's predicate"""
+
+    def __init__(self, predicate=None, maxsize: int = 64, overflow: str = "drop_oldest",
+                 callback=None, block_timeout: float = 0.5):
+        """callback(snapshot), if given, runs on the update thread instead of
+        queueing; keep it short (e.g. UiDispatcher.post)."""
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {overflow!r}, use one of {OVERFLOW_POLICIES}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.predicate = predicate or every
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.callback = callback
+        self.block_timeout = block_timeout
+        self.closed = False
+        self.delivered = 0   # snapshots queued or passed to the callback
+        self.dropped = 0     # matching snapshots lost to overflow
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def offer(self, snapshot) -> bool:
+        """Deliver snapshot if it matches (update thread), returns True if delivered"""
+        if self.closed:
+            return False
+        try:
+            if not self.predicate(snapshot):
+                return False
+            if self.callback is not None:
+                self.callback(snapshot)
+                self.delivered += 1
+                return True
+        except Exception as e:
+            log.error("Subscription error: %s", e)
+            return False
+        with self._cond:
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    room = self.overflow == "block" and self._cond.wait_for(
+                        lambda: len(self._queue) < self.maxsize or self.closed,
+                        self.block_timeout)
+                    if not room or self.closed:
+                        self.dropped += 1
+                        return False
+            self._queue.append(snapshot)
+            self.delivered += 1
+            self._cond.notify_all()
+        return True
+
+    def get(self, timeout: float = None):
+        """Next snapshot, None on timeout or once closed and drained"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            if not self._queue:
+                return None
+            snapshot = self._queue.popleft()
+            self._cond.notify_all()
+            return snapshot
+
+    def drain(self) -> list:
+        """All queued snapshots without waiting"""
+        with self._cond:
+            snapshots = list(self._queue)
+            self._queue.clear()
+            self._cond.notify_all()
+            return snapshots
+
+    def close(self) -> None:
+        """Stop delivery and wake blocked readers and writers"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __iter__(self):
+        """Yield snapshots until the subscription is closed"""
+        while True:
+            snapshot = self.get()
+            if snapshot is None:
+                return
+            yield snapshot
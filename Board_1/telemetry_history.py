@@ -0,0 +1,133 @@
+"""
+Telemetry History
+Fixed-capacity, columnar ring buffer of decoded samples
+
+Every connection keeps its recent samples here. Storage is preallocated
+when the buffer is created: one array('q') of monotonic nanosecond
+timestamps plus one array('i') per field holding fixed-point tenths
+(25.5 C is stored as 255), so appending is O(1) and allocates nothing.
+
+Reads return a HistoryWindow whose columns are memoryview slices of the
+arrays: a window covers at most two contiguous segments (before and after
+the wrap point) and is not copied. Segments can be handed to array/struct
+code or wrapped with numpy.frombuffer without copying.
+
+Samples are appended by one thread (the connection's I/O or stream thread);
+a window read while the writer wraps over it may see newer samples.
+"""
+
+from array import array
+
+
+HISTORY_SCALE = 10  # values are stored in tenths
+
+
+class HistoryWindow:
+    """Zero-copy view of consecutive samples"""
+
+    def __init__(self, fields, time_segments, column_segments):
+        self.fields = tuple(fields)
+        self.times = time_segments          # list of memoryview('q'), ns
+        self.columns = column_segments      # field -> list of memoryview('i')
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.times)
+
+    def column(self, field: str):
+        """Iterate the raw tenths of one field, oldest first"""
+        for segment in self.columns[field]:
+            yield from segment
+
+    def values(self, field: str) -> list:
+        """Copy of one field as floats"""
+        return [value / HISTORY_SCALE for value in self.column(field)]
+
+    def timestamps(self) -> list:
+        """Copy of the timestamps in seconds (time.monotonic() scale)"""
+        return [stamp / 1e9 for segment in self.times for stamp in segment]
+
+
+class TelemetryHistory:
+    """Preallocated ring buffer with one column per field"""
+
+    def __init__(self, fields, capacity: int = 86400):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._times = array('q', bytes(8 * capacity))
+        self._columns = {field: array('i', bytes(4 * capacity)) for field in self.fields}
+        self._column_list = [self._columns[field] for field in self.fields]
+        self._next = 0    # slot written by the next append
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp_ns: int, values) -> None:
+        """Store one sample, values in field order, overwriting the oldest"""
+        slot = self._next
+        self._times[slot] = timestamp_ns
+        for column, value in zip(self._column_list, values):
+            column[slot] = round(value * HISTORY_SCALE)
+        self._next = slot + 1 if slot + 1 < self.capacity else 0
+        if self._count < self.capacity:
+            self._count += 1
+
+    def clear(self) -> None:
+        """Forget all samples, storage stays allocated"""
+        self._next = 0
+        self._count = 0
+
+    def latest(self):
+        """(timestamp_ns, values) of the newest sample, None if empty"""
+        if not self._count:
+            return None
+        slot = self._next - 1 if self._next else self.capacity - 1
+        return (self._times[slot],
+                tuple(column[slot] / HISTORY_SCALE for column in self._column_list))
+
+    def last(self, count: int) -> HistoryWindow:
+        """Window over the newest count samples"""
+        count = max(0, min(count, self._count))
+        return self._window(self._count - count, self._count)
+
+    def window(self, since_ns: int = None, until_ns: int = None) -> HistoryWindow:
+        """Window over the samples with since_ns <= timestamp < until_ns"""
+        start = 0 if since_ns is None else self._bisect(since_ns)
+        end = self._count if until_ns is None else self._bisect(until_ns)
+        return self._window(start, max(start, end))
+
+    def _slot(self, index: int) -> int:
+        """Array slot of the index-th oldest sample"""
+        slot = self._next - self._count + index
+        return slot + self.capacity if slot < 0 else slot
+
+    def _bisect(self, timestamp_ns: int) -> int:
+        """Index of the first sample at or after timestamp_ns"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._times[self._slot(middle)] < timestamp_ns:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _window(self, start: int, end: int) -> HistoryWindow:
+        """Split logical range [start, end) into at most two array slices"""
+        ranges = []
+        if end > start:
+            first = self._slot(start)
+            last = self._slot(end - 1) + 1
+            if last > first:
+                ranges.append((first, last))
+            else:
+                ranges.append((first, self.capacity))
+                ranges.append((0, last))
+        times = memoryview(self._times)
+        return HistoryWindow(
+            self.fields,
+            [times[a:b] for a, b in ranges],
+            {field: [memoryview(column)[a:b] for a, b in ranges]
+             for field, column in self._columns.items()})
@@ -0,0 +1,345 @@
+"""
+Telemetry Recorder
+Appends every decoded sample of a connection to a memory-mapped columnar file
+
+The file is a fixed header followed by fixed-size blocks. Each block holds
+BLOCK_ROWS samples column by column: one int64 column of wall clock
+timestamps (ns since the epoch) and one int32 column per field in tenths,
+the same fixed point as telemetry_history. A sample is 8 + 4 * fields bytes
+on disk (20 bytes for Board 1, 24 for Board 2), about 60 MB per board and
+month at one sample per second.
+
+The writer maps only the block being filled. Every block starts with its
+own header (row count, first and last timestamp), and the row count is
+written after the row itself, so a TelemetryReader can open the file while
+it is still being recorded and never sees half a sample. Dirty pages are
+flushed to disk every flush_interval seconds and on close(), not per sample.
+
+Usage:
+    recorder = TelemetryRecorder("board1.rec", connection.HISTORY_FIELDS)
+    connection.setRecorder(recorder)
+    ...
+    reader = TelemetryReader("board1.rec")
+    times, columns = reader.read(since_ns=time.time_ns() - 3600 * 10**9)
+
+    python telemetry_recorder.py board1.rec [--tail 10]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import threading
+import time
+
+from telemetry_history import HISTORY_SCALE
+
+
+MAGIC = b"HATREC1\0"
+BLOCK_MAGIC = b"BLK\0"
+BLOCK_ROWS = 4096
+HEADER_SIZE = 4096  # file header, padded so block 0 starts on a page
+
+# magic, field count, scale, rows per block, block size, first block offset,
+# length of the comma separated field names that follow
+FILE_HEADER = struct.Struct("<8sHHIIIH")
+# magic, rows, first timestamp, last timestamp, block number
+BLOCK_HEADER = struct.Struct("<4sIqqI4x")
+TIMESTAMP = struct.Struct("<q")
+VALUE = struct.Struct("<i")
+
+PAGE = 4096
+
+
+def _block_size(field_count: int, block_rows: int) -> int:
+    """Bytes of one block, rounded up to whole pages"""
+    size = BLOCK_HEADER.size + block_rows * (TIMESTAMP.size + VALUE.size * field_count)
+    return -(-size // PAGE) * PAGE
+
+
+class _Layout:
+    """Offsets shared by the writer and the reader"""
+
+    def __init__(self, fields, block_rows: int, block_size: int, data_offset: int):
+        self.fields = tuple(fields)
+        self.block_rows = block_rows
+        self.block_size = block_size
+        self.data_offset = data_offset
+        self.times_offset = BLOCK_HEADER.size
+        self.column_offsets = [BLOCK_HEADER.size + block_rows * TIMESTAMP.size
+                               + index * block_rows * VALUE.size
+                               for index in range(len(self.fields))]
+
+    def block_offset(self, index: int) -> int:
+        return self.data_offset + index * self.block_size
+
+    def block_count(self, file_size: int) -> int:
+        return max(0, (file_size - self.data_offset) // self.block_size)
+
+
+def _read_header(data) -> _Layout:
+    """Parse the file header from the first HEADER_SIZE bytes"""
+    if len(data) < FILE_HEADER.size:
+        raise ValueError("not a telemetry recording")
+    magic, count, scale, block_rows, block_size, data_offset, names_len = \
+        FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a telemetry recording")
+    if scale != HISTORY_SCALE:
+        raise ValueError(f"unsupported value scale {scale}")
+    names = bytes(data[FILE_HEADER.size:FILE_HEADER.size + names_len]).decode("utf-8")
+    fields = tuple(names.split(",")) if names else ()
+    if len(fields) != count:
+        raise ValueError("corrupt telemetry header")
+    return _Layout(fields, block_rows, block_size, data_offset)
+
+
+class TelemetryRecorder:
+    """Appends samples to a recording, creating it or continuing an existing one"""
+
+    def __init__(self, path: str, fields, block_rows: int = BLOCK_ROWS,
+                 flush_interval: float = 5.0):
+        self.path = path
+        self.fields = tuple(fields)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._map = None
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        self._file = os.fdopen(fd, "r+b")
+        try:
+            self._file.seek(0, os.SEEK_END)
+            if self._file.tell() == 0:
+                self._layout = self._create(block_rows)
+            else:
+                self._file.seek(0)
+                self._layout = _read_header(self._file.read(HEADER_SIZE))
+                if self._layout.fields != self.fields:
+                    raise ValueError(f"{path} records {self._layout.fields}, not {self.fields}")
+            self._resume()
+        except Exception:
+            self._file.close()
+            raise
+        self._last_flush = time.monotonic()
+
+    @property
+    def rows(self) -> int:
+        """Samples recorded in the file"""
+        return self._block * self._layout.block_rows + self._rows
+
+    def append(self, timestamp_ns: int, values) -> None:
+        """Record one sample, values in field order"""
+        layout = self._layout
+        with self._lock:
+            if self._map is None:
+                raise ValueError("recorder is closed")
+            if self._rows == layout.block_rows:
+                self._open_block(self._block + 1)
+            m, base, row = self._map, self._base, self._rows
+            TIMESTAMP.pack_into(m, base + layout.times_offset + row * TIMESTAMP.size,
+                                timestamp_ns)
+            for offset, value in zip(layout.column_offsets, values):
+                VALUE.pack_into(m, base + offset + row * VALUE.size, round(value * HISTORY_SCALE))
+            if row == 0:
+                self._first = timestamp_ns
+            self._rows = row + 1
+            # Row count last: readers only trust rows the header covers
+            BLOCK_HEADER.pack_into(m, base, BLOCK_MAGIC, self._rows,
+                                   self._first, timestamp_ns, self._block)
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                m.flush()
+                self._last_flush = now
+
+    def flush(self) -> None:
+        """Write dirty pages to disk now"""
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Flush and unmap, the file stays valid for readers"""
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._map = None
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _create(self, block_rows: int) -> _Layout:
+        """Write the header of a new file"""
+        names = ",".join(self.fields).encode("utf-8")
+        if FILE_HEADER.size + len(names) > HEADER_SIZE:
+            raise ValueError("too many field names for the header")
+        block_size = _block_size(len(self.fields), block_rows)
+        header = bytearray(HEADER_SIZE)
+        FILE_HEADER.pack_into(header, 0, MAGIC, len(self.fields), HISTORY_SCALE, block_rows,
+                              block_size, HEADER_SIZE, len(names))
+        header[FILE_HEADER.size:FILE_HEADER.size + len(names)] = names
+        self._file.write(header)
+        self._file.flush()
+        return _Layout(self.fields, block_rows, block_size, HEADER_SIZE)
+
+    def _resume(self) -> None:
+        """Continue in the last block of the file"""
+        size = os.fstat(self._file.fileno()).st_size
+        blocks = self._layout.block_count(size)
+        self._open_block(max(0, blocks - 1), extend=blocks == 0)
+
+    def _open_block(self, index: int, extend: bool = True) -> None:
+        """Map block index, growing the file by one block if needed"""
+        layout = self._layout
+        offset = layout.block_offset(index)
+        if extend:
+            os.ftruncate(self._file.fileno(), offset + layout.block_size)
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+        # Map offsets must be multiples of the allocation granularity
+        # (64 KiB on Windows), the block starts _base bytes into the map
+        aligned = offset - offset % mmap.ALLOCATIONGRANULARITY
+        self._base = offset - aligned
+        self._map = mmap.mmap(self._file.fileno(), self._base + layout.block_size,
+                              offset=aligned)
+        self._block = index
+        magic, rows, first, _, _ = BLOCK_HEADER.unpack_from(self._map, self._base)
+        if magic != BLOCK_MAGIC:
+            rows = first = 0
+            BLOCK_HEADER.pack_into(self._map, self._base, BLOCK_MAGIC, 0, 0, 0, index)
+        self._rows = rows
+        self._first = first
+
+
+class TelemetryReader:
+    """Read-only view of a recording, usable while it is being written"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            self._layout = _read_header(self._file.read(HEADER_SIZE))
+            self.refresh()
+        except Exception:
+            self._file.close()
+            raise
+        self.fields = self._layout.fields
+
+    def refresh(self) -> None:
+        """Pick up blocks added since the file was opened"""
+        size = os.fstat(self._file.fileno()).st_size
+        if self._map is not None:
+            if len(self._map) == size:
+                return
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        self._blocks = self._layout.block_count(size)
+
+    def __len__(self) -> int:
+        return sum(rows for _, rows, _, _ in self._block_headers())
+
+    def blocks(self):
+        """Yield (rows, first_ns, last_ns, times, columns) per non-empty block.
+
+        times and columns[field] are lists copied out of the block, values
+        as floats.
+        """
+        for offset, rows, first, last in self._block_headers():
+            if rows:
+                yield self._decode_block(offset, rows, first, last)
+
+    def read(self, since_ns: int = None, until_ns: int = None):
+        """(times, columns) of the samples with since_ns <= timestamp < until_ns"""
+        times = []
+        columns = {field: [] for field in self.fields}
+        for rows, first, last, block_times, block_columns in self._blocks_between(since_ns, until_ns):
+            keep = [index for index, stamp in enumerate(block_times)
+                    if (since_ns is None or stamp >= since_ns)
+                    and (until_ns is None or stamp < until_ns)]
+            if len(keep) == rows:
+                times.extend(block_times)
+                for field in self.fields:
+                    columns[field].extend(block_columns[field])
+            else:
+                times.extend(block_times[index] for index in keep)
+                for field in self.fields:
+                    values = block_columns[field]
+                    columns[field].extend(values[index] for index in keep)
+        return times, columns
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _block_headers(self):
+        """Yield (offset, rows, first_ns, last_ns) of every block"""
+        layout = self._layout
+        for index in range(self._blocks):
+            offset = layout.block_offset(index)
+            magic, rows, first, last, _ = BLOCK_HEADER.unpack_from(self._map, offset)
+            if magic != BLOCK_MAGIC:
+                break  # block allocated but not started yet
+            yield offset, min(rows, layout.block_rows), first, last
+
+    def _blocks_between(self, since_ns, until_ns):
+        """blocks(), skipping blocks entirely outside the time range"""
+        for offset, rows, first, last in self._block_headers():
+            if not rows:
+                continue
+            if since_ns is not None and last < since_ns:
+                continue
+            if until_ns is not None and first >= until_ns:
+                continue
+            yield self._decode_block(offset, rows, first, last)
+
+    def _decode_block(self, offset, rows, first, last):
+        """(rows, first_ns, last_ns, times, columns) of one block"""
+        layout = self._layout
+        times = list(struct.unpack_from(f"<{rows}q", self._map, offset + layout.times_offset))
+        columns = {}
+        for field, column in zip(layout.fields, layout.column_offsets):
+            raw = struct.unpack_from(f"<{rows}i", self._map, offset + column)
+            columns[field] = [value / HISTORY_SCALE for value in raw]
+        return rows, first, last, times, columns
+
+
+def main():
+    """Print a summary (and optionally the newest samples) of a recording"""
+    parser = argparse.ArgumentParser(description="Telemetry recording summary")
+    parser.add_argument("path")
+    parser.add_argument("--tail", type=int, default=0, help="print the newest N samples")
+    args = parser.parse_args()
+
+    with TelemetryReader(args.path) as reader:
+        headers = list(reader._block_headers())
+        samples = sum(rows for _, rows, _, _ in headers)
+        print(f"{args.path}: {samples} samples of {', '.join(reader.fields)} "
+              f"in {len(headers)} blocks")
+        if samples:
+            first = min(first for _, rows, first, _ in headers if rows)
+            last = max(last for _, rows, _, last in headers if rows)
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first / 1e9))} .. "
+                  f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last / 1e9))}")
+        if args.tail:
+            times, columns = reader.read()
+            for index in range(max(0, len(times) - args.tail), len(times)):
+                stamp = time.strftime('%H:%M:%S', time.localtime(times[index] / 1e9))
+                print(stamp, " ".join(f"{columns[field][index]:.1f}" for field in reader.fields))
+
+
+if __name__ == "__main__":
+    main()
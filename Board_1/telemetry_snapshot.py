@@ -0,0 +1,114 @@
+"""
+Telemetry Snapshots
+Immutable, versioned view of a connection's latest sample
+
+Every decoded sample becomes one TelemetrySnapshot (fixed-point values,
+timestamp and a sequence number) that the update thread publishes by
+rebinding connection.snapshot. Rebinding an attribute is atomic, so a
+reader holding a snapshot always sees the values of one poll, never a mix
+of old and new fields, and takes no lock to get them. Whether anything
+arrived since a reader last looked is one comparison of sequence numbers.
+
+SnapshotField keeps the old per-field attributes (ambientTemperature,
+curtainStatus, ...) working: reading one reads the current snapshot,
+assigning one publishes a copy with that field replaced. Only the reader
+of a single field is consistent; use connection.getSnapshot() to read
+several fields together.
+
+Usage:
+    snapshot = connection.getSnapshot()
+    if snapshot.seq != last_seq:
+        show(snapshot.ambient, snapshot.fan)
+        last_seq = snapshot.seq
+"""
+
+# Snapshot values are kept in hundredths: the boards report tenths, values
+# assigned by hand keep two decimals. History and recordings store tenths
+# (telemetry_history.HISTORY_SCALE).
+SNAPSHOT_SCALE = 100
+
+
+class TelemetrySnapshot:
+    """One sample of a connection, immutable once created"""
+
+    __slots__ = ("fields", "raw", "timestamp_ns", "seq", "updated")
+
+    def __init__(self, fields, raw, timestamp_ns: int = 0, seq: int = 0, updated=None):
+        """raw: fixed-point values (value * SNAPSHOT_SCALE) in fields order.
+        updated names the fields read from the board for this sample (all if
+        None), the others repeat their last reading."""
+        if len(raw) != len(fields):
+            raise ValueError(f"{len(raw)} values for fields {fields}")
+        object.__setattr__(self, "fields", tuple(fields))
+        object.__setattr__(self, "raw", tuple(raw))
+        object.__setattr__(self, "timestamp_ns", timestamp_ns)
+        object.__setattr__(self, "seq", seq)
+        object.__setattr__(self, "updated", self.fields if updated is None else tuple(updated))
+
+    @classmethod
+    def from_values(cls, fields, values, timestamp_ns: int, seq: int, updated=None):
+        """Snapshot of float values, rounded to the fixed-point scale"""
+        return cls(fields, tuple(round(value * SNAPSHOT_SCALE) for value in values),
+                   timestamp_ns, seq, updated)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TelemetrySnapshot is immutable, use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("TelemetrySnapshot is immutable")
+
+    def __getattr__(self, name):
+        """Field values as attributes: snapshot.ambient"""
+        if name in TelemetrySnapshot.__slots__:
+            raise AttributeError(name)
+        try:
+            return self.raw[self.fields.index(name)] / SNAPSHOT_SCALE
+        except ValueError:
+            raise AttributeError(f"snapshot has no field {name!r}") from None
+
+    def value(self, field: str) -> float:
+        return self.raw[self.fields.index(field)] / SNAPSHOT_SCALE
+
+    def values(self) -> tuple:
+        """All values as floats, in fields order"""
+        return tuple(value / SNAPSHOT_SCALE for value in self.raw)
+
+    def asdict(self) -> dict:
+        return dict(zip(self.fields, self.values()))
+
+    def replace(self, field: str, value: float, timestamp_ns: int = None):
+        """Copy with one field changed and the next sequence number"""
+        index = self.fields.index(field)
+        raw = self.raw[:index] + (round(value * SNAPSHOT_SCALE),) + self.raw[index + 1:]
+        return TelemetrySnapshot(self.fields, raw,
+                                 self.timestamp_ns if timestamp_ns is None else timestamp_ns,
+                                 self.seq + 1, (field,))
+
+    def __eq__(self, other):
+        if not isinstance(other, TelemetrySnapshot):
+            return NotImplemented
+        return (self.seq, self.timestamp_ns, self.fields, self.raw) == \
+            (other.seq, other.timestamp_ns, other.fields, other.raw)
+
+    def __hash__(self):
+        return hash((self.seq, self.timestamp_ns, self.raw))
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={value:g}" for field, value in self.asdict().items())
+        return f"TelemetrySnapshot(seq={self.seq}, {values})"
+
+
+class SnapshotField:
+    """Connection attribute backed by one field of connection.snapshot"""
+
+    def __init__(self, field: str, kind=float):
+        self.field = field
+        self.kind = kind
+
+    def __get__(self, connection, owner=None):
+        if connection is None:
+            return self
+        return self.kind(connection.snapshot.value(self.field))
+
+    def __set__(self, connection, value):
+        connection.snapshot = connection.snapshot.replace(self.field, value)
@@ -0,0 +1,275 @@
+"""
+Telemetry Store
+SQLite time-series storage of connection samples with 1-minute/1-hour rollups
+
+Every board gets three tables: raw samples keyed by their timestamp, and
+per-minute and per-hour rollups holding count, min, max and sum of every
+field. Samples are queued by the connection's thread and written by one
+background thread in batched transactions; the rollups of a batch are
+aggregated in memory and merged with one UPSERT per bucket, so they stay
+current without ever rescanning raw rows. The database runs in WAL mode,
+queries from other threads read concurrently with the writer.
+
+query() reads raw rows when the span holds at most max_points samples,
+otherwise the finest rollup that does, so "ambient over the last 30 days"
+reads ~720 hourly rows instead of millions of samples.
+
+Usage:
+    store = TelemetryStore("telemetry.db")
+    connection.setRecorder(store.recorder("board1", connection.HISTORY_FIELDS))
+    ...
+    points = store.query("board1", "ambient", since=time.time() - 30 * 86400)
+    store.close()
+"""
+
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from app_logging import get_logger
+
+log = get_logger("store")
+
+
+# Rollup tables: name suffix and bucket width in seconds
+ROLLUPS = (("1m", 60), ("1h", 3600))
+
+_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _check_name(name: str) -> str:
+    """Board and field names become table and column names"""
+    if not _NAME.match(name):
+        raise ValueError(f"invalid name {name!r}, use letters, digits and _")
+    return name
+
+
+class BoardRecorder:
+    """Sink with the TelemetryRecorder interface, see connection.setRecorder()"""
+
+    def __init__(self, store, board: str, fields):
+        self.store = store
+        self.board = board
+        self.fields = tuple(fields)
+
+    def append(self, timestamp_ns: int, values) -> None:
+        """Queue one sample for the writer thread"""
+        self.store._queue.put((self.board, timestamp_ns, tuple(values)))
+
+
+class TelemetryStore:
+    """Batched SQLite writer and rollup-aware queries"""
+
+    def __init__(self, path: str, batch_size: int = 1000, flush_interval: float = 1.0):
+        if path == ":memory:":
+            raise ValueError("the store needs a file, readers use their own connections")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.boards = {}
+        self._queue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS boards (name TEXT PRIMARY KEY, fields TEXT)")
+        self._db.commit()
+        for name, fields in self._db.execute("SELECT name, fields FROM boards"):
+            self.boards[name] = tuple(fields.split(","))
+        self._writer = threading.Thread(target=self._run, name="telemetry-store", daemon=True)
+        self._writer.start()
+
+    def recorder(self, board: str, fields) -> BoardRecorder:
+        """Create the tables of a board (once) and return its sample sink"""
+        fields = tuple(_check_name(field) for field in fields)
+        _check_name(board)
+        with self._lock:
+            known = self.boards.get(board)
+            if known is not None and known != fields:
+                raise ValueError(f"board {board} stores {known}, not {fields}")
+            if known is None:
+                # Created on the writer thread, it owns the write connection
+                done = threading.Event()
+                self._queue.put(("create", board, fields, done))
+                done.wait()
+                self.boards[board] = fields
+        return BoardRecorder(self, board, fields)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is committed"""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Commit what is queued and stop the writer thread"""
+        if self._writer is None:
+            return
+        self._queue.put(("stop",))
+        self._writer.join()
+        self._writer = None
+        self._db.close()
+        reader = getattr(self._local, "db", None)
+        if reader is not None:
+            reader.close()
+            self._local.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def query(self, board: str, field: str, since: float = None, until: float = None,
+              resolution: str = None, max_points: int = 2000) -> list:
+        """Points of one field as (time, mean, min, max), times in epoch seconds.
+
+        resolution is "raw", "1m", "1h" or None to pick the finest one that
+        returns at most max_points points over [since, until).
+        """
+        fields = self.boards.get(board)
+        if fields is None or field not in fields:
+            raise ValueError(f"unknown field {board}.{field}")
+        now = time.time()
+        since = now - 86400 if since is None else since
+        until = now if until is None else until
+        if resolution is None:
+            resolution = self._pick_resolution(board, since, until, max_points)
+        db = self._reader()
+        if resolution == "raw":
+            rows = db.execute(
+                f'SELECT ts, "{field}" FROM "{board}_raw" WHERE ts >= ? AND ts < ? ORDER BY ts',
+                (int(since * 1e9), int(until * 1e9)))
+            return [(ts / 1e9, value, value, value) for ts, value in rows]
+        width = dict(ROLLUPS).get(resolution)
+        if width is None:
+            raise ValueError(f"unknown resolution {resolution!r}")
+        rows = db.execute(
+            f'SELECT bucket, "{field}_sum" / count, "{field}_min", "{field}_max" '
+            f'FROM "{board}_{resolution}" WHERE bucket >= ? AND bucket < ? ORDER BY bucket',
+            (int(since // width * width), until))
+        return [tuple(row) for row in rows]
+
+    def _pick_resolution(self, board: str, since: float, until: float, max_points: int) -> str:
+        """Raw rows if there are few enough, else the finest rollup that fits"""
+        (count,) = self._reader().execute(
+            f'SELECT count(*) FROM (SELECT 1 FROM "{board}_raw" WHERE ts >= ? AND ts < ? LIMIT ?)',
+            (int(since * 1e9), int(until * 1e9), max_points + 1)).fetchone()
+        if count <= max_points:
+            return "raw"
+        span = max(until - since, 0.0)
+        for resolution, width in ROLLUPS:
+            if span / width <= max_points:
+                return resolution
+        return ROLLUPS[-1][0]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def _reader(self) -> sqlite3.Connection:
+        """Read connection of the calling thread"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def _run(self) -> None:
+        """Writer thread: commit batches of queued samples"""
+        # Queue items: (board, timestamp_ns, values) samples, or commands
+        # ("create", board, fields, event), ("flush", event), ("stop",)
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, waiting = {}, []
+            deadline = time.monotonic() + self.flush_interval
+            count = 0
+            while True:
+                if len(item) == 3:
+                    batch.setdefault(item[0], []).append(item[1:])
+                    count += 1
+                elif item[0] == "create":
+                    self._write(batch)
+                    batch = {}
+                    self._create(item[1], item[2])
+                    item[3].set()
+                elif item[0] == "flush":
+                    waiting.append(item[1])
+                    break
+                elif item[0] == "stop":
+                    running = False
+                    break
+                if count >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for done in waiting:
+                done.set()
+
+    def _create(self, board: str, fields) -> None:
+        columns = ", ".join(f'"{field}" REAL' for field in fields)
+        stats = ", ".join(f'"{field}_min" REAL, "{field}_max" REAL, "{field}_sum" REAL'
+                          for field in fields)
+        with self._db:
+            self._db.execute(f'CREATE TABLE IF NOT EXISTS "{board}_raw" '
+                             f'(ts INTEGER PRIMARY KEY, {columns})')
+            for resolution, _ in ROLLUPS:
+                self._db.execute(f'CREATE TABLE IF NOT EXISTS "{board}_{resolution}" '
+                                 f'(bucket INTEGER PRIMARY KEY, count INTEGER, {stats})')
+            self._db.execute("INSERT OR IGNORE INTO boards VALUES (?, ?)",
+                             (board, ",".join(fields)))
+
+    def _write(self, batch: dict) -> None:
+        """Insert raw rows and merge the rollups of one batch, one transaction"""
+        if not batch:
+            return
+        try:
+            with self._db:
+                for board, samples in batch.items():
+                    self._write_board(board, samples)
+        except sqlite3.Error as e:
+            log.error("Telemetry store write failed: %s", e)
+
+    def _write_board(self, board: str, samples: list) -> None:
+        fields = self.boards[board]
+        names = ", ".join(f'"{field}"' for field in fields)
+        marks = ", ".join("?" * (len(fields) + 1))
+        insert = f'INSERT OR IGNORE INTO "{board}_raw" (ts, {names}) VALUES ({marks})'
+        # A timestamp that is already stored keeps its row, and its sample
+        # must not be counted in the rollups a second time
+        samples = [(ts, values) for ts, values in samples
+                   if self._db.execute(insert, (ts, *values)).rowcount]
+        for resolution, width in ROLLUPS:
+            buckets = {}
+            for ts, values in samples:
+                bucket = ts // 1000000000 // width * width
+                stats = buckets.get(bucket)
+                if stats is None:
+                    buckets[bucket] = [1] + [v for value in values for v in (value, value, value)]
+                    continue
+                stats[0] += 1
+                for index, value in enumerate(values):
+                    slot = 1 + 3 * index
+                    if value < stats[slot]:
+                        stats[slot] = value
+                    if value > stats[slot + 1]:
+                        stats[slot + 1] = value
+                    stats[slot + 2] += value
+            columns = ", ".join(f'"{f}_min", "{f}_max", "{f}_sum"' for f in fields)
+            merge = ", ".join(
+                f'"{f}_min" = min("{f}_min", excluded."{f}_min"), '
+                f'"{f}_max" = max("{f}_max", excluded."{f}_max"), '
+                f'"{f}_sum" = "{f}_sum" + excluded."{f}_sum"' for f in fields)
+            marks = ", ".join("?" * (2 + 3 * len(fields)))
+            self._db.executemany(
+                f'INSERT INTO "{board}_{resolution}" (bucket, count, {columns}) VALUES ({marks}) '
+                f'ON CONFLICT(bucket) DO UPDATE SET count = count + excluded.count, {merge}',
+                [(bucket, *stats) for bucket, stats in buckets.items()])
@@ -6,16 +6,66 @@ Tests for:
 - HomeAutomationSystemConnection (base class)
 - AirConditionerSystemConnection (Board 1)
 - CurtainControlSystemConnection (Board 2)
+- SerialWorker (per-port I/O thread)
+- AsyncAirConditionerSystemConnection (asyncio transport)
+- FleetPoller (multi-board scheduler)
+- AdaptivePollInterval (rate-of-change polling period)
+- Board1Simulator / Board2Simulator (pty-backed virtual boards)
+- benchmark (update() latency harness)
+- LatencyHistogram / ConnectionInstruments (per-command statistics)
+- RingBufferHandler (buffered application logging)
+- TelemetryHistory (columnar sample ring buffer)
+- TelemetryRecorder / TelemetryReader (memory-mapped recording file)
+- UART trace capture and TraceAnalyzer
+- ReplaySerial (recording / trace replay)
+- TelemetryStore (SQLite samples and rollups)
+- LTTB / min-max downsampling
+- TrendChart (incremental canvas trend plot)
+- TelemetrySnapshot (atomic, versioned latest sample)
+- Subscriptions (change-driven snapshot delivery)
+- UiDispatcher / TextBindings (frame-rate-limited UI updates)
+- ConnectionRegistry (one shared connection per port)
 """
 
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import sys
 import os
+import struct
+import threading
+import time
+import asyncio
+import io
+import json
+import logging
+import tempfile
+import serial
 
 # Import the classes to test
 from home_automation import AirConditionerSystemConnection
 from curtain_control import CurtainControlSystemConnection
+import curtain_control
+from serial_worker import SerialWorker, PRIORITY_GET, PRIORITY_SET
+from async_connection import AsyncAirConditionerSystemConnection, AsyncCurtainControlSystemConnection
+from fleet import FleetPoller
+from adaptive_poll import AdaptivePollInterval
+from board_sim import Board1Simulator, Board2Simulator
+import board_sim
+import benchmark
+from instrumentation import LatencyHistogram
+from app_logging import RingBufferHandler, get_logger
+from telemetry_history import TelemetryHistory
+from telemetry_recorder import TelemetryRecorder, TelemetryReader
+from uart_trace import TraceWriter, TracingSerial, EVENT_TX, EVENT_RX, EVENT_FLUSH
+import trace_analyzer
+from replay import ReplaySerial, load_timeline, replay_into, run_headless
+from telemetry_store import TelemetryStore
+from downsample import downsample, window_points
+from trend_chart import TrendChart
+from telemetry_snapshot import TelemetrySnapshot
+from subscriptions import changed, reached, every
+from ui_dispatcher import UiDispatcher, TextBindings
+from connection_registry import ConnectionRegistry
 
 
 class TestAirConditionerSystemConnection(unittest.TestCase):
@@ -151,6 +201,105 @@ class TestAirConditionerSystemConnection(unittest.TestCase):
         # Should not raise exception
         self.connection.update()
         self.assertEqual(self.connection.ambientTemperature, 0.0)
+    
+    @patch('serial.Serial')
+    def test_update_pipelined_burst(self, mock_serial):
+        """Test update writes GET commands in chunks of pipelineDepth"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        mock_serial_instance.read.side_effect = [bytes([24, 5]), bytes([22, 0]), bytes([87])]
+        
+        self.connection.setComPort("COM3")
+        self.connection.open()
+        self.connection._frame_supported = False  # firmware without 0x09
+        self.connection.update()
+        
+        writes = [c.args[0] for c in mock_serial_instance.write.call_args_list]
+        self.assertEqual(writes, [bytes([0x02, 0x01]), bytes([0x04, 0x03]), bytes([0x05])])
+        self.assertEqual(self.connection.getDesiredTemp(), 24.5)
+        self.assertEqual(self.connection.getAmbientTemp(), 22.0)
+        self.assertEqual(self.connection.getFanSpeed(), 87)
+    
+    @patch('serial.Serial')
+    def test_send_burst_missing_reply_returns_zero(self, mock_serial):
+        """Test _send_burst pads missing replies with 0 and flushes input"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        mock_serial_instance.read.return_value = b''
+        
+        self.connection.setComPort("COM3")
+        self.connection.open()
+        self.connection.setPipelineDepth(8)
+        result = self.connection._send_burst([0x02, 0x01, 0x05])
+        
+        self.assertEqual(result, [0, 0, 0])
+        mock_serial_instance.write.assert_called_once_with(bytes([0x02, 0x01, 0x05]))
+        self.assertTrue(mock_serial_instance.reset_input_buffer.called)
+    
+    @patch('serial.Serial')
+    def test_update_bulk_frame(self, mock_serial):
+        """Test update decodes the 0x09 frame in a single request"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        payload = bytes([24, 5, 22, 0, 87])
+        checksum = 5
+        for byte in payload:
+            checksum ^= byte
+        mock_serial_instance.read.side_effect = [bytes([0xAA, 5]), payload + bytes([checksum])]
+        
+        self.connection.setComPort("COM3")
+        self.connection.open()
+        self.connection.update()
+        
+        mock_serial_instance.write.assert_called_once_with(bytes([0x09]))
+        self.assertEqual(self.connection.getDesiredTemp(), 24.5)
+        self.assertEqual(self.connection.getAmbientTemp(), 22.0)
+        self.assertEqual(self.connection.getFanSpeed(), 87)
+        self.assertTrue(self.connection._frame_supported)
+    
+    @patch('serial.Serial')
+    def test_poll_frame_old_firmware_probed_once(self, mock_serial):
+        """Test an unanswered 0x09 probe disables the bulk request"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        mock_serial_instance.read.return_value = b''
+        
+        self.connection.setComPort("COM3")
+        self.connection.open()
+        self.assertIsNone(self.connection._poll_frame(struct.Struct('>BBBBB')))
+        self.assertIsNone(self.connection._poll_frame(struct.Struct('>BBBBB')))
+        mock_serial_instance.write.assert_called_once_with(bytes([0x09]))
+    
+    @patch('serial.Serial')
+    def test_stream_loop_decodes_pushed_frames(self, mock_serial):
+        """Test the stream reader resyncs on noise and decodes split frames"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        mock_serial_instance.in_waiting = 0
+        payload = bytes([30, 0, 21, 0, 40])
+        frame = bytes([0xAA, 5]) + payload + bytes([5 ^ 30 ^ 21 ^ 40])
+        chunks = [bytes([0x13, 0xAA, 0x02]) + frame[:4], frame[4:]]
+        
+        def read(size):
+            if chunks:
+                return chunks.pop(0)
+            self.connection._streaming = False
+            return b''
+        mock_serial_instance.read.side_effect = read
+        
+        self.connection.setComPort("COM3")
+        self.connection.open()
+        self.connection._streaming = True
+        self.connection._stream_loop()
+        
+        self.assertEqual(self.connection.getDesiredTemp(), 30.0)
+        self.assertEqual(self.connection.getAmbientTemp(), 21.0)
+        self.assertEqual(self.connection.getFanSpeed(), 40)
 
 
 class TestCurtainControlSystemConnection(unittest.TestCase):
@@ -271,6 +420,1346 @@ class TestCurtainControlSystemConnection(unittest.TestCase):
         # Should not raise exception
         self.connection.update()
         self.assertEqual(self.connection.curtainStatus, 0.0)
+    
+    @patch('serial.Serial')
+    def test_update_pipelined_burst(self, mock_serial):
+        """Test update collects all eight replies with pipelined writes"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        mock_serial_instance.read.return_value = bytes([50, 5, 25, 0, 245, 0, 120, 0])
+        
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        self.connection._frame_supported = False  # firmware without 0x09
+        self.connection.setPipelineDepth(8)
+        self.connection.update()
+        
+        mock_serial_instance.write.assert_called_once_with(
+            bytes([0x02, 0x01, 0x04, 0x03, 0x06, 0x05, 0x08, 0x07]))
+        self.assertEqual(self.connection.getCurtainStatus(), 50.5)
+        self.assertEqual(self.connection.getOutdoorTemp(), 25.0)
+        self.assertEqual(self.connection.getOutdoorPress(), 1013.0)
+        self.assertEqual(self.connection.getLightIntensity(), 120.0)
+    
+    @patch('serial.Serial')
+    def test_update_bulk_frame_full_pressure(self, mock_serial):
+        """Test the 0x09 frame carries both pressure bytes"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        payload = bytes([50, 5, 25, 0, 3, 245, 0, 120, 0])
+        checksum = 9
+        for byte in payload:
+            checksum ^= byte
+        mock_serial_instance.read.side_effect = [bytes([0xAA, 9]), payload + bytes([checksum])]
+        
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        self.connection.update()
+        
+        self.assertEqual(self.connection.getCurtainStatus(), 50.5)
+        self.assertEqual(self.connection.getOutdoorPress(), 1013.0)
+        self.assertEqual(self.connection.getLightIntensity(), 120.0)
+        self.assertEqual(self.connection.pipelineDepth, curtain_control.RX_RING_DEPTH)
+        self.assertEqual(self.connection.pipelineDepth, 15)
+    
+    @patch('serial.Serial')
+    def test_update_polls_only_due_fields(self, mock_serial):
+        """Test fields whose period has not elapsed are not requested again"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        mock_serial_instance.read.side_effect = [
+            bytes([50, 5, 25, 0, 245, 0, 120, 0]), bytes([60, 0, 130, 5])]
+        
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        self.connection._frame_supported = False  # firmware without 0x09
+        self.connection.setPipelineDepth(8)
+        self.connection.setFieldPeriod('curtain', 0.0)
+        self.connection.setFieldPeriod('light', 0.0)
+        self.connection.update()
+        self.connection.update()
+        
+        self.assertEqual(mock_serial_instance.write.call_args_list[-1][0][0],
+                         bytes([0x02, 0x01, 0x08, 0x07]))
+        self.assertEqual(self.connection.getCurtainStatus(), 60.0)
+        self.assertEqual(self.connection.getOutdoorTemp(), 25.0)
+        self.assertEqual(self.connection.getOutdoorPress(), 1013.0)
+        self.assertEqual(self.connection.getLightIntensity(), 130.5)
+        self.assertEqual(self.connection.getSnapshot().updated, ('curtain', 'light'))
+        with self.assertRaises(ValueError):
+            self.connection.setFieldPeriod('humidity', 1.0)
+    
+    @patch('serial.Serial')
+    def test_wait_ends_when_next_field_is_due(self, mock_serial):
+        """Test the adaptive back-off does not stretch the wait past a field period"""
+        mock_serial.return_value = MagicMock(is_open=True)
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        self.connection.pollInterval.period = self.connection.POLL_MAX_PERIOD
+        self.connection._field_due = dict.fromkeys(self.connection._field_due,
+                                                   time.monotonic() + 0.05)
+        started = time.monotonic()
+        self.connection.waitNextPoll()
+        self.assertLess(time.monotonic() - started, 1.0)
+    
+    @patch('serial.Serial')
+    def test_poll_loop_idles_while_streaming(self, mock_serial):
+        """Test update()/waitNextPoll() do not spin while the board streams"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        self.connection._streaming = True  # frames arrive on the stream thread
+        self.connection.setPollPeriods(0.05, 0.05)
+        calls = 0
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            self.connection.update()
+            calls += 1
+            self.connection.waitNextPoll()
+        self.connection._streaming = False
+        self.assertLessEqual(calls, 10)
+    
+    @patch('serial.Serial')
+    def test_move_curtain_tracks_until_reached(self, mock_serial):
+        """Test the move Future resolves once the reported status hits the target"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        reached = self.connection.moveCurtainAsync(50.0)
+        self.assertTrue(self.connection.is_moving())
+        
+        self.connection._apply_values((30, 0, 25, 0, 1013, 0, 120, 0))
+        self.assertFalse(reached.done())
+        self.assertLessEqual(self.connection.pollInterval.period, self.connection.TRACK_PERIOD)
+        self.assertLessEqual(self.connection._field_due['curtain'],
+                             time.monotonic() + self.connection.TRACK_PERIOD)
+        
+        self.connection._apply_values((50, 0, 25, 0, 1013, 0, 120, 0))
+        self.assertTrue(reached.result(timeout=1.0))
+        self.assertFalse(self.connection.is_moving())
+    
+    @patch('serial.Serial')
+    def test_move_curtain_superseded_or_closed(self, mock_serial):
+        """Test a replaced or abandoned move resolves to False"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        first = self.connection.moveCurtainAsync(80.0)
+        second = self.connection.moveCurtainAsync(20.0)
+        self.assertFalse(first.result(timeout=1.0))
+        self.assertFalse(self.connection.moveCurtainAsync(150.0).result(timeout=1.0))
+        self.connection.close()
+        self.assertFalse(second.result(timeout=1.0))
+    
+    @patch('serial.Serial')
+    def test_debug_log_of_sample_and_motion_timeout(self, mock_serial):
+        """Test the curtain debug messages format with DEBUG logging enabled"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        
+        self.connection.setComPort("COM8")
+        self.connection.open()
+        self.connection.TRACK_TIMEOUT = 0.0
+        reached = self.connection.moveCurtainAsync(50.0)
+        with self.assertLogs("home_automation.board2", logging.DEBUG) as logs:
+            self.connection._apply_values((30, 5, 25, 0, 1013, 0, 120, 0))
+        self.assertFalse(reached.result(timeout=1.0))
+        messages = [record.getMessage() for record in logs.records]
+        self.assertIn("Curtain: 30.5 = 30.5%", messages)
+        self.assertIn("Curtain did not reach 50.0% in 0.0 s", messages)
+
+
+class TestSerialWorker(unittest.TestCase):
+    """Test cases for the per-port SerialWorker"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.worker = SerialWorker("test I/O")
+        self.worker.start()
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.worker.stop()
+    
+    def test_submit_returns_result(self):
+        """Test submit runs the job and resolves its future"""
+        future = self.worker.submit(lambda a, b: a + b, 2, 3)
+        self.assertEqual(future.result(timeout=1.0), 5)
+    
+    def test_set_preempts_queued_get(self):
+        """Test a SET job runs before GET jobs queued earlier"""
+        gate = threading.Event()
+        order = []
+        self.worker.submit(gate.wait, 1.0)
+        get = self.worker.submit(order.append, "get", priority=PRIORITY_GET)
+        set_ = self.worker.submit(order.append, "set", priority=PRIORITY_SET)
+        gate.set()
+        get.result(timeout=1.0)
+        set_.result(timeout=1.0)
+        self.assertEqual(order, ["set", "get"])
+    
+    def test_stop_cancels_pending_jobs(self):
+        """Test stop cancels jobs that have not started"""
+        gate = threading.Event()
+        self.worker.submit(gate.wait, 0.2)
+        pending = self.worker.submit(lambda: None)
+        self.worker.stop()
+        self.assertTrue(pending.cancelled())
+    
+    def test_submit_after_stop_fails(self):
+        """Test submit on a stopped worker returns a failed future"""
+        self.worker.stop()
+        future = self.worker.submit(lambda: None)
+        self.assertIsInstance(future.exception(timeout=1.0), RuntimeError)
+
+
+@unittest.skipUnless(hasattr(os, 'openpty'), "asyncio transport needs a pty")
+class TestAsyncConnection(unittest.TestCase):
+    """Test cases for the asyncio transport over a pseudo terminal"""
+
+    # GET replies of a Board 1 without CMD_GET_ALL support
+    REPLIES = {0x01: 5, 0x02: 22, 0x03: 5, 0x04: 25, 0x05: 42}
+
+    def setUp(self):
+        """Open a pty pair and answer GET commands from the master side"""
+        # Keep the slave open so master reads never see a hangup (EIO)
+        self.master, self.slave = os.openpty()
+        self.port = os.ttyname(self.slave)
+        self.received = bytearray()
+        self._stop = threading.Event()
+        self._responder = threading.Thread(target=self._respond, daemon=True)
+        self._responder.start()
+
+    def tearDown(self):
+        """Stop the responder and close the pty"""
+        self._stop.set()
+        self._responder.join(1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def _respond(self):
+        import select
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self.master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 64)
+            except OSError:
+                return
+            self.received += data
+            reply = bytes(self.REPLIES[b] for b in data if b in self.REPLIES)
+            if reply:
+                os.write(self.master, reply)
+
+    def test_update_and_set(self):
+        """Test update() polls over the pty and setDesiredTemp() writes the SET pair"""
+        async def scenario():
+            connection = AsyncAirConditionerSystemConnection()
+            connection.setComPort(self.port)
+            self.assertTrue(await connection.open())
+            try:
+                await connection.update()
+                self.assertTrue(await connection.setDesiredTemp(24.5))
+                self.assertFalse(await connection.setDesiredTemp(70.0))
+                await asyncio.sleep(0.1)
+            finally:
+                await connection.close()
+            return connection
+
+        connection = asyncio.run(scenario())
+        self.assertFalse(connection._frame_supported)
+        self.assertEqual(connection.getDesiredTemp(), 22.5)
+        self.assertEqual(connection.getAmbientTemp(), 25.5)
+        self.assertEqual(connection.getFanSpeed(), 42)
+        self.assertTrue(self.received.endswith(bytes([0xC0 | 24, 0x80 | 5])))
+
+    def test_inherited_blocking_setters_write(self):
+        """Test the inherited Future setters write instead of returning a coroutine"""
+        async def scenario():
+            connection = AsyncAirConditionerSystemConnection()
+            connection.setComPort(self.port)
+            self.assertTrue(await connection.open())
+            try:
+                written = connection.setDesiredTempAsync(23.5)
+                self.assertIs(written.result(timeout=1.0), True)
+                await asyncio.sleep(0.1)
+            finally:
+                await connection.close()
+
+        asyncio.run(scenario())
+        self.assertTrue(self.received.endswith(bytes([0xC0 | 23, 0x80 | 5])))
+
+    def test_close_resolves_pending_motion(self):
+        """Test close() reports a tracked curtain move as not reached"""
+        async def scenario():
+            connection = AsyncCurtainControlSystemConnection()
+            connection.setComPort(self.port)
+            self.assertTrue(await connection.open())
+            reached = connection.moveCurtainAsync(50.0)
+            self.assertFalse(reached.done())
+            await connection.close()
+            return reached
+
+        reached = asyncio.run(scenario())
+        self.assertFalse(reached.result(timeout=1.0))
+
+
+class TestFleetPoller(unittest.TestCase):
+    """Test cases for FleetPoller class"""
+
+    @patch('serial.Serial')
+    def setUp(self, mock_serial):
+        """Open a fleet of two mocked boards with stubbed update()"""
+        self.fleet = FleetPoller([("COM1", "ac"), ("COM2", "curtain", 0.02)], period=0.05)
+        self.assertEqual(self.fleet.open(), [])
+        for connection in self.fleet.connections.values():
+            connection.update = Mock()
+
+    def tearDown(self):
+        """Close the fleet"""
+        self.fleet.close()
+
+    def test_polls_each_port_at_its_period(self):
+        """Test every port is polled and the faster port more often"""
+        self.fleet.start()
+        time.sleep(0.3)
+        self.fleet.stop()
+        report = self.fleet.report()
+        self.assertGreaterEqual(report["COM1"]["samples"], 3)
+        self.assertGreater(report["COM2"]["samples"], report["COM1"]["samples"])
+        self.assertEqual(report["total"]["samples"],
+                         report["COM1"]["samples"] + report["COM2"]["samples"])
+
+    def test_slow_port_counts_missed_deadlines(self):
+        """Test an update() longer than the period is reported as missed"""
+        self.fleet.connection("COM1").update = Mock(side_effect=lambda: time.sleep(0.12))
+        self.fleet.start()
+        time.sleep(0.3)
+        self.fleet.stop()
+        report = self.fleet.report()
+        self.assertGreater(report["COM1"]["missed"], 0)
+        self.assertGreater(report["COM1"]["utilization"], 0.5)
+
+
+class TestAdaptivePollInterval(unittest.TestCase):
+    """Test cases for AdaptivePollInterval class"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.interval = AdaptivePollInterval(0.25, 2.0, tolerance=(0.0, 0.15))
+
+    def test_backs_off_while_stable(self):
+        """Test the period doubles per unchanged sample up to the maximum"""
+        periods = [self.interval.observe((22.0, 25.5)) for _ in range(6)]
+        self.assertEqual(periods, [0.25, 0.5, 1.0, 2.0, 2.0, 2.0])
+
+    def test_change_returns_to_min_period(self):
+        """Test a change beyond tolerance resets the period, jitter does not"""
+        for _ in range(4):
+            self.interval.observe((22.0, 25.5))
+        self.assertEqual(self.interval.observe((22.0, 25.6)), 2.0)
+        self.assertEqual(self.interval.observe((22.0, 26.0)), 0.25)
+
+    def test_reset_ends_wait(self):
+        """Test reset() wakes a waiting update loop at the fastest period"""
+        self.interval.setPeriods(0.25, 10.0)
+        self.interval.period = 10.0
+        threading.Timer(0.05, self.interval.reset).start()
+        started = time.monotonic()
+        self.interval.wait()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(self.interval.period, 0.25)
+
+    @patch('serial.Serial')
+    def test_set_write_resets_connection_period(self, mock_serial):
+        """Test a SET write puts the connection back to the fastest period"""
+        connection = AirConditionerSystemConnection()
+        connection.setComPort("COM1")
+        connection.open()
+        connection.pollInterval.period = connection.POLL_MAX_PERIOD
+        self.assertTrue(connection.setDesiredTemp(24.0))
+        self.assertEqual(connection.pollInterval.period, connection.POLL_MIN_PERIOD)
+        connection.close()
+
+
+@unittest.skipUnless(hasattr(os, 'openpty'), "simulators need a pty")
+class TestBoardSimulators(unittest.TestCase):
+    """Test the connection classes against the virtual boards"""
+
+    def test_board1_frame_and_set(self):
+        """Test Board 1 answers the 0x09 frame and applies the 10-50 SET range"""
+        with Board1Simulator(ambient=28, loop_period=0.005) as board:
+            connection = AirConditionerSystemConnection()
+            connection.setComPort(board.port)
+            self.assertTrue(connection.open())
+            try:
+                self.assertTrue(connection.setDesiredTemp(22.5))
+                time.sleep(0.05)
+                connection.update()
+                self.assertTrue(connection._frame_supported)
+                self.assertEqual(connection.getDesiredTemp(), 22.5)
+                self.assertEqual(connection.getAmbientTemp(), 28.0)
+                self.assertTrue(connection.setDesiredTemp(60.0))
+                time.sleep(0.05)
+                connection.update()
+                self.assertEqual(connection.getDesiredTemp(), 25.0)
+            finally:
+                connection.close()
+
+    def test_board2_legacy_per_byte_poll(self):
+        """Test the old Board 2 firmware: per-byte GETs and stepper motion"""
+        with Board2Simulator(loop_period=0.002, ring_firmware=False) as board:
+            connection = CurtainControlSystemConnection()
+            connection.setComPort(board.port)
+            self.assertTrue(connection.open())
+            try:
+                self.assertTrue(connection.setCurtainStatus(5))
+                time.sleep(0.4)
+                connection.update()
+                self.assertFalse(connection._frame_supported)
+                self.assertEqual(board.overruns, 0)
+                self.assertEqual(board.position, 50)
+                self.assertEqual(connection.getCurtainStatus(), 5.0)
+                self.assertEqual(connection.getOutdoorTemp(), 25.0)
+                self.assertEqual(connection.getOutdoorPress(), 1013.0)
+                self.assertEqual(connection.getLightIntensity(), 150.0)
+            finally:
+                connection.close()
+
+    def test_ring_firmware_holds_one_byte_less_than_its_size(self):
+        """Test a RX_RING_SIZE burst overruns the ring, RX_RING_DEPTH does not"""
+        for burst, overruns in ((board_sim.RX_RING_DEPTH, 0), (board_sim.RX_RING_SIZE, 1)):
+            with Board1Simulator(baudRate=115200, loop_period=1.0) as board:
+                time.sleep(0.05)  # past the first main loop
+                fd = os.open(board.port, os.O_WRONLY | os.O_NOCTTY)
+                try:
+                    os.write(fd, bytes([0x01]) * burst)
+                finally:
+                    os.close(fd)
+                time.sleep(0.1)
+                self.assertEqual(board.bytes_in, burst)
+                self.assertEqual(board.overruns, overruns)
+
+    def test_benchmark_result_and_regression_check(self):
+        """Test bench_board() reports latency, rate and wire bytes"""
+        result = benchmark.bench_board("ac", 115200, samples=5, loop_period=0.002)
+        self.assertTrue(result["frame"])
+        self.assertEqual(result["bytes_per_refresh"], 9.0)  # 0x09 + 8-byte frame
+        self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["p99"])
+        self.assertGreater(result["refreshes_per_s"], 0)
+        
+        slower = json.loads(json.dumps({"results": [result]}))
+        slower["results"][0]["latency_ms"]["p95"] *= 2
+        self.assertEqual(benchmark.compare({"results": [result]}, slower, 0.2), [])
+        self.assertEqual(len(benchmark.compare(slower, {"results": [result]}, 0.2)), 1)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for per-command instrumentation"""
+
+    def test_histogram_percentiles(self):
+        """Test percentiles stay within the bucket precision"""
+        histogram = LatencyHistogram()
+        for micros in range(1, 10001):
+            histogram.record(micros / 1e6)
+        self.assertEqual(histogram.count, 10000)
+        for fraction in (0.5, 0.95, 0.99):
+            expected = fraction * 0.01
+            self.assertAlmostEqual(histogram.percentile(fraction), expected,
+                                   delta=expected / LatencyHistogram.SUB_BUCKETS)
+        self.assertEqual(histogram.percentile(1.0), 0.01)
+
+    @patch('serial.Serial')
+    def test_connection_records_commands(self, mock_serial):
+        """Test GET timeouts, replies and SET writes are counted per command"""
+        mock_serial_instance = MagicMock()
+        mock_serial.return_value = mock_serial_instance
+        mock_serial_instance.is_open = True
+        mock_serial_instance.read.side_effect = [b'', bytes([25])]
+
+        connection = AirConditionerSystemConnection()
+        connection.setComPort("COM1")
+        connection.open()
+        self.assertEqual(connection.getInstrumentation(), {})
+        connection.enableInstrumentation()
+        try:
+            self.assertEqual(connection._send_command(0x04), 0)
+            self.assertEqual(connection._send_command(0x04), 25)
+            self.assertTrue(connection.setDesiredTemp(24.0))
+            stats = connection.getInstrumentation()
+        finally:
+            connection.close()
+
+        self.assertEqual(stats["0x04"]["count"], 2)
+        self.assertEqual(stats["0x04"]["timeouts"], 1)
+        self.assertEqual(stats["0x04"]["bytes_out"], 2)
+        self.assertEqual(stats["0x04"]["bytes_in"], 1)
+        self.assertEqual(stats["SET"]["count"], 1)
+        self.assertEqual(stats["SET"]["bytes_out"], 2)
+
+
+class TestAppLogging(unittest.TestCase):
+    """Test cases for the buffered logging handler"""
+
+    def setUp(self):
+        """Attach a ring buffer handler writing to a string stream"""
+        self.stream = io.StringIO()
+        target = logging.StreamHandler(self.stream)
+        target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        self.handler = RingBufferHandler([target], capacity=3, flush_interval=60.0)
+        self.logger = get_logger("test")
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+
+    def tearDown(self):
+        """Detach the handler"""
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_records_are_buffered_until_flush(self):
+        """Test records are written by flush, oldest dropped when full"""
+        for number in range(5):
+            self.logger.debug("sample %d", number)
+        self.assertEqual(self.stream.getvalue(), "")
+        self.handler.flush()
+        self.assertEqual(self.stream.getvalue().splitlines(),
+                         ["DEBUG sample 2", "DEBUG sample 3", "DEBUG sample 4"])
+        self.assertEqual(self.handler.dropped, 2)
+
+    def test_disabled_level_is_not_formatted(self):
+        """Test arguments of a disabled level are never converted to text"""
+        argument = MagicMock()
+        self.logger.setLevel(logging.INFO)
+        self.logger.debug("value %s", argument)
+        self.handler.flush()
+        argument.__str__.assert_not_called()
+        self.assertEqual(self.stream.getvalue(), "")
+
+
+class TestTelemetryHistory(unittest.TestCase):
+    """Test cases for TelemetryHistory class"""
+
+    def setUp(self):
+        """Fill a small ring past its capacity"""
+        self.history = TelemetryHistory(('ambient', 'fan'), capacity=4)
+        for second in range(6):
+            self.history.append(second * 1000000000, (20.0 + second / 10, second))
+
+    def test_wraps_and_keeps_newest(self):
+        """Test the oldest samples are overwritten and tenths are exact"""
+        self.assertEqual(len(self.history), 4)
+        window = self.history.last(10)
+        self.assertEqual(len(window.times), 2)  # split at the wrap point
+        self.assertEqual(window.values('ambient'), [20.2, 20.3, 20.4, 20.5])
+        self.assertEqual(list(window.column('fan')), [20, 30, 40, 50])
+        self.assertEqual(self.history.latest(), (5000000000, (20.5, 5.0)))
+
+    def test_time_window_is_a_view(self):
+        """Test window() selects by timestamp without copying"""
+        window = self.history.window(since_ns=3000000000, until_ns=5000000000)
+        self.assertEqual(window.timestamps(), [3.0, 4.0])
+        for second in range(6, 9):
+            self.history.append(second * 1000000000, (second * 5.0, 9))
+        # The slots of samples 3 and 4 now hold samples 7 and 8
+        self.assertEqual(window.values('ambient'), [35.0, 40.0])
+
+    @patch('serial.Serial')
+    def test_connection_records_samples(self, mock_serial):
+        """Test every applied sample lands in the connection history"""
+        connection = CurtainControlSystemConnection()
+        connection._apply_values((50, 5, 25, 0, 1013, 0, 120, 0))
+        connection._apply_values((51, 0, 25, 0, 1013, 0, 121, 0))
+        window = connection.history.last(2)
+        self.assertEqual(window.values('curtain'), [50.5, 51.0])
+        self.assertEqual(window.values('pressure'), [1013.0, 1013.0])
+        self.assertEqual(window.values('light'), [120.0, 121.0])
+
+
+class TestTelemetryRecorder(unittest.TestCase):
+    """Test cases for TelemetryRecorder and TelemetryReader classes"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "board1.rec")
+        self.fields = ('desired', 'ambient', 'fan')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_while_recording_and_resume(self):
+        """Test blocks are readable while written and reopening appends"""
+        recorder = TelemetryRecorder(self.path, self.fields, block_rows=4)
+        for second in range(6):
+            recorder.append(second * 1000000000, (25.0, 20.0 + second / 10, second))
+        with TelemetryReader(self.path) as reader:
+            self.assertEqual(len(reader), 6)
+            recorder.append(6000000000, (26.0, 30.0, 6))
+            reader.refresh()
+            times, columns = reader.read(since_ns=4000000000)
+            self.assertEqual(times, [4000000000, 5000000000, 6000000000])
+            self.assertEqual(columns['ambient'], [20.4, 20.5, 30.0])
+        recorder.close()
+
+        with TelemetryRecorder(self.path, self.fields) as recorder:
+            self.assertEqual(recorder.rows, 7)
+            recorder.append(7000000000, (26.0, 31.0, 7))
+        with TelemetryReader(self.path) as reader:
+            times, columns = reader.read(until_ns=2000000000)
+            self.assertEqual(columns['fan'], [0.0, 1.0])
+            self.assertEqual(len(reader), 8)
+            self.assertEqual([rows for rows, *_ in reader.blocks()], [4, 4])
+
+    def test_field_mismatch(self):
+        """Test a recording is only continued with the same fields"""
+        TelemetryRecorder(self.path, self.fields).close()
+        with self.assertRaises(ValueError):
+            TelemetryRecorder(self.path, ('curtain',))
+
+    @patch('serial.Serial')
+    def test_connection_records_samples(self, mock_serial):
+        """Test setRecorder() receives every applied sample"""
+        connection = AirConditionerSystemConnection()
+        with TelemetryRecorder(os.path.join(self.directory.name, "curtain.rec"),
+                               CurtainControlSystemConnection.HISTORY_FIELDS) as other:
+            with self.assertRaises(ValueError):
+                connection.setRecorder(other)
+        with TelemetryRecorder(self.path, connection.HISTORY_FIELDS) as recorder:
+            connection.setRecorder(recorder)
+            connection._apply_values((25, 5, 27, 0, 42))
+        with TelemetryReader(self.path) as reader:
+            _, columns = reader.read()
+        self.assertEqual(columns, {'desired': [25.5], 'ambient': [27.0], 'fan': [42.0]})
+
+
+class TestUartTrace(unittest.TestCase):
+    """Test cases for UART trace capture and the offline analyzer"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "board1.trace")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_analyzer_pairs_and_flags_misaligned(self):
+        """Test latency pairing, timeouts and the shift after a late reply"""
+        ms = 1000000
+        frame = bytes([25, 5, 27, 0, 42])
+        checksum = len(frame)
+        for byte in frame:
+            checksum ^= byte
+        writer = TraceWriter(self.path, "AirConditionerSystemConnection", 9600, 0.1)
+        writer.write(EVENT_TX, bytes([0x02]), 0)
+        writer.write(EVENT_RX, bytes([25]), 5 * ms)
+        writer.write(EVENT_TX, bytes([0x04]), 1000 * ms)      # never answered in time
+        writer.write(EVENT_TX, bytes([0x03]), 1200 * ms)
+        writer.write(EVENT_RX, bytes([27]), 1210 * ms)        # late reply of 0x04
+        writer.write(EVENT_TX, bytes([0x05]), 1300 * ms)
+        writer.write(EVENT_RX, bytes([0]), 1310 * ms)         # reply of 0x03
+        writer.write(EVENT_RX, bytes([42]), 1320 * ms)        # reply of 0x05, extra
+        writer.write(EVENT_TX, bytes([0x09]), 2000 * ms)
+        writer.write(EVENT_RX, bytes([0xAA, len(frame)]) + frame + bytes([checksum]), 2020 * ms)
+        writer.write(EVENT_TX, bytes([0xD9, 0x80]), 3000 * ms)
+        writer.write(EVENT_FLUSH, bytes([1, 2]), 3100 * ms)
+        writer.close()
+
+        report = trace_analyzer.analyze(self.path)
+        self.assertEqual(report["timeouts"], 1)
+        self.assertEqual(report["late_replies"], 1)
+        self.assertEqual(report["misaligned"], 2)
+        self.assertEqual(report["bad_frames"], 0)
+        self.assertEqual(report["set_writes"], 2)
+        self.assertEqual(report["discarded_bytes"], 2)
+        self.assertAlmostEqual(report["commands"]["0x02"]["max_ms"], 5.0, delta=0.5)
+        self.assertEqual(report["commands"]["0x04"]["timeouts"], 1)
+        self.assertAlmostEqual(report["commands"]["0x09"]["max_ms"], 20.0, delta=1.0)
+        self.assertEqual(report["commands"]["0x09"]["bytes_in"], 8)
+
+    def test_trace_simulated_board(self):
+        """Test startTrace() records a clean exchange with a board"""
+        with Board1Simulator(loop_period=0.005) as board:
+            connection = AirConditionerSystemConnection()
+            connection.setComPort(board.port)
+            self.assertTrue(connection.open())
+            try:
+                self.assertTrue(connection.startTrace(self.path))
+                connection.update()
+                connection._frame_supported = False
+                connection.update()
+            finally:
+                connection.close()
+        self.assertNotIsInstance(connection.serial_connection, TracingSerial)
+        report = trace_analyzer.analyze(self.path)
+        self.assertEqual(report["timeouts"], 0)
+        self.assertEqual(report["misaligned"], 0)
+        self.assertEqual(report["commands"]["0x09"]["count"], 1)
+        self.assertEqual(report["commands"]["0x05"]["count"], 1)
+
+    @patch('serial.Serial')
+    def test_trace_swap_waits_for_running_transaction(self, mock_serial):
+        """Test startTrace() swaps the port on the I/O thread between transactions"""
+        mock_serial.return_value = MagicMock(is_open=True)
+        connection = AirConditionerSystemConnection()
+        connection.setComPort("COM3")
+        self.assertTrue(connection.open())
+        try:
+            raw = connection.serial_connection
+            running, finish = threading.Event(), threading.Event()
+
+            def transaction():
+                running.set()
+                finish.wait(2.0)
+                return connection.serial_connection
+
+            seen = connection._worker.submit(transaction)
+            self.assertTrue(running.wait(2.0))
+            tracer = threading.Thread(target=connection.startTrace, args=(self.path,))
+            tracer.start()
+            time.sleep(0.05)
+            self.assertIs(connection.serial_connection, raw)
+            finish.set()
+            tracer.join(2.0)
+            self.assertIs(seen.result(timeout=1.0), raw)
+            self.assertIsInstance(connection.serial_connection, TracingSerial)
+            connection.stopTrace()
+            self.assertIs(connection.serial_connection, raw)
+        finally:
+            connection.close()
+
+
+class TestReplay(unittest.TestCase):
+    """Test cases for replaying recordings and traces"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "curtain.rec")
+        with TelemetryRecorder(self.path, CurtainControlSystemConnection.HISTORY_FIELDS) as recorder:
+            for second in range(20):
+                recorder.append(second * 1000000000, (second * 5 + 0.5, 18.3, 1013.2, 150 + second))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_max_speed_replays_every_state(self):
+        """Test frame and per-byte polling see each recorded state once"""
+        timeline = load_timeline(self.path)
+        self.assertEqual(len(timeline), 20)
+        self.assertEqual(run_headless(ReplaySerial(timeline, None))["samples"], 20)
+
+        connection = CurtainControlSystemConnection()
+        replay = ReplaySerial(timeline, None)
+        replay_into(connection, replay)
+        self.assertTrue(connection.open())
+        try:
+            connection._frame_supported = False
+            while not replay.finished:
+                connection.update()
+        finally:
+            connection.close()
+        window = connection.history.last(20)
+        self.assertEqual(window.values('curtain')[:3], [0.5, 5.5, 10.5])
+        self.assertEqual(window.values('pressure')[-1], 1013.2)
+        self.assertEqual(window.values('light')[-1], 169.0)
+
+    def test_accelerated_streaming(self):
+        """Test streamed frames follow the accelerated replay clock"""
+        connection = CurtainControlSystemConnection()
+        replay_into(connection, ReplaySerial(load_timeline(self.path), speed=100))
+        self.assertTrue(connection.open())
+        try:
+            self.assertTrue(connection.startStreaming())
+            time.sleep(0.1)
+            connection.stopStreaming()
+        finally:
+            connection.close()
+        lights = connection.history.last(100).values('light')
+        self.assertGreaterEqual(len(lights), 8)
+        self.assertEqual(lights, sorted(lights))
+
+    def test_trace_timeline(self):
+        """Test per-byte replies of a trace are grouped into poll cycles"""
+        path = os.path.join(self.directory.name, "board1.trace")
+        writer = TraceWriter(path, "AirConditionerSystemConnection", 9600, 0.1)
+        for cycle, ambient in enumerate((27, 28)):
+            for offset, (cmd, reply) in enumerate(((0x02, 25), (0x01, 5), (0x04, ambient),
+                                                   (0x03, 0), (0x05, 40))):
+                stamp = cycle * 1000000000 + offset * 1000000
+                writer.write(EVENT_TX, bytes([cmd]), stamp)
+                writer.write(EVENT_RX, bytes([reply]), stamp + 500000)
+        writer.close()
+        timeline = load_timeline(path)
+        self.assertEqual(timeline.frames, [(25, 5, 27, 0, 40), (25, 5, 28, 0, 40)])
+        self.assertEqual(timeline.times, [500000, 1000500000])
+
+
+class TestTelemetryStore(unittest.TestCase):
+    """Test cases for TelemetryStore class"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "telemetry.db")
+        self.store = TelemetryStore(self.path, flush_interval=0.05)
+        self.start = 1699999200  # on an hour boundary
+        self.recorder = self.store.recorder("board1", AirConditionerSystemConnection.HISTORY_FIELDS)
+        # Two hours, one sample every 30 s, ambient ramps 0.0 .. 23.9
+        for index in range(240):
+            self.recorder.append((self.start + index * 30) * 1000000000,
+                                 (25.0, index / 10, 40))
+        self.assertTrue(self.store.flush())
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_rollups(self):
+        """Test minute and hour rollups hold count, min, max and mean"""
+        hours = self.store.query("board1", "ambient", self.start, self.start + 7200,
+                                 resolution="1h")
+        self.assertEqual([point[0] for point in hours], [self.start, self.start + 3600])
+        self.assertAlmostEqual(hours[0][1], 5.95)
+        self.assertEqual(hours[0][2:], (0.0, 11.9))
+        minutes = self.store.query("board1", "ambient", self.start, self.start + 120,
+                                   resolution="1m")
+        self.assertEqual(len(minutes), 2)
+        self.assertEqual(minutes[1][2:], (0.2, 0.3))
+        # More samples in a later batch merge into the existing bucket
+        self.recorder.append((self.start + 7199) * 1000000000, (25.0, 50.0, 40))
+        self.assertTrue(self.store.flush())
+        hours = self.store.query("board1", "ambient", self.start, self.start + 7200,
+                                 resolution="1h")
+        self.assertEqual(hours[1][3], 50.0)
+
+    def test_duplicate_timestamps_counted_once(self):
+        """Test a sample whose timestamp is already stored stays out of the rollups"""
+        self.recorder.append(self.start * 1000000000, (25.0, 90.0, 40))
+        self.recorder.append((self.start + 10) * 1000000000, (25.0, 0.0, 40))
+        self.recorder.append((self.start + 10) * 1000000000, (25.0, 80.0, 40))
+        self.assertTrue(self.store.flush())
+        raw = self.store.query("board1", "ambient", self.start, self.start + 30, resolution="raw")
+        self.assertEqual([point[1] for point in raw], [0.0, 0.0])
+        (minute,) = self.store.query("board1", "ambient", self.start, self.start + 60,
+                                     resolution="1m")
+        self.assertAlmostEqual(minute[1], 0.1 / 3)
+        self.assertEqual(minute[2:], (0.0, 0.1))
+
+    def test_resolution_follows_span(self):
+        """Test query() picks raw rows or the rollup that fits max_points"""
+        raw = self.store.query("board1", "fan", self.start, self.start + 600)
+        self.assertEqual(len(raw), 20)
+        self.assertEqual(raw[0], (self.start, 40.0, 40.0, 40.0))
+        points = self.store.query("board1", "fan", self.start, self.start + 7200, max_points=150)
+        self.assertEqual(len(points), 120)  # per minute
+        points = self.store.query("board1", "fan", self.start, self.start + 7200, max_points=100)
+        self.assertEqual(len(points), 2)    # per hour
+
+    def test_connection_and_reopen(self):
+        """Test a connection records through setRecorder() and boards persist"""
+        connection = CurtainControlSystemConnection()
+        connection.setRecorder(self.store.recorder("board2", connection.HISTORY_FIELDS))
+        connection._apply_values((50, 5, 25, 0, 1013, 0, 120, 0))
+        self.assertTrue(self.store.flush())
+        self.store.close()
+        self.store = TelemetryStore(self.path)
+        self.assertEqual(set(self.store.boards), {"board1", "board2"})
+        self.assertEqual(self.store.query("board2", "light")[0][1], 120.0)
+        with self.assertRaises(ValueError):
+            self.store.recorder("board2", ("light",))
+
+
+class TestDownsample(unittest.TestCase):
+    """Test cases for the downsampling functions"""
+
+    def setUp(self):
+        # Slow ramp with one spike in the middle
+        self.points = [(float(x), x / 100 + (40.0 if x == 5003 else 0.0)) for x in range(10000)]
+
+    def test_lttb_keeps_shape(self):
+        """Test LTTB returns threshold points, the ends and the spike"""
+        xs, ys = downsample(iter(self.points), len(self.points), 100)
+        self.assertEqual(len(xs), 100)
+        self.assertEqual((xs[0], xs[-1]), (0.0, 9999.0))
+        self.assertIn(5003.0, xs)
+        self.assertEqual(xs, sorted(xs))
+
+    def test_lttb_keeps_first_and_last_point(self):
+        """Test LTTB returns both end points for every count and threshold"""
+        self.assertEqual(downsample(iter([(i, float(i % 3)) for i in range(17)]), 17, 13)[0][-1], 16)
+        for count in range(3, 120):
+            points = [(x, float(x % 7)) for x in range(count)]
+            for threshold in range(3, count):
+                xs, ys = downsample(iter(points), count, threshold)
+                self.assertEqual((xs[0], xs[-1], len(xs)), (0, count - 1, threshold),
+                                 (count, threshold))
+
+    def test_minmax_keeps_extremes(self):
+        """Test min-max keeps the low and high point of every bucket"""
+        xs, ys = downsample(iter(self.points), len(self.points), 20, method="minmax")
+        self.assertEqual(len(xs), 20)
+        self.assertEqual(xs[:2], [0.0, 999.0])
+        self.assertIn(5003.0, xs)
+        self.assertEqual(downsample(iter(self.points[:5]), 5, 20, "minmax")[0],
+                         [0.0, 1.0, 2.0, 3.0, 4.0])
+        with self.assertRaises(ValueError):
+            downsample([], 0, 10, method="mean")
+
+    def test_history_window(self):
+        """Test a wrapped HistoryWindow is downsampled without copying it"""
+        history = TelemetryHistory(('ambient',), capacity=500)
+        for second in range(800):
+            history.append(second * 1000000000, (20.0 + (second % 100) / 10,))
+        window = history.last(500)
+        xs, ys = downsample(window_points(window, 'ambient'), len(window), 50)
+        self.assertEqual(len(xs), 50)
+        self.assertEqual((xs[0], xs[-1]), (300.0, 799.0))
+        self.assertEqual(max(ys), 29.9)
+
+
+class TestTrendChart(unittest.TestCase):
+    """Test cases for TrendChart on a mocked canvas and clock"""
+
+    def setUp(self):
+        self.now = 1000 * 1000000000
+        clock = patch('trend_chart.time.monotonic_ns', side_effect=lambda: self.now)
+        canvas = patch('trend_chart.tk.Canvas')
+        clock.start()
+        self.canvas = canvas.start().return_value
+        self.addCleanup(clock.stop)
+        self.addCleanup(canvas.stop)
+        self.canvas.bbox.return_value = (0, 0, 30, 10)
+        self.canvas.create_line.side_effect = range(1, 100000)
+        self.history = TelemetryHistory(('desired', 'ambient', 'fan'), capacity=10000)
+
+    def _samples(self, start_s, count, every_s, fan=0.0):
+        for index in range(count):
+            stamp = int((start_s + index * every_s) * 1000000000)
+            self.history.append(stamp, (22.0, 20.0 + index / 100, fan))
+
+    def test_incremental_scroll(self):
+        """Test a refresh moves the items and draws only the new columns"""
+        self._samples(940.2, 120, 0.5)
+        chart = TrendChart(None, self.history, [('ambient', "Ambient", '#00d2ff')],
+                           window=60, y_range=(0, 50))
+        self.assertEqual(self.canvas.create_line.call_count, 120)
+        start_col = chart._now_col
+
+        self.now = 1010 * 1000000000
+        self._samples(1000.2, 20, 0.5)
+        chart.refresh()
+        shift = self.now // chart._col_ns - start_col
+        self.canvas.move.assert_called_once_with("data", -shift, 0)
+        self.assertEqual(self.canvas.create_line.call_count, 140)
+        columns = chart._columns['ambient']
+        self.assertTrue(all(column.col > chart._now_col - chart.plot_width for column in columns))
+        self.assertEqual(len(columns), 140 - 20)
+        self.assertGreaterEqual(chart.frame_ms_max, chart.frame_ms)
+
+    def test_items_bounded_by_width(self):
+        """Test dense samples fold into at most one item per pixel column"""
+        self._samples(940.0, 6000, 0.01)
+        chart = TrendChart(None, self.history, [('desired', "Desired", '#ff9f43'),
+                                                ('ambient', "Ambient", '#00d2ff')],
+                           window=60, y_range=(0, 50))
+        for field in ('desired', 'ambient'):
+            self.assertLessEqual(len(chart._columns[field]), chart.plot_width)
+        self.assertLessEqual(self.canvas.create_line.call_count, 2 * chart.plot_width)
+        column = chart._columns['ambient'][-2]
+        self.assertLess(column.low, column.high)
+
+    def test_auto_range_grows(self):
+        """Test an auto-scaled axis grows and redraws for an outlier"""
+        self._samples(990.0, 10, 1.0, fan=40.0)
+        chart = TrendChart(None, self.history, [('fan', "Fan", '#00ff88')], window=60)
+        self.assertEqual((chart._low, chart._high), (39.0, 41.0))
+        self.canvas.delete.reset_mock()
+
+        self.now += 1000000000
+        self.history.append(self.now - 1, (22.0, 20.0, 100.0))
+        chart.refresh()
+        self.assertGreaterEqual(chart._high, 100.0)
+        self.canvas.delete.assert_any_call("data")
+        self.assertEqual(len(chart._columns['fan']), 11)
+
+
+class TestTelemetrySnapshot(unittest.TestCase):
+    """Test cases for TelemetrySnapshot and the connections' snapshot fields"""
+
+    def test_immutable_values(self):
+        """Test snapshots expose fixed-point values and cannot be modified"""
+        snapshot = TelemetrySnapshot.from_values(('desired', 'ambient', 'fan'),
+                                                 (22.5, 24.1, 40), 123, 5)
+        self.assertEqual(snapshot.raw, (2250, 2410, 4000))
+        self.assertEqual((snapshot.desired, snapshot.ambient, snapshot.fan), (22.5, 24.1, 40.0))
+        self.assertEqual(snapshot.value('ambient'), 24.1)
+        self.assertEqual((snapshot.timestamp_ns, snapshot.seq), (123, 5))
+        with self.assertRaises(AttributeError):
+            snapshot.ambient = 30.0
+        with self.assertRaises(AttributeError):
+            snapshot.seq = 6
+        with self.assertRaises(AttributeError):
+            snapshot.humidity
+        changed = snapshot.replace('ambient', 25.0)
+        self.assertEqual((changed.ambient, changed.seq), (25.0, 6))
+        self.assertEqual(snapshot.ambient, 24.1)
+
+    def test_update_publishes_snapshot(self):
+        """Test every sample replaces the snapshot with the next sequence number"""
+        connection = AirConditionerSystemConnection()
+        initial = connection.getSnapshot()
+        self.assertEqual((initial.seq, initial.values()), (0, (0.0, 0.0, 0.0)))
+        connection._apply_values((22, 5, 24, 1, 40))
+        snapshot = connection.getSnapshot()
+        self.assertEqual(snapshot.seq, 1)
+        self.assertEqual(snapshot.asdict(), {'desired': 22.5, 'ambient': 24.1, 'fan': 40.0})
+        self.assertEqual(connection.getAmbientTemp(), 24.1)
+        self.assertEqual(connection.getFanSpeed(), 40)
+        self.assertIsInstance(connection.getFanSpeed(), int)
+        self.assertEqual(initial.seq, 0)
+
+        connection.ambientTemperature = 25.5
+        self.assertEqual(connection.getSnapshot().seq, 2)
+        self.assertEqual(connection.getSnapshot().desired, 22.5)
+
+    def test_curtain_snapshot(self):
+        """Test the curtain board publishes its four fields together"""
+        connection = CurtainControlSystemConnection()
+        connection._apply_values((50, 5, 12, 3, 1013, 2, 250, 0))
+        self.assertEqual(connection.getSnapshot().asdict(),
+                         {'curtain': 50.5, 'temperature': 12.3, 'pressure': 1013.2, 'light': 250.0})
+        self.assertEqual(connection.getOutdoorPress(), 1013.2)
+
+    def test_no_torn_reads(self):
+        """Test a reader never sees fields of two different samples"""
+        connection = AirConditionerSystemConnection()
+        stop = threading.Event()
+
+        def writer():
+            value = 0
+            while not stop.is_set():
+                value = (value + 1) % 50
+                connection._apply_values((value, 0, value, 0, value))
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            last_seq = 0
+            for _ in range(20000):
+                snapshot = connection.getSnapshot()
+                self.assertEqual(snapshot.desired, snapshot.ambient)
+                self.assertEqual(snapshot.ambient, snapshot.fan)
+                self.assertGreaterEqual(snapshot.seq, last_seq)
+                last_seq = snapshot.seq
+        finally:
+            stop.set()
+            thread.join()
+
+
+class TestSubscriptions(unittest.TestCase):
+    """Test cases for connection.subscribe() and the subscription predicates"""
+
+    def setUp(self):
+        self.connection = AirConditionerSystemConnection()
+
+    def _poll(self, desired, ambient, fan):
+        self.connection._apply_values((int(desired), round(desired * 10) % 10,
+                                       int(ambient), round(ambient * 10) % 10, fan))
+
+    def test_changed_by_threshold(self):
+        """Test a field subscription fires on the accumulated change from the last delivery"""
+        subscription = self.connection.subscribe(changed('ambient', by=0.5))
+        for ambient in (24.0, 24.2, 24.4, 24.5, 24.6, 25.0, 25.0):
+            self._poll(22.0, ambient, 40)
+        self.assertEqual([snapshot.ambient for snapshot in subscription.drain()],
+                         [24.0, 24.5, 25.0])
+
+    def test_default_skips_unchanged_polls(self):
+        """Test the default subscription only receives polls that changed a value"""
+        received = []
+        self.connection.subscribe(callback=received.append)
+        for fan in (40, 40, 41, 41, 41, 40):
+            self._poll(22.0, 24.0, fan)
+        self.assertEqual([snapshot.fan for snapshot in received], [40.0, 41.0, 40.0])
+        self.assertEqual([snapshot.seq for snapshot in received], [1, 3, 6])
+
+    def test_reached_target(self):
+        """Test reached() fires once per arrival within the tolerance"""
+        curtain = CurtainControlSystemConnection()
+        subscription = curtain.subscribe(reached('curtain', 100.0, tolerance=0.5))
+        for status in (0, 50, 99, 100, 80, 100):
+            curtain._apply_values((status, 0, 12, 0, 1013, 0, 250, 0))
+        self.assertEqual([snapshot.seq for snapshot in subscription.drain()], [4, 6])
+
+    def test_fields_not_read_do_not_match(self):
+        """Test changed() and reached() ignore fields the poll did not read"""
+        curtain = CurtainControlSystemConnection()
+        moved = curtain.subscribe(changed('temperature', by=0.5))
+        arrived = curtain.subscribe(reached('light', 300.0))
+        curtain._apply_values((0, 0, 12, 0, 1013, 0, 250, 0))
+        curtain._apply_values((10, 0, 20, 0, 1013, 0, 300, 0), ['curtain'])
+        curtain._apply_values((20, 0, 20, 0, 1013, 0, 300, 0), ['curtain', 'temperature', 'light'])
+        self.assertEqual([snapshot.seq for snapshot in moved.drain()], [1, 3])
+        self.assertEqual([snapshot.seq for snapshot in arrived.drain()], [3])
+
+    def test_overflow_policies(self):
+        """Test bounded queues drop the oldest or the newest snapshots"""
+        oldest = self.connection.subscribe(every, maxsize=2)
+        newest = self.connection.subscribe(every, maxsize=2, overflow="drop_newest")
+        blocked = self.connection.subscribe(every, maxsize=2, overflow="block",
+                                            block_timeout=0.01)
+        for fan in range(1, 5):
+            self._poll(22.0, 24.0, fan)
+        self.assertEqual([s.fan for s in oldest.drain()], [3.0, 4.0])
+        self.assertEqual([s.fan for s in newest.drain()], [1.0, 2.0])
+        self.assertEqual([s.fan for s in blocked.drain()], [1.0, 2.0])
+        self.assertEqual((oldest.dropped, newest.dropped, blocked.dropped), (2, 2, 2))
+        with self.assertRaises(ValueError):
+            self.connection.subscribe(overflow="grow")
+
+    def test_block_applies_backpressure(self):
+        """Test a blocking subscription loses nothing while its consumer keeps up"""
+        subscription = self.connection.subscribe(every, maxsize=1, overflow="block",
+                                                 block_timeout=5.0)
+        received = []
+        consumer = threading.Thread(target=lambda: received.extend(subscription))
+        consumer.start()
+        for fan in range(50):
+            self._poll(22.0, 24.0, fan)
+        self.connection.unsubscribe(subscription)
+        consumer.join(timeout=5)
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(subscription.dropped, 0)
+        self.assertEqual(len(received) + len(subscription), 50)
+
+    def test_unsubscribe_and_errors(self):
+        """Test unsubscribe stops delivery and a failing predicate is contained"""
+        broken = self.connection.subscribe(Mock(side_effect=KeyError('humidity')))
+        subscription = self.connection.subscribe(every)
+        self._poll(22.0, 24.0, 40)
+        self.assertEqual((len(broken), len(subscription)), (0, 1))
+        self.connection.unsubscribe(subscription)
+        self._poll(22.0, 24.0, 41)
+        self.assertTrue(subscription.closed)
+        self.assertEqual(len(subscription.drain()), 1)
+        self.assertIsNone(subscription.get(timeout=0.01))
+
+
+class TestConnectionRegistry(unittest.TestCase):
+    """Test cases for the shared, reference-counted connection registry"""
+
+    def setUp(self):
+        self.registry = ConnectionRegistry(poll=False)
+
+    @patch('serial.Serial')
+    def test_views_share_one_connection(self, mock_serial):
+        """Test two views of a port share one open connection until both release"""
+        mock_serial.return_value = MagicMock(is_open=True)
+        own = AirConditionerSystemConnection()
+        first = self.registry.acquire(AirConditionerSystemConnection, "COM3", connection=own)
+        second = self.registry.acquire(AirConditionerSystemConnection, "COM3")
+        self.assertIs(first.connection, own)
+        self.assertIs(second.connection, own)
+        self.assertEqual(mock_serial.call_count, 1)
+        self.assertEqual(self.registry.refcount("COM3"), 2)
+
+        first.release()
+        first.release()
+        self.assertEqual(self.registry.refcount("COM3"), 1)
+        self.assertTrue(own._is_running)
+        second.release()
+        self.assertFalse(own._is_running)
+        mock_serial.return_value.close.assert_called_once()
+        self.assertIsNone(self.registry.get("COM3"))
+
+    @patch('serial.Serial')
+    def test_board_class_mismatch(self, mock_serial):
+        """Test a port open for one board cannot be acquired as the other"""
+        mock_serial.return_value = MagicMock(is_open=True)
+        with self.registry.acquire(AirConditionerSystemConnection, "COM3"):
+            with self.assertRaises(ValueError):
+                self.registry.acquire(CurtainControlSystemConnection, "COM3")
+            self.assertEqual(self.registry.refcount("COM3"), 1)
+        self.assertEqual(self.registry.ports(), [])
+
+    @patch('serial.Serial')
+    def test_open_failure(self, mock_serial):
+        """Test a port that fails to open is not registered"""
+        mock_serial.side_effect = serial.SerialException("Port not found")
+        self.assertIsNone(self.registry.acquire(AirConditionerSystemConnection, "COM9"))
+        self.assertEqual(self.registry.ports(), [])
+
+    @patch('serial.Serial')
+    def test_open_connection_is_not_adopted(self, mock_serial):
+        """Test a view's connection still open on another port is left alone"""
+        mock_serial.return_value = MagicMock(is_open=True)
+        with self.registry.acquire(AirConditionerSystemConnection, "COM3") as other:
+            with self.registry.acquire(AirConditionerSystemConnection, "COM4",
+                                       connection=other.connection) as handle:
+                self.assertIsNot(handle.connection, other.connection)
+                self.assertEqual(other.connection.comPort, "COM3")
+
+    @patch('serial.Serial')
+    def test_single_poller_per_port(self, mock_serial):
+        """Test one poll thread serves every view and stops with the last one"""
+        mock_serial.return_value = MagicMock(is_open=True)
+        registry = ConnectionRegistry()
+        polled = threading.Event()
+        with patch.object(AirConditionerSystemConnection, 'update',
+                          side_effect=lambda: polled.set()):
+            first = registry.acquire(AirConditionerSystemConnection, "COM5")
+            second = registry.acquire(AirConditionerSystemConnection, "COM5")
+            self.assertTrue(polled.wait(2.0))
+            pollers = [t for t in threading.enumerate() if t.name == "poll-COM5"]
+            self.assertEqual(len(pollers), 1)
+            first.release()
+            second.release()
+            # release() returns once the poller has stopped
+            self.assertFalse(pollers[0].is_alive())
+
+    @patch('serial.Serial')
+    def test_acquire_waits_for_closing_port(self, mock_serial):
+        """Test an acquire() during the last release() reopens the port after the close"""
+        events = []
+        port = MagicMock(is_open=True)
+
+        def open_port(**settings):
+            events.append("open")
+            return port
+
+        mock_serial.side_effect = open_port
+        handle = self.registry.acquire(AirConditionerSystemConnection, "COM3")
+        old = handle.connection
+        closing, close = threading.Event(), old.close
+
+        def slow_close():
+            closing.set()
+            time.sleep(0.1)
+            result = close()
+            events.append("closed")
+            return result
+
+        old.close = slow_close
+        releaser = threading.Thread(target=handle.release)
+        releaser.start()
+        self.assertTrue(closing.wait(2.0))
+        # Other ports and the getters are not held up by the close
+        started = time.monotonic()
+        other = self.registry.acquire(AirConditionerSystemConnection, "COM4")
+        self.assertEqual(self.registry.ports(), ["COM4"])
+        self.assertIsNone(self.registry.get("COM3"))
+        self.assertLess(time.monotonic() - started, 0.05)
+        other.release()
+        reopened = self.registry.acquire(AirConditionerSystemConnection, "COM3")
+        releaser.join(timeout=2.0)
+        self.assertEqual(events, ["open", "open", "closed", "open"])
+        self.assertIsNot(reopened.connection, old)
+        self.assertFalse(old._is_running)
+        self.assertTrue(reopened.connection._is_running)
+        self.assertIs(self.registry.get("COM3"), reopened.connection)
+        self.assertEqual(self.registry.refcount("COM3"), 1)
+        reopened.release()
+
+
+class TestUiDispatcher(unittest.TestCase):
+    """Test cases for UiDispatcher and TextBindings"""
+
+    def setUp(self):
+        self.root = MagicMock()
+        self.dispatcher = UiDispatcher(self.root, fps=25)
+
+    def test_coalesces_per_frame(self):
+        """Test many posts from threads become one handler call per source"""
+        handler = Mock(return_value=1)
+        other = Mock(return_value=0)
+        self.dispatcher.register('ac', handler)
+        self.dispatcher.register('curtain', other)
+
+        def worker():
+            for index in range(100):
+                self.dispatcher.post('ac', index)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.dispatcher.post('curtain', 'open')
+        self.dispatcher.post('closed window', 'ignored')
+
+        self.assertEqual(self.dispatcher.run_frame(), 2)
+        handler.assert_called_once_with(99)
+        other.assert_called_once_with('open')
+        self.assertEqual(self.dispatcher.received, 402)
+        self.assertEqual(self.dispatcher.widgets_updated, 1)
+        self.assertEqual(self.dispatcher.run_frame(), 0)
+
+    def test_handler_error_is_contained(self):
+        """Test a failing handler does not stop the others or the frame loop"""
+        self.dispatcher.register('bad', Mock(side_effect=RuntimeError("widget gone")))
+        good = Mock(return_value=0)
+        self.dispatcher.register('good', good)
+        self.dispatcher.post('bad', 1)
+        self.dispatcher.post('good', 2)
+        self.assertEqual(self.dispatcher.run_frame(), 1)
+        good.assert_called_once_with(2)
+
+    def test_start_stop(self):
+        """Test the frame timer runs at the requested rate and is cancelled"""
+        self.root.after.return_value = 'after#1'
+        self.dispatcher.start()
+        self.dispatcher.start()
+        self.root.after.assert_called_once_with(40, self.dispatcher._tick)
+        self.dispatcher.stop()
+        self.root.after_cancel.assert_called_once_with('after#1')
+
+    def test_post_sample(self):
+        """Test the connection's current snapshot is posted"""
+        connection = AirConditionerSystemConnection()
+        self.dispatcher.post_sample(connection)
+        connection._apply_values((22, 5, 24, 1, 40))
+        self.dispatcher.post_sample(connection)
+        handler = Mock(return_value=0)
+        self.dispatcher.register(connection, handler)
+        self.dispatcher.run_frame()
+        handler.assert_called_once_with(connection.getSnapshot())
+        self.assertEqual(handler.call_args[0][0].asdict(),
+                         {'desired': 22.5, 'ambient': 24.1, 'fan': 40.0})
+
+    def test_text_bindings_skip_unchanged(self):
+        """Test labels are only reconfigured when their text changes"""
+        ambient, fan = Mock(), Mock()
+        bindings = TextBindings((ambient, lambda s: f"{s['ambient']:.1f} °C"),
+                                (fan, lambda s: f"{s['fan']:.0f} rps"))
+        self.assertEqual(bindings({'ambient': 24.1, 'fan': 40.0}), 2)
+        self.assertEqual(bindings({'ambient': 24.1, 'fan': 40.0}), 0)
+        self.assertEqual(bindings({'ambient': 24.2, 'fan': 40.0}), 1)
+        ambient.configure.assert_called_with(text="24.2 °C")
+        fan.configure.assert_called_once_with(text="40 rps")
+        bindings.reset()
+        self.assertEqual(bindings({'ambient': 24.2, 'fan': 40.0}), 2)
+
+    def test_text_bindings_skip_same_snapshot(self):
+        """Test a snapshot already shown is skipped by its sequence number"""
+        label = Mock()
+        format_ambient = Mock(return_value="24.1 °C")
+        bindings = TextBindings((label, format_ambient))
+        snapshot = TelemetrySnapshot.from_values(('ambient',), (24.1,), 0, 7)
+        self.assertEqual(bindings(snapshot), 1)
+        self.assertEqual(bindings(snapshot), 0)
+        format_ambient.assert_called_once_with(snapshot)
 
 
 def run_tests():
@@ -287,6 +1776,24 @@ def run_tests():
     # Add test cases
     suite.addTests(loader.loadTestsFromTestCase(TestAirConditionerSystemConnection))
     suite.addTests(loader.loadTestsFromTestCase(TestCurtainControlSystemConnection))
+    suite.addTests(loader.loadTestsFromTestCase(TestSerialWorker))
+    suite.addTests(loader.loadTestsFromTestCase(TestAsyncConnection))
+    suite.addTests(loader.loadTestsFromTestCase(TestFleetPoller))
+    suite.addTests(loader.loadTestsFromTestCase(TestAdaptivePollInterval))
+    suite.addTests(loader.loadTestsFromTestCase(TestBoardSimulators))
+    suite.addTests(loader.loadTestsFromTestCase(TestInstrumentation))
+    suite.addTests(loader.loadTestsFromTestCase(TestAppLogging))
+    suite.addTests(loader.loadTestsFromTestCase(TestTelemetryHistory))
+    suite.addTests(loader.loadTestsFromTestCase(TestTelemetryRecorder))
+    suite.addTests(loader.loadTestsFromTestCase(TestUartTrace))
+    suite.addTests(loader.loadTestsFromTestCase(TestReplay))
+    suite.addTests(loader.loadTestsFromTestCase(TestTelemetryStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestDownsample))
+    suite.addTests(loader.loadTestsFromTestCase(TestTrendChart))
+    suite.addTests(loader.loadTestsFromTestCase(TestTelemetrySnapshot))
+    suite.addTests(loader.loadTestsFromTestCase(TestSubscriptions))
+    suite.addTests(loader.loadTestsFromTestCase(TestUiDispatcher))
+    suite.addTests(loader.loadTestsFromTestCase(TestConnectionRegistry))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,253 @@
+"""
+UART Trace Analyzer
+Offline decoding of traces recorded with startTrace() (see uart_trace.py)
+
+The analyzer replays the byte stream the way the board sees it: every GET
+waits for a one-byte reply and CMD_GET_ALL for a frame, in the order they
+were sent (so pipelined bursts pair up too). SET writes and the streaming
+commands expect no reply; while streaming, frames arrive unsolicited.
+
+A request is timed out when its reply has not arrived by the deadline the
+connection itself uses (response timeout per expected byte, counting the
+replies queued ahead of it). Reported per trace:
+
+    commands         latency percentiles, timeouts and bytes per GET command
+    timeouts         requests without a reply by their deadline
+    late_replies     reply bytes that arrived with no request outstanding
+    misaligned       replies the connection paired with the wrong request:
+                     after a timeout without a flush, a late reply shifts the
+                     following replies by one until the extra byte shows up
+    bad_frames       frames with a wrong sync, length or checksum
+    discarded_bytes  input thrown away by reset_input_buffer()
+    stream_frames    valid frames pushed while streaming
+
+Usage:
+    python trace_analyzer.py trace.bin [--timeout 0.1] [--json]
+"""
+
+import argparse
+import json
+import sys
+from collections import deque
+
+import home_automation
+import curtain_control
+from home_automation import CMD_GET_ALL, CMD_STREAM_ON, CMD_STREAM_OFF, FRAME_SYNC
+from instrumentation import ConnectionInstruments, format_snapshot
+from uart_trace import EVENT_TX, EVENT_RX, EVENT_FLUSH, read_trace
+
+
+# Connection class named in the trace header -> (class, its single-byte GETs)
+BOARD_CLASSES = {
+    "AirConditionerSystemConnection": (home_automation.AirConditionerSystemConnection,
+                                       frozenset(home_automation.POLL_SEQUENCE)),
+    "CurtainControlSystemConnection": (curtain_control.CurtainControlSystemConnection,
+                                       frozenset(curtain_control.POLL_SEQUENCE)),
+}
+
+
+class _Request:
+    __slots__ = ("cmd", "sent", "deadline", "size")
+
+    def __init__(self, cmd, sent, deadline, size):
+        self.cmd = cmd
+        self.sent = sent
+        self.deadline = deadline
+        self.size = size
+
+
+class TraceAnalyzer:
+    """Pairs the requests and replies of one trace"""
+
+    def __init__(self, board: str, response_timeout: float, on_reply=None):
+        """on_reply(cmd, timestamp_ns, data) is called for every paired reply
+        and every valid stream frame (cmd CMD_GET_ALL)"""
+        if board not in BOARD_CLASSES:
+            raise ValueError(f"unknown board {board!r}")
+        connection_class, self.get_commands = BOARD_CLASSES[board]
+        self.board = board
+        self.frame_size = connection_class.TELEMETRY_FRAME.size + 3
+        self.timeout_ns = int(response_timeout * 1e9)
+        self.instruments = ConnectionInstruments()
+        self.on_reply = on_reply
+        self.counts = {
+            "timeouts": 0, "late_replies": 0, "misaligned": 0, "bad_frames": 0,
+            "discarded_bytes": 0, "stream_frames": 0, "set_writes": 0,
+            "unknown_commands": 0, "bytes_tx": 0, "bytes_rx": 0,
+        }
+        self._pending = deque()
+        self._queued_bytes = 0       # reply bytes expected by _pending
+        self._frame = bytearray()
+        self._streaming = False
+        self._stream_stopping = False  # frames still in flight until the flush
+        self._since_timeout = None   # replies paired since an unflushed timeout
+        self.first = None
+        self.last = None
+
+    def feed(self, timestamp_ns: int, kind: int, data: bytes) -> None:
+        """Process one trace event"""
+        if self.first is None:
+            self.first = timestamp_ns
+        self.last = timestamp_ns
+        self._expire(timestamp_ns)
+        if kind == EVENT_TX:
+            self.counts["bytes_tx"] += len(data)
+            for cmd in data:
+                self._request(cmd, timestamp_ns)
+        elif kind == EVENT_RX:
+            self.counts["bytes_rx"] += len(data)
+            for byte in data:
+                self._reply(byte, timestamp_ns)
+        elif kind == EVENT_FLUSH:
+            self.counts["discarded_bytes"] += len(data)
+            self._expire(None)
+            self._frame.clear()
+            self._since_timeout = None
+            if self._stream_stopping:
+                self._streaming = self._stream_stopping = False
+
+    def finish(self) -> None:
+        """Requests still waiting at the end of the trace timed out"""
+        self._expire(None)
+
+    def report(self) -> dict:
+        result = dict(self.counts)
+        result["board"] = self.board
+        result["duration_s"] = (self.last - self.first) / 1e9 if self.first is not None else 0.0
+        result["commands"] = self.instruments.snapshot()
+        return result
+
+    def _request(self, cmd: int, timestamp_ns: int) -> None:
+        if cmd & 0x80:
+            self.counts["set_writes"] += 1
+        elif cmd == CMD_STREAM_ON:
+            self._streaming = True
+            self._stream_stopping = False
+        elif cmd == CMD_STREAM_OFF:
+            self._stream_stopping = True
+        elif cmd == CMD_GET_ALL or cmd in self.get_commands:
+            size = self.frame_size if cmd == CMD_GET_ALL else 1
+            self._queued_bytes += size
+            deadline = timestamp_ns + self.timeout_ns * self._queued_bytes
+            self._pending.append(_Request(cmd, timestamp_ns, deadline, size))
+        else:
+            self.counts["unknown_commands"] += 1
+
+    def _expire(self, now) -> None:
+        """Time out the requests whose deadline passed (all if now is None)"""
+        while self._pending and (now is None or self._pending[0].deadline < now):
+            request = self._pending.popleft()
+            self._queued_bytes -= request.size
+            self.counts["timeouts"] += 1
+            self.instruments.record(request.cmd, (request.deadline - request.sent) / 1e9,
+                                    1, 0, timed_out=True)
+            self._since_timeout = 0
+            if request.cmd == CMD_GET_ALL:
+                self._frame.clear()
+
+    def _reply(self, byte: int, timestamp_ns: int) -> None:
+        head = self._pending[0] if self._pending else None
+        if self._frame or (head is not None and head.cmd == CMD_GET_ALL) \
+                or (head is None and self._streaming):
+            self._frame_byte(byte, timestamp_ns, head)
+        elif head is not None:
+            self._complete(head, timestamp_ns, bytes([byte]))
+        else:
+            self.counts["late_replies"] += 1
+            if self._since_timeout:
+                # The extra byte proves the replies since the timeout were shifted
+                self.counts["misaligned"] += self._since_timeout
+            self._since_timeout = None
+
+    def _frame_byte(self, byte: int, timestamp_ns: int, head) -> None:
+        frame = self._frame
+        if not frame and byte != FRAME_SYNC:
+            if head is None:
+                self.counts["late_replies"] += 1  # stream reader skips it
+            else:
+                self._bad_frame(head)
+            return
+        frame.append(byte)
+        if len(frame) == 2 and frame[1] != self.frame_size - 3:
+            self._bad_frame(head)
+            return
+        if len(frame) < self.frame_size:
+            return
+        checksum = 0
+        for value in frame[1:-1]:
+            checksum ^= value
+        if checksum != frame[-1]:
+            self._bad_frame(head)
+            return
+        data = bytes(frame)
+        frame.clear()
+        if head is not None and head.cmd == CMD_GET_ALL:
+            self._complete(head, timestamp_ns, data)
+        else:
+            self.counts["stream_frames"] += 1
+            if self.on_reply is not None:
+                self.on_reply(CMD_GET_ALL, timestamp_ns, data)
+
+    def _bad_frame(self, head) -> None:
+        self._frame.clear()
+        self.counts["bad_frames"] += 1
+        if head is not None and head.cmd == CMD_GET_ALL:
+            self._pending.popleft()
+            self._queued_bytes -= head.size
+            self.instruments.record_error(CMD_GET_ALL)
+
+    def _complete(self, request, timestamp_ns: int, data: bytes) -> None:
+        self._pending.popleft()
+        self._queued_bytes -= request.size
+        self.instruments.record(request.cmd, (timestamp_ns - request.sent) / 1e9, 1, len(data))
+        if self._since_timeout is not None:
+            self._since_timeout += 1
+        if self.on_reply is not None:
+            self.on_reply(request.cmd, timestamp_ns, data)
+
+
+def analyze(path: str, timeout: float = None) -> dict:
+    """Analyze a trace file, timeout overrides the response timeout it recorded"""
+    header, events = read_trace(path)
+    analyzer = TraceAnalyzer(header["board"], timeout or header["response_timeout"])
+    for timestamp_ns, kind, data in events:
+        analyzer.feed(timestamp_ns, kind, data)
+    analyzer.finish()
+    result = analyzer.report()
+    result["baud"] = header["baud"]
+    result["events"] = len(events)
+    return result
+
+
+def format_report(report: dict) -> str:
+    """Text summary of analyze()"""
+    lines = [
+        f"{report['board']} at {report['baud']} baud, {report['duration_s']:.1f} s, "
+        f"{report['bytes_tx']} bytes out, {report['bytes_rx']} bytes in",
+        format_snapshot(report["commands"]),
+    ]
+    for key in ("timeouts", "late_replies", "misaligned", "bad_frames",
+                "discarded_bytes", "stream_frames", "set_writes", "unknown_commands"):
+        lines.append(f"{key:<17}{report[key]}")
+    return "\n".join(lines)
+
+
+def main():
+    """Analyze a trace from the command line"""
+    parser = argparse.ArgumentParser(description="UART trace analyzer")
+    parser.add_argument("trace")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="response timeout per byte (s), default from the trace")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = analyze(args.trace, args.timeout)
+    except (OSError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
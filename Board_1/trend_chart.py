@@ -0,0 +1,274 @@
+"""
+Trend Charts
+Live line charts of a connection's telemetry history, one tk.Canvas per plot
+
+The x axis has one pixel column per window / width seconds. Samples are
+folded into their column (first, low, high and last value) and every
+column is one canvas line item: the link from the previous column's last
+value, then the column's range. A refresh therefore only
+    - shifts all data items left by the columns that elapsed (one
+      canvas.move of the "data" tag),
+    - deletes the columns that scrolled out,
+    - creates or updates the items of columns with new samples.
+Nothing is redrawn unless the window changes or an auto-scaled axis has to
+grow. The number of items never exceeds the plot width per series.
+
+TrendPanel stacks the charts of one app under a window selector and
+refreshes them from the Tk main loop (10 Hz by default).
+"""
+
+import time
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+
+from telemetry_history import HISTORY_SCALE
+from app_logging import get_logger
+
+log = get_logger("chart")
+
+
+# Window choices of TrendPanel: label, seconds
+WINDOWS = (("1 min", 60), ("10 min", 600), ("1 h", 3600), ("24 h", 86400))
+
+# Plot margins in pixels (axis labels left, legend on top)
+MARGIN_LEFT = 40
+MARGIN_RIGHT = 6
+MARGIN_TOP = 16
+MARGIN_BOTTOM = 6
+
+
+class PixelColumn:
+    """Samples of one series that fall into one pixel column"""
+
+    __slots__ = ("col", "first", "low", "high", "last", "link", "item")
+
+    def __init__(self, col: int, value: float, link):
+        self.col = col
+        self.first = self.low = self.high = self.last = value
+        self.link = link     # (col, last value) of the previous column or None
+        self.item = None
+
+    def add(self, value: float) -> None:
+        if value < self.low:
+            self.low = value
+        elif value > self.high:
+            self.high = value
+        self.last = value
+
+
+class TrendChart:
+    """Scrolling chart of some HISTORY_FIELDS of one connection"""
+
+    def __init__(self, parent, history, series, window: float = 60.0,
+                 width: int = 420, height: int = 150, y_range=None, unit: str = "",
+                 bg: str = '#16213e'):
+        """series: (field, label, color) tuples sharing the y axis.
+
+        y_range is (low, high); None grows the axis to fit the data.
+        """
+        self.history = history
+        self.series = tuple(series)
+        self.unit = unit
+        self.fixed_range = y_range
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg=bg,
+                                highlightthickness=0)
+        self.plot_left = MARGIN_LEFT
+        self.plot_right = width - MARGIN_RIGHT
+        self.plot_top = MARGIN_TOP
+        self.plot_bottom = height - MARGIN_BOTTOM
+        self.plot_width = self.plot_right - self.plot_left
+        self.frame_ms = 0.0       # duration of the last refresh()
+        self.frame_ms_max = 0.0
+        self._columns = {field: deque() for field, _, _ in self.series}
+        self._colors = {field: color for field, _, color in self.series}
+        self._low = self._high = None
+        self._draw_frame()
+        self.setWindow(window)
+
+    def setWindow(self, seconds: float) -> None:
+        """Show the last seconds of history"""
+        self.window_ns = int(seconds * 1e9)
+        self._col_ns = max(1, self.window_ns // self.plot_width)
+        self._rebuild()
+
+    def setHistory(self, history) -> None:
+        """Chart another TelemetryHistory with the same fields"""
+        self.history = history
+        if self.fixed_range is None:
+            self._low = self._high = None
+        self._rebuild()
+
+    def refresh(self) -> None:
+        """Scroll to now and draw the samples added since the last refresh"""
+        started = time.perf_counter()
+        now_col = time.monotonic_ns() // self._col_ns
+        shift = now_col - self._now_col
+        if shift:
+            self.canvas.move("data", -shift, 0)
+            self._now_col = now_col
+            self._drop_old()
+        self._feed(self._last_ts + 1)
+        if self._grow:
+            self._rebuild()
+        self.frame_ms = (time.perf_counter() - started) * 1000
+        if self.frame_ms > self.frame_ms_max:
+            self.frame_ms_max = self.frame_ms
+
+    def _rebuild(self) -> None:
+        """Redraw the whole window from history"""
+        self._now_col = time.monotonic_ns() // self._col_ns
+        since = (self._now_col - self.plot_width + 1) * self._col_ns
+        if self.fixed_range is not None:
+            self._low, self._high = self.fixed_range
+        # An auto range only grows, so a second pass fits everything
+        for _ in range(2):
+            self.canvas.delete("data")
+            for columns in self._columns.values():
+                columns.clear()
+            self._grow = False
+            self._last_ts = since - 1
+            self._feed(since)
+            if not self._grow:
+                break
+        self._grow = False
+        self._draw_axis()
+
+    def _feed(self, since_ns: int) -> None:
+        """Fold the samples from since_ns up to the current column into the chart"""
+        window = self.history.window(since_ns=since_ns,
+                                     until_ns=(self._now_col + 1) * self._col_ns)
+        col_ns = self._col_ns
+        fields = [field for field, _, _ in self.series]
+        for segment, times in enumerate(window.times):
+            columns = [window.columns[field][segment] for field in fields]
+            for index, stamp in enumerate(times):
+                col = stamp // col_ns
+                for field, values in zip(fields, columns):
+                    self._add(field, col, values[index] / HISTORY_SCALE)
+            if len(times):
+                self._last_ts = times[-1]
+
+    def _add(self, field: str, col: int, value: float) -> None:
+        if self.fixed_range is None:
+            self._fit(value)
+        columns = self._columns[field]
+        current = columns[-1] if columns else None
+        if current is not None and current.col == col:
+            current.add(value)
+            self.canvas.coords(current.item, *self._coords(current))
+            return
+        link = (current.col, current.last) if current is not None else None
+        column = PixelColumn(col, value, link)
+        column.item = self.canvas.create_line(*self._coords(column), fill=self._colors[field],
+                                              width=1, tags=("data",))
+        columns.append(column)
+
+    def _fit(self, value: float) -> None:
+        """Auto range: grow the axis (and schedule a redraw) if value is outside"""
+        if self._low is None:
+            self._low, self._high = value - 1.0, value + 1.0
+        elif not self._low <= value <= self._high:
+            margin = (self._high - self._low) * 0.1
+            self._low = min(self._low, value - margin)
+            self._high = max(self._high, value + margin)
+            self._grow = True
+
+    def _coords(self, column: PixelColumn) -> list:
+        x = self._x(column.col)
+        coords = []
+        if column.link is not None:
+            coords += [self._x(column.link[0]), self._y(column.link[1])]
+        coords += [x, self._y(column.first), x, self._y(column.low),
+                   x, self._y(column.high), x, self._y(column.last)]
+        return coords
+
+    def _x(self, col: int) -> int:
+        return self.plot_right - (self._now_col - col)
+
+    def _y(self, value: float) -> float:
+        low, high = self._low, self._high
+        if high <= low:
+            return self.plot_bottom
+        fraction = min(1.0, max(0.0, (value - low) / (high - low)))
+        return self.plot_bottom - fraction * (self.plot_bottom - self.plot_top)
+
+    def _drop_old(self) -> None:
+        """Delete the columns that scrolled past the left edge"""
+        oldest = self._now_col - self.plot_width + 1
+        for columns in self._columns.values():
+            while columns and columns[0].col < oldest:
+                self.canvas.delete(columns.popleft().item)
+
+    def _draw_frame(self) -> None:
+        canvas = self.canvas
+        canvas.create_rectangle(self.plot_left, self.plot_top, self.plot_right,
+                                self.plot_bottom, outline='#333355')
+        x = self.plot_left
+        for _, label, color in self.series:
+            item = canvas.create_text(x, 2, text=label, fill=color, anchor='nw',
+                                      font=('Segoe UI', 8))
+            x = canvas.bbox(item)[2] + 12
+
+    def _draw_axis(self) -> None:
+        canvas = self.canvas
+        canvas.delete("axis")
+        if self._low is None:
+            return
+        for value, y in ((self._high, self.plot_top), (self._low, self.plot_bottom)):
+            canvas.create_text(self.plot_left - 4, y, text=f"{value:.0f}{self.unit}",
+                               fill='#888888', anchor='e', font=('Segoe UI', 8), tags=("axis",))
+
+
+class TrendPanel:
+    """Window selector plus a stack of TrendCharts, refreshed by the Tk loop"""
+
+    def __init__(self, parent, history, charts, window: float = WINDOWS[0][1],
+                 interval_ms: int = 100, bg: str = '#1a1a2e'):
+        """charts: keyword dicts for TrendChart (series, height, y_range, unit)"""
+        self.frame = tk.Frame(parent, bg=bg)
+        self.interval_ms = interval_ms
+        self._after = None
+
+        header = tk.Frame(self.frame, bg=bg)
+        header.pack(fill='x', pady=(0, 5))
+        ttk.Label(header, text="Trend window:", style='Data.TLabel').pack(side='left')
+        self.window_combo = ttk.Combobox(header, width=8, state='readonly',
+                                         values=[label for label, _ in WINDOWS])
+        self.window_combo.set(next(label for label, seconds in WINDOWS if seconds == window))
+        self.window_combo.bind('<<ComboboxSelected>>', self._on_window)
+        self.window_combo.pack(side='right')
+
+        self.charts = []
+        for options in charts:
+            chart = TrendChart(self.frame, history, window=window, **options)
+            chart.canvas.pack(pady=(0, 8))
+            self.charts.append(chart)
+
+    def setHistory(self, history) -> None:
+        """Switch every chart to another connection's history"""
+        for chart in self.charts:
+            chart.setHistory(history)
+
+    def start(self) -> None:
+        """Refresh every interval_ms on the Tk main loop"""
+        if self._after is None:
+            self._tick()
+
+    def stop(self) -> None:
+        if self._after is not None:
+            self.frame.after_cancel(self._after)
+            self._after = None
+
+    def _tick(self) -> None:
+        try:
+            for chart in self.charts:
+                chart.refresh()
+        except Exception as e:
+            log.error("Chart refresh error: %s", e)
+        self._after = self.frame.after(self.interval_ms, self._tick)
+
+    def _on_window(self, event=None) -> None:
+        seconds = dict(WINDOWS)[self.window_combo.get()]
+        for chart in self.charts:
+            chart.setWindow(seconds)
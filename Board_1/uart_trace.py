@@ -0,0 +1,135 @@
+"""
+UART Trace Capture
+Records every byte a connection writes and reads, for offline analysis
+
+TracingSerial wraps the pyserial object of an open connection (see
+HomeAutomationSystemConnection.startTrace()). Each write(), each non-empty
+read() and each reset_input_buffer() becomes one event with a
+time.monotonic_ns() timestamp; bytes discarded by reset_input_buffer() are
+read out first so late replies stay visible in the trace.
+
+Trace file layout (little endian):
+    header  b"HATRACE1", baud (uint32), response timeout in s (float32),
+            length of the connection class name (uint16), the name
+    events  timestamp_ns (int64), kind (uint8), length (uint16), bytes
+
+Events go through a buffered file, so tracing adds no system call per byte.
+trace_analyzer.py decodes a trace into per-command latencies and protocol
+errors.
+
+The asyncio connection classes read the port descriptor directly and are
+not traced.
+"""
+
+import struct
+import threading
+import time
+
+
+TRACE_MAGIC = b"HATRACE1"
+TRACE_HEADER = struct.Struct("<8sIfH")
+EVENT = struct.Struct("<qBH")
+
+# Event kinds
+EVENT_TX = 0     # bytes written to the board
+EVENT_RX = 1     # bytes read from the board
+EVENT_FLUSH = 2  # reset_input_buffer(), bytes are the discarded input
+
+EVENT_NAMES = {EVENT_TX: "TX", EVENT_RX: "RX", EVENT_FLUSH: "FLUSH"}
+
+
+class TraceWriter:
+    """Appends events to a trace file, shared by the I/O and stream threads"""
+
+    def __init__(self, path: str, board: str, baudRate: int, response_timeout: float,
+                 buffer_size: int = 65536):
+        self.path = path
+        self.events = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "wb", buffering=buffer_size)
+        name = board.encode("utf-8")
+        self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, baudRate, response_timeout, len(name)))
+        self._file.write(name)
+
+    def write(self, kind: int, data: bytes, timestamp_ns: int = None) -> None:
+        """Append one event, data longer than 65535 bytes is split"""
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        with self._lock:
+            if self._file is None:
+                return
+            for start in range(0, max(len(data), 1), 0xFFFF):
+                chunk = data[start:start + 0xFFFF]
+                self._file.write(EVENT.pack(timestamp_ns, kind, len(chunk)))
+                self._file.write(chunk)
+                self.events += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TracingSerial:
+    """pyserial proxy that logs traffic to a TraceWriter"""
+
+    def __init__(self, port, writer: TraceWriter):
+        self.port = port        # the wrapped serial.Serial
+        self.writer = writer
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.writer.write(EVENT_TX, data)
+        return self.port.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.port.read(size)
+        if data:
+            self.writer.write(EVENT_RX, data)
+        return data
+
+    def reset_input_buffer(self) -> None:
+        waiting = self.port.in_waiting
+        discarded = self.port.read(waiting) if waiting else b""
+        self.port.reset_input_buffer()
+        self.writer.write(EVENT_FLUSH, discarded)
+
+    def __getattr__(self, name):
+        # Everything else (in_waiting, flush, is_open, close, ...) as is
+        return getattr(self.port, name)
+
+
+def read_trace(path: str):
+    """Return (header, events) of a trace file.
+
+    header is a dict with board, baud and response_timeout; events is a list
+    of (timestamp_ns, kind, data) tuples. A trace cut short by a crash is
+    read up to its last complete event.
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    if len(content) < TRACE_HEADER.size or content[:len(TRACE_MAGIC)] != TRACE_MAGIC:
+        raise ValueError(f"{path} is not a UART trace")
+    _, baudRate, response_timeout, name_len = TRACE_HEADER.unpack_from(content)
+    offset = TRACE_HEADER.size
+    header = {
+        "board": content[offset:offset + name_len].decode("utf-8"),
+        "baud": baudRate,
+        "response_timeout": response_timeout,
+    }
+    offset += name_len
+    events = []
+    while offset + EVENT.size <= len(content):
+        timestamp_ns, kind, length = EVENT.unpack_from(content, offset)
+        offset += EVENT.size
+        if offset + length > len(content):
+            break
+        events.append((timestamp_ns, kind, content[offset:offset + length]))
+        offset += length
+    return header, events
@@ -0,0 +1,133 @@
+"""
+UI Dispatcher
+Frame-rate-limited hand-off of connection samples to the Tk main loop
+
+Worker threads never touch widgets: they post() the newest sample of a
+source (usually a connection's TelemetrySnapshot) to a thread-safe queue.
+Once per frame the dispatcher drains the queue on the Tk thread, keeps
+only the latest sample per source and calls that source's handler once.
+However fast the boards are polled, every window is updated at most fps
+times a second, and one after() timer serves all of them instead of one
+after(0, ...) per poll.
+
+TextBindings is the usual handler: it formats the sample for each label and
+only reconfigures the labels whose text actually changed.
+
+Usage:
+    dispatcher = UiDispatcher(root)
+    dispatcher.register(connection, TextBindings(
+        (ambient_label, lambda snapshot: f"{snapshot.ambient:.1f} °C")))
+    connection.subscribe(callback=lambda snapshot: dispatcher.post(connection, snapshot))
+    dispatcher.start()
+"""
+
+import queue
+
+from app_logging import get_logger
+
+log = get_logger("ui")
+
+
+class TextBindings:
+    """Handler that sets label texts from a sample, skipping unchanged ones"""
+
+    def __init__(self, *bindings):
+        """bindings: (widget, format) pairs, format(sample) returns the text"""
+        self._bindings = [[widget, fmt, None] for widget, fmt in bindings]
+        self._seq = None
+
+    def __call__(self, sample) -> int:
+        """Apply one sample, returns the number of widgets reconfigured"""
+        # A snapshot that was already shown cannot change any text
+        seq = getattr(sample, "seq", None)
+        if seq is not None and seq == self._seq:
+            return 0
+        self._seq = seq
+        changed = 0
+        for binding in self._bindings:
+            text = binding[1](sample)
+            if text != binding[2]:
+                binding[0].configure(text=text)
+                binding[2] = text
+                changed += 1
+        return changed
+
+    def reset(self) -> None:
+        """Forget the shown texts, the next sample sets every label"""
+        self._seq = None
+        for binding in self._bindings:
+            binding[2] = None
+
+
+class UiDispatcher:
+    """Coalesces samples from worker threads into one UI update per frame"""
+
+    def __init__(self, root, fps: float = 20.0):
+        self.root = root
+        self.interval_ms = max(1, round(1000 / fps))
+        self._queue = queue.SimpleQueue()
+        self._handlers = {}
+        self._after = None
+        # Counters (Tk thread): samples drained, handler calls, widgets
+        # reconfigured, frames run
+        self.received = 0
+        self.applied = 0
+        self.widgets_updated = 0
+        self.frames = 0
+
+    def register(self, source, handler) -> None:
+        """Call handler(sample) on the Tk thread with the newest sample of source"""
+        self._handlers[source] = handler
+
+    def unregister(self, source) -> None:
+        """Drop the handler, samples still queued for source are ignored"""
+        self._handlers.pop(source, None)
+
+    def post(self, source, sample) -> None:
+        """Queue a sample, safe to call from any thread"""
+        self._queue.put((source, sample))
+
+    def post_sample(self, connection) -> None:
+        """Post the current TelemetrySnapshot of a connection"""
+        self.post(connection, connection.getSnapshot())
+
+    def start(self) -> None:
+        """Run a frame every interval_ms on the Tk main loop"""
+        if self._after is None:
+            self._tick()
+
+    def stop(self) -> None:
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+            self._after = None
+
+    def run_frame(self) -> int:
+        """Apply the latest queued sample of every source, returns handler calls"""
+        latest = {}
+        try:
+            while True:
+                source, sample = self._queue.get_nowait()
+                latest[source] = sample
+                self.received += 1
+        except queue.Empty:
+            pass
+        self.frames += 1
+        calls = 0
+        for source, sample in latest.items():
+            handler = self._handlers.get(source)
+            if handler is None:
+                continue
+            try:
+                changed = handler(sample)
+            except Exception as e:
+                log.error("Display update error: %s", e)
+                continue
+            calls += 1
+            if changed:
+                self.widgets_updated += changed
+        self.applied += calls
+        return calls
+
+    def _tick(self) -> None:
+        self.run_frame()
+        self._after = self.root.after(self.interval_ms, self._tick)